@@ -8,9 +8,10 @@ import randovania
 
 
 def create_subparsers(root_parser):
-    from randovania.cli import echoes, server, gui, prime_database
+    from randovania.cli import echoes, server, gui, prime_database, benchmark
     echoes.create_subparsers(root_parser)
     prime_database.create_subparsers(root_parser)
+    benchmark.create_subparsers(root_parser)
     server.create_subparsers(root_parser)
     gui.create_subparsers(root_parser)
 
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import multiprocessing
+import sys
+import time
+from argparse import ArgumentParser
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from randovania.cli import echoes_lib
+from randovania.games.game import RandovaniaGame
+from randovania.lib.enum_lib import iterate_enum
+
+DEFAULT_SEEDS = (1000, 1001, 1002)
+
+
+def _peak_rss() -> Optional[int]:
+    """
+    The maximum resident set size of this process so far, in bytes. None when the platform doesn't support it.
+    It's for the whole lifetime of the process, so each case must run in its own process for it to be meaningful.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports it in kilobytes, macOS in bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_benchmark_case(preset, seed_number: int, validate: bool, timeout: int) -> dict:
+    """
+    Generates one seed, recording the time spent in each phase of the generation.
+    :param preset:
+    :param seed_number:
+    :param validate:
+    :param timeout:
+    :return: A JSON-serializable dict with the results.
+    """
+    from randovania.generator import generator
+    from randovania.layout.permalink import Permalink
+    from randovania.lib import profiling_lib
+    from randovania.resolver.exceptions import GenerationFailure
+
+    permalink = Permalink(
+        seed_number=seed_number,
+        spoiler=True,
+        presets={0: preset},
+    )
+
+    failure = None
+    with profiling_lib.record() as recording:
+        start_time = time.perf_counter()
+        try:
+            asyncio.run(generator.generate_and_validate_description(
+                permalink=permalink, status_update=None,
+                validate_after_generation=validate, timeout=timeout,
+                attempts=0,
+            ))
+        except GenerationFailure as e:
+            failure = str(e)
+        total_time = time.perf_counter() - start_time
+
+    return {
+        "game": preset.game.value,
+        "preset": preset.name,
+        "seed_number": seed_number,
+        "success": failure is None,
+        "failure": failure,
+        "total_time": total_time,
+        "peak_rss": _peak_rss(),
+        **recording.as_json(),
+    }
+
+
+def run_benchmark_case_in_subprocess(preset, seed_number: int, validate: bool, timeout: int) -> dict:
+    """
+    Runs `run_benchmark_case` in a new process, so the peak memory usage is of that case alone.
+    :param preset:
+    :param seed_number:
+    :param validate:
+    :param timeout:
+    :return:
+    """
+    # Spawn instead of fork, as a forked process starts with the memory usage of this one
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(run_benchmark_case, (preset, seed_number, validate, timeout))
+
+
+def _case_key(case: dict) -> Tuple[str, str, int]:
+    return case["game"], case["preset"], case["seed_number"]
+
+
+def compare_results(previous: dict, current: dict, tolerance: float) -> List[str]:
+    """
+    Compares the timers of each case present in both results.
+    :param previous:
+    :param current:
+    :param tolerance: How much slower, as a fraction of the previous time, a timer can be before it's reported.
+    :return: A message for each timer that got slower than the tolerance.
+    """
+    previous_cases: Dict[Tuple[str, str, int], dict] = {
+        _case_key(case): case
+        for case in previous["cases"]
+    }
+
+    regressions = []
+    for case in current["cases"]:
+        old_case = previous_cases.get(_case_key(case))
+        if old_case is None:
+            continue
+
+        old_timers = dict(old_case["timers"], total_time=old_case["total_time"])
+        new_timers = dict(case["timers"], total_time=case["total_time"])
+        for name, new_time in new_timers.items():
+            old_time = old_timers.get(name)
+            if old_time and new_time > old_time * (1 + tolerance):
+                regressions.append("{} - {} - seed {}: {} went from {:.3f}s to {:.3f}s".format(
+                    case["game"], case["preset"], case["seed_number"], name, old_time, new_time,
+                ))
+
+    return regressions
+
+
+def benchmark_command_logic(args):
+    import randovania
+    from randovania.interface_common.preset_manager import PresetManager
+
+    preset_manager = PresetManager(None)
+    games = {RandovaniaGame(game) for game in args.game} if args.game else set(iterate_enum(RandovaniaGame))
+    presets = [
+        versioned_preset.get_preset()
+        for versioned_preset in preset_manager.included_presets.values()
+        if versioned_preset.game in games
+    ]
+
+    cases = []
+    for preset in presets:
+        for seed_number in args.seed_number or DEFAULT_SEEDS:
+            case = run_benchmark_case_in_subprocess(preset, seed_number, args.validate, args.timeout)
+            cases.append(case)
+            print("{} - {} - seed {}: {:.3f}s{}".format(
+                case["game"], case["preset"], seed_number, case["total_time"],
+                "" if case["success"] else " (failed)",
+            ))
+
+    result = {
+        "version": randovania.VERSION,
+        "cases": cases,
+    }
+
+    if args.output is not None:
+        with args.output.open("w") as output_file:
+            json.dump(result, output_file, indent=4)
+
+    if args.compare_to is not None:
+        with args.compare_to.open() as previous_file:
+            regressions = compare_results(json.load(previous_file), result, args.tolerance)
+
+        for regression in regressions:
+            print(regression)
+        if regressions:
+            raise SystemExit(1)
+
+
+def create_subparsers(sub_parsers):
+    parser: ArgumentParser = sub_parsers.add_parser(
+        "benchmark",
+        help="Measures how long generating seeds with the included presets takes"
+    )
+
+    echoes_lib.add_validate_argument(parser)
+    parser.add_argument("--game", action="append", choices=[game.value for game in iterate_enum(RandovaniaGame)],
+                        help="Only use the presets of this game. Can be repeated. Defaults to all games.")
+    parser.add_argument("--seed-number", type=int, action="append",
+                        help="A seed number to generate with each preset. Can be repeated. "
+                             "Defaults to {}.".format(", ".join(str(seed) for seed in DEFAULT_SEEDS)))
+    parser.add_argument("--timeout", type=int, default=90,
+                        help="How many seconds to wait before timing out a validation.")
+    parser.add_argument("--output", type=Path, help="Where to write the results, as JSON.")
+    parser.add_argument("--compare-to", type=Path,
+                        help="The results of a previous run. Fails if any phase got slower than the tolerance.")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="How much slower a phase can be, as a fraction of the previous time. Defaults to 0.25.")
+    parser.set_defaults(func=benchmark_command_logic)
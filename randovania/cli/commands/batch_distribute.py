@@ -1,23 +1,47 @@
 import asyncio
+import contextlib
+import json
 import math
 import multiprocessing
+import os
+import threading
 import time
 import typing
 from argparse import ArgumentParser
 from pathlib import Path
+from typing import Optional, Set
 
 from randovania.cli import echoes_lib
 from randovania.interface_common import sleep_inhibitor
 
+INDEX_FILE_NAME = "index.jsonl"
+
+
+def _initialize_worker(games, configurations):
+    from randovania.game_description import default_database
+    from randovania.generator import generator
+
+    # Usually already done by the parent process before forking, in which case this is free
+    default_database.preload_games(games)
+    for configuration in configurations:
+        generator.preset_bootstrap_for(configuration)
+
 
 def batch_distribute_helper(base_permalink,
                             seed_number: int,
                             timeout: int,
                             validate: bool,
                             output_dir: Path,
-                            ) -> float:
+                            profile_dir: Optional[Path] = None,
+                            profile_format: str = "json",
+                            ) -> dict:
+    """
+    Generates the seed with the given number, saving it to output_dir.
+    :return: The entry of this seed for the index of the run.
+    """
     from randovania.generator import generator
     from randovania.layout.permalink import Permalink
+    from randovania.lib import profiling_lib
 
     permalink = Permalink(
         seed_number=seed_number,
@@ -25,16 +49,92 @@ def batch_distribute_helper(base_permalink,
         presets=typing.cast(Permalink, base_permalink).presets,
     )
 
-    start_time = time.perf_counter()
-    description = asyncio.run(generator.generate_and_validate_description(
-        permalink=permalink, status_update=None,
-        validate_after_generation=validate, timeout=timeout,
-        attempts=0,
-    ))
-    delta_time = time.perf_counter() - start_time
-
-    description.save_to_file(output_dir.joinpath("{}.{}".format(seed_number, description.file_extension())))
-    return delta_time
+    description = None
+    failure = None
+    if profile_dir is not None:
+        recording_context = profiling_lib.record(trace=profile_format == "chrome-trace")
+    else:
+        # Recording enables all timers, so only do it when asked to
+        recording_context = contextlib.nullcontext()
+
+    attempts_before = generator.generation_attempts()
+    with recording_context as recording:
+        start_time = time.perf_counter()
+        try:
+            description = asyncio.run(generator.generate_and_validate_description(
+                permalink=permalink, status_update=None,
+                validate_after_generation=validate, timeout=timeout,
+                attempts=0,
+            ))
+        except Exception as e:
+            failure = str(e)
+        delta_time = time.perf_counter() - start_time
+
+    # Also when the generation fails, so it's possible to see where a timeout happened
+    if profile_dir is not None:
+        recording.save_to_file(profile_dir.joinpath(f"{seed_number}.{profile_format}.json"),
+                               chrome_trace=profile_format == "chrome-trace")
+
+    if description is not None:
+        description.save_to_file(output_dir.joinpath("{}.{}".format(seed_number, description.file_extension())))
+
+    return {
+        "seed_number": seed_number,
+        "hash": description.shareable_hash if description is not None else None,
+        "duration": delta_time,
+        "attempts": generator.generation_attempts() - attempts_before,
+        "failure": failure,
+    }
+
+
+def _batch_distribute_helper_with_tuple(arguments: tuple) -> dict:
+    return batch_distribute_helper(*arguments)
+
+
+def read_finished_seeds(output_dir: Path) -> Set[int]:
+    """
+    Finds which seeds were already generated or failed in a previous run using the same output_dir.
+    :param output_dir:
+    :return:
+    """
+    from randovania.layout.layout_description import LayoutDescription
+
+    finished = {
+        int(path.stem)
+        for path in output_dir.glob(f"*.{LayoutDescription.file_extension()}")
+        if path.stem.isdigit()
+    }
+
+    index_path = output_dir.joinpath(INDEX_FILE_NAME)
+    if index_path.is_file():
+        with index_path.open() as index_file:
+            for line in index_file:
+                try:
+                    finished.add(json.loads(line)["seed_number"])
+                except (ValueError, KeyError):
+                    # A run that was interrupted while writing leaves an incomplete last line
+                    continue
+
+    return finished
+
+
+def _open_index_for_append(index_path: Path) -> typing.TextIO:
+    """
+    Opens the index of the run for adding more seeds to it.
+    :param index_path:
+    :return:
+    """
+    needs_newline = False
+    if index_path.is_file() and index_path.stat().st_size > 0:
+        with index_path.open("rb") as existing_file:
+            existing_file.seek(-1, os.SEEK_END)
+            needs_newline = existing_file.read(1) != b"\n"
+
+    index_file = index_path.open("a")
+    # A run that was interrupted while writing leaves an incomplete last line, which the next entry can't be added to
+    if needs_newline:
+        index_file.write("\n")
+    return index_file
 
 
 def batch_distribute_command_logic(args):
@@ -48,32 +148,62 @@ def batch_distribute_command_logic(args):
     output_dir: Path = args.output_dir
     output_dir.mkdir(parents=True, exist_ok=True)
 
-    seed_count = args.seed_count
+    profile_dir: Optional[Path] = args.profile_dir
+    if profile_dir is not None:
+        profile_dir.mkdir(parents=True, exist_ok=True)
+
+    base_permalink = Permalink.from_str(args.permalink)
+    finished_seeds = read_finished_seeds(output_dir)
+    seed_numbers = [
+        seed_number
+        for seed_number in range(base_permalink.seed_number, base_permalink.seed_number + args.seed_count)
+        if seed_number not in finished_seeds
+    ]
+    if len(seed_numbers) < args.seed_count:
+        print(f"Skipping {args.seed_count - len(seed_numbers)} seeds already in {output_dir}.")
+
+    seed_count = len(seed_numbers)
     num_digits = math.ceil(math.log10(seed_count + 1))
     number_format = "[{0:" + str(num_digits) + "d}/{1}] "
-    base_permalink = Permalink.from_str(args.permalink)
 
     def report_update(msg: str):
         nonlocal finished_count
         finished_count += 1
         print(number_format.format(finished_count, seed_count) + msg)
 
-    def callback(result):
-        report_update(f"Finished seed in {result} seconds.")
-
-    def error_callback(e):
-        report_update(f"Failed to generate seed: {e}")
-
-    with multiprocessing.Pool(processes=args.process_count) as pool, sleep_inhibitor.get_inhibitor():
-        for seed_number in range(base_permalink.seed_number, base_permalink.seed_number + args.seed_count):
-            pool.apply_async(
-                func=batch_distribute_helper,
-                args=(base_permalink, seed_number, timeout, validate, output_dir),
-                callback=callback,
-                error_callback=error_callback,
-            )
-        pool.close()
-        pool.join()
+    games = {preset.game for preset in base_permalink.presets.values()}
+    configurations = [preset.configuration for preset in base_permalink.presets.values()]
+    _initialize_worker(games, configurations)
+
+    process_count = args.process_count or os.cpu_count()
+    # Seeds are only given to the pool when there's room, so an interrupted run loses little work
+    in_flight = threading.Semaphore(args.max_in_flight or 2 * process_count)
+    stopped = threading.Event()
+
+    def all_arguments():
+        for number in seed_numbers:
+            in_flight.acquire()
+            if stopped.is_set():
+                return
+            yield base_permalink, number, timeout, validate, output_dir, profile_dir, args.profile_format
+
+    with multiprocessing.Pool(processes=process_count, initializer=_initialize_worker,
+                              initargs=(games, configurations)) as pool, sleep_inhibitor.get_inhibitor(), \
+            _open_index_for_append(output_dir.joinpath(INDEX_FILE_NAME)) as index_file:
+        try:
+            for result in pool.imap_unordered(_batch_distribute_helper_with_tuple, all_arguments()):
+                in_flight.release()
+                index_file.write(json.dumps(result) + "\n")
+                index_file.flush()
+
+                if result["failure"] is None:
+                    report_update(f"Finished seed {result['seed_number']} in {result['duration']} seconds.")
+                else:
+                    report_update(f"Failed to generate seed {result['seed_number']}: {result['failure']}")
+        finally:
+            # The pool waits for the seeds to be all given when closing, so unblock it in case of errors
+            stopped.set()
+            in_flight.release()
 
 
 def add_batch_distribute_command(sub_parsers):
@@ -84,12 +214,23 @@ def add_batch_distribute_command(sub_parsers):
 
     parser.add_argument("permalink", type=str, help="The permalink to use")
     parser.add_argument("--process-count", type=int, help="How many processes to use. Defaults to CPU count.")
+    parser.add_argument("--max-in-flight", type=int,
+                        help="How many seeds can be queued for the processes. Defaults to twice the process count.")
     parser.add_argument(
         "--timeout",
         type=int,
         default=90,
         help="How many seconds to wait before timing out a generation/validation.")
     echoes_lib.add_validate_argument(parser)
+    parser.add_argument(
+        "--profile-dir",
+        type=Path,
+        help="Record where the time of each seed was spent, writing one file per seed in this directory.")
+    parser.add_argument(
+        "--profile-format",
+        choices=["json", "chrome-trace"],
+        default="json",
+        help="Either the total time of each phase as JSON, or every phase as a Chrome trace. Defaults to json.")
     parser.add_argument(
         "seed_count",
         type=int,
@@ -97,5 +238,6 @@ def add_batch_distribute_command(sub_parsers):
     parser.add_argument(
         "output_dir",
         type=Path,
-        help="Where to place the seed logs.")
+        help="Where to place the seed logs and the index of the run. "
+             "Seeds already in it are skipped, so an interrupted run can be resumed.")
     parser.set_defaults(func=batch_distribute_command_logic)
@@ -40,6 +40,8 @@ def distribute_command_logic(args):
     extra_args = {}
     if args.no_retry:
         extra_args["attempts"] = 0
+    if args.process_count > 1:
+        extra_args["process_count"] = args.process_count
 
     before = time.perf_counter()
     layout_description = asyncio.run(generator.generate_and_validate_description(permalink=permalink, status_update=status_update,
@@ -61,6 +63,9 @@ def add_distribute_command(sub_parsers):
     echoes_lib.add_validate_argument(parser)
     parser.add_argument("--no-retry", default=False, action="store_true", help="Disable retries in the generation.")
     parser.add_argument("--status-update", default=False, action="store_true", help="Print the status updates.")
+    parser.add_argument("--process-count", type=int, default=1,
+                        help="How many processes to use for weighting the possible actions of each filler step. "
+                             "Doesn't change the generated game. Defaults to 1.")
 
     group = parser.add_mutually_exclusive_group()
     group.add_argument("--permalink", type=str, help="The permalink to use")
@@ -22,7 +22,8 @@ def validate_command_logic(args):
     before = time.perf_counter()
     final_state_by_resolve = asyncio.run(resolver.resolve(
         configuration=configuration,
-        patches=patches
+        patches=patches,
+        process_count=args.process_count,
     ))
     after = time.perf_counter()
     print("Took {} seconds. Game is {}.".format(
@@ -38,6 +39,11 @@ def add_validate_command(sub_parsers):
     )
 
     add_debug_argument(parser)
+    parser.add_argument(
+        "--process-count",
+        type=int,
+        default=1,
+        help="How many processes to use for exploring alternative actions. Defaults to 1.")
     parser.add_argument(
         "layout_file",
         type=Path,
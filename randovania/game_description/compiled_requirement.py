@@ -0,0 +1,213 @@
+"""Flattened, pre-indexed forms of Requirement, for fast evaluation in the generator and resolver."""
+from math import ceil
+from typing import Tuple, Optional, List, Iterator
+
+from randovania.game_description.requirements import Requirement, RequirementAnd, RequirementOr, \
+    ResourceRequirement, RequirementTemplate, MAX_DAMAGE, RequirementSet
+from randovania.game_description.resources.resource_collection import ResourceCollection, ResourceIndexer
+from randovania.game_description.resources.resource_database import ResourceDatabase
+from randovania.game_description.resources.resource_info import CurrentResources
+
+# Requirements that expand to more alternatives than this are kept as a tree.
+MAX_ALTERNATIVES = 128
+
+# (index, amount, negate)
+_ResourceCheck = Tuple[int, int, bool]
+
+# (mask of resources that only need to be present, other checks, damage requirements)
+_CompiledAlternative = Tuple[int, Tuple[_ResourceCheck, ...], Tuple[ResourceRequirement, ...]]
+
+
+def _expand_alternatives(requirement: Requirement) -> Optional[List[Tuple[ResourceRequirement, ...]]]:
+    """
+    Converts the given requirement to disjunctive normal form: a list of alternatives, where each alternative is a
+    tuple of ResourceRequirement that must all be satisfied. Templates are inlined.
+    Unlike RequirementList, duplicated requirements are kept, as they matter for damage.
+    :param requirement:
+    :return: None, if the result would have more than MAX_ALTERNATIVES alternatives.
+    """
+    if isinstance(requirement, CompiledRequirement):
+        return _expand_alternatives(requirement.original)
+
+    if isinstance(requirement, ResourceRequirement):
+        return [(requirement,)]
+
+    if isinstance(requirement, RequirementTemplate):
+        return _expand_alternatives(requirement.template_requirement)
+
+    if isinstance(requirement, RequirementOr):
+        result = []
+        for item in requirement.items:
+            expanded = _expand_alternatives(item)
+            if expanded is None:
+                return None
+            result.extend(expanded)
+            if len(result) > MAX_ALTERNATIVES:
+                return None
+        return result
+
+    if isinstance(requirement, RequirementAnd):
+        result = [()]
+        for item in requirement.items:
+            expanded = _expand_alternatives(item)
+            if expanded is None or len(result) * len(expanded) > MAX_ALTERNATIVES:
+                return None
+            result = [
+                existing + new
+                for existing in result
+                for new in expanded
+            ]
+        return result
+
+    return None
+
+
+def _compile_alternative(alternative: Tuple[ResourceRequirement, ...],
+                         indexer: ResourceIndexer,
+                         ) -> _CompiledAlternative:
+    mask = 0
+    checks = []
+    damage = []
+
+    for individual in alternative:
+        if individual.is_damage:
+            damage.append(individual)
+        elif individual.negate or individual.amount > 1:
+            checks.append((individual.index_in(indexer), individual.amount, individual.negate))
+        elif individual.amount > 0:
+            mask |= 1 << individual.index_in(indexer)
+
+    return mask, tuple(checks), tuple(damage)
+
+
+def _damage_for(individual: ResourceRequirement, current_resources: CurrentResources,
+                database: ResourceDatabase) -> int:
+    return ceil(database.get_damage_reduction(individual.resource, current_resources) * individual.amount)
+
+
+class CompiledRequirement(Requirement):
+    """
+    Wraps a Requirement with a flattened form that's evaluated with bitmask tests against a ResourceCollection.
+    Everything besides `satisfied` and `damage` is forwarded to the original requirement, and so is the evaluation
+    when using resources from a different ResourceIndexer.
+    """
+    original: Requirement
+    _indexer: ResourceIndexer
+    _alternatives: Tuple[_CompiledAlternative, ...]
+    _cached_as_set: Optional[RequirementSet]
+
+    def __init__(self, original: Requirement, indexer: ResourceIndexer,
+                 alternatives: Tuple[_CompiledAlternative, ...]):
+        self.original = original
+        self._indexer = indexer
+        self._alternatives = alternatives
+        self._cached_as_set = None
+
+    def __deepcopy__(self, memodict):
+        return self
+
+    def _uses_compiled(self, current_resources: CurrentResources) -> bool:
+        return type(current_resources) is ResourceCollection and current_resources.indexer is self._indexer
+
+    def _alternative_satisfied(self, alternative: _CompiledAlternative, current_resources: ResourceCollection,
+                               current_energy: int, database: ResourceDatabase) -> bool:
+        mask, checks, damage = alternative
+        if current_resources.mask & mask != mask:
+            return False
+
+        for index, amount, negate in checks:
+            if (current_resources.get_by_index(index) >= amount) == negate:
+                return False
+
+        for individual in damage:
+            if current_energy <= _damage_for(individual, current_resources, database):
+                return False
+
+        return True
+
+    def satisfied(self, current_resources: CurrentResources, current_energy: int, database: ResourceDatabase) -> bool:
+        if not self._uses_compiled(current_resources):
+            return self.original.satisfied(current_resources, current_energy, database)
+
+        for alternative in self._alternatives:
+            if self._alternative_satisfied(alternative, current_resources, current_energy, database):
+                return True
+        return False
+
+    def damage(self, current_resources: CurrentResources, database: ResourceDatabase) -> int:
+        if not self._uses_compiled(current_resources):
+            return self.original.damage(current_resources, database)
+
+        result = MAX_DAMAGE
+        found = False
+        for alternative in self._alternatives:
+            if not self._alternative_satisfied(alternative, current_resources, MAX_DAMAGE, database):
+                continue
+
+            damage = sum(_damage_for(individual, current_resources, database) for individual in alternative[2])
+            if not found or damage < result:
+                result = damage
+                found = True
+
+        return result
+
+    def patch_requirements(self, static_resources: CurrentResources, damage_multiplier: float,
+                           database: ResourceDatabase) -> Requirement:
+        return self.original.patch_requirements(static_resources, damage_multiplier, database)
+
+    def simplify(self) -> Requirement:
+        return self.original.simplify()
+
+    @property
+    def as_set(self) -> RequirementSet:
+        # Used by the reach for every unsatisfied connection, and the requirement never changes
+        if self._cached_as_set is None:
+            self._cached_as_set = self.original.as_set
+        return self._cached_as_set
+
+    def iterate_resource_requirements(self) -> Iterator[ResourceRequirement]:
+        return self.original.iterate_resource_requirements()
+
+    def __eq__(self, other):
+        if isinstance(other, CompiledRequirement):
+            other = other.original
+        return self.original == other
+
+    def __hash__(self) -> int:
+        return hash(self.original)
+
+    def __repr__(self):
+        return repr(self.original)
+
+    def __str__(self) -> str:
+        return str(self.original)
+
+
+def compile_requirement(requirement: Requirement, database: ResourceDatabase) -> Requirement:
+    """
+    Creates a CompiledRequirement for the given requirement, using the indices of the given database.
+    :param requirement:
+    :param database:
+    :return: The original requirement, when it's too complex to be flattened.
+    """
+    if isinstance(requirement, CompiledRequirement):
+        requirement = requirement.original
+
+    # Requirements are immutable, so the result is kept with them for the next game using the same indexer
+    indexer = database.resource_indexer
+    cached = requirement.__dict__.get("_cached_compiled")
+    if cached is not None and cached[0] is indexer:
+        return cached[1]
+
+    alternatives = _expand_alternatives(requirement)
+    if alternatives is None:
+        result = requirement
+    else:
+        result = CompiledRequirement(
+            requirement,
+            indexer,
+            tuple(_compile_alternative(alternative, indexer) for alternative in alternatives),
+        )
+
+    object.__setattr__(requirement, "_cached_compiled", (indexer, result))
+    return result
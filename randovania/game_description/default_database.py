@@ -1,6 +1,7 @@
 import functools
 import json
 from pathlib import Path
+from typing import Iterable
 
 from randovania import get_data_path
 from randovania.game_description import data_reader
@@ -22,9 +23,38 @@ def resource_database_for(game: RandovaniaGame) -> ResourceDatabase:
 
 
 def game_description_for(game: RandovaniaGame) -> GameDescription:
+    """
+    Decodes the GameDescription for the given game. The data file is only read once.
+    :param game:
+    :return: A new GameDescription every call, so it's safe to modify it.
+    """
     return data_reader.decode_data(default_data.read_json_then_binary(game)[1])
 
 
+@functools.lru_cache()
+def shared_game_description_for(game: RandovaniaGame) -> GameDescription:
+    """
+    Gets the GameDescription for the given game, which is shared by all callers.
+    :param game:
+    :return: Always the same GameDescription. It must never be modified, use `patched_copy` or a deepcopy instead.
+    """
+    return game_description_for(game)
+
+
+def preload_games(games: Iterable[RandovaniaGame]):
+    """
+    Reads all data files of the given games, so later uses of these games don't need to read or parse any file.
+    When done before creating worker processes with fork, all workers share the already parsed data.
+    :param games:
+    :return:
+    """
+    for game in games:
+        default_data.read_json_then_binary(game)
+        resource_database_for(game)
+        shared_game_description_for(game)
+        item_database_for_game(game)
+
+
 def _read_database_in_path(path: Path) -> item_database.ItemDatabase:
     configuration_path = path.joinpath("configuration")
 
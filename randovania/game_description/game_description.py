@@ -16,10 +16,10 @@ from randovania.game_description.world_list import WorldList
 from randovania.games.game import RandovaniaGame
 
 
-def _calculate_dangerous_resources_in_db(db: DockWeaknessDatabase) -> Iterator[ResourceInfo]:
+def _calculate_dangerous_resources_in_db(db: DockWeaknessDatabase, world_list: WorldList) -> Iterator[ResourceInfo]:
     for list_by_type in db:
         for dock_weakness in list_by_type:
-            yield from dock_weakness.requirement.as_set.dangerous_resources
+            yield from world_list.dock_weakness_requirement(dock_weakness).as_set.dangerous_resources
 
 
 def _calculate_dangerous_resources_in_areas(areas: Iterator[Area]) -> Iterator[ResourceInfo]:
@@ -41,6 +41,8 @@ class GameDescription:
     world_list: WorldList
 
     def __deepcopy__(self, memodict):
+        # The copy shares the resource database, so keep the requirement templates bound to it
+        memodict[id(self.resource_database)] = self.resource_database
         new_game = GameDescription(
             game=self.game,
             resource_database=self.resource_database,
@@ -74,8 +76,22 @@ class GameDescription:
 
     def patch_requirements(self, resources, damage_multiplier: float):
         self.world_list.patch_requirements(resources, damage_multiplier, self.resource_database)
+        self.world_list.compile_requirements(self.resource_database)
         self._dangerous_resources = None
 
+    def patched_copy(self, resources: CurrentResources, damage_multiplier: float) -> "GameDescription":
+        """
+        Creates a new GameDescription with the same result as `patch_requirements`, without modifying this one.
+        See `WorldList.patched_copy`.
+        :param resources:
+        :param damage_multiplier:
+        :return:
+        """
+        new_game = copy.copy(self)
+        new_game.world_list = self.world_list.patched_copy(resources, damage_multiplier, self.resource_database)
+        new_game._dangerous_resources = None
+        return new_game
+
     def create_game_patches(self) -> GamePatches:
         elevator_connection: Dict[Teleporter, AreaLocation] = {
             node.teleporter: node.default_connection
@@ -91,7 +107,7 @@ class GameDescription:
         if self._dangerous_resources is None:
             self._dangerous_resources = frozenset(
                 _calculate_dangerous_resources_in_areas(self.world_list.all_areas)) | frozenset(
-                _calculate_dangerous_resources_in_db(self.dock_weakness_database))
+                _calculate_dangerous_resources_in_db(self.dock_weakness_database, self.world_list))
         return self._dangerous_resources
 
 
@@ -1,16 +1,66 @@
+import collections
+import copy
 import dataclasses
+import weakref
 from functools import lru_cache
 from math import ceil
-from typing import Optional, Iterable, FrozenSet, Iterator, Tuple, List, Type, Union
+from typing import Optional, Iterable, FrozenSet, Iterator, Tuple, List, Type, Union, Dict, Hashable
 
+from randovania.game_description.resources.resource_collection import ResourceCollection, ResourceIndexer
 from randovania.game_description.resources.resource_database import ResourceDatabase
 from randovania.game_description.resources.resource_info import ResourceInfo, CurrentResources
 from randovania.game_description.resources.resource_type import ResourceType
 
 MAX_DAMAGE = 9999999
 
+# Requirements are immutable and hash-consed: creating a requirement equal to an existing one returns the same instance,
+# so equality is an identity check.
+# And/Or are keyed by the identity of their items, which keeps them distinct from ones with equal, but not identical,
+# items like a CompiledRequirement.
+_interned_requirements: "weakref.WeakValueDictionary[Hashable, Requirement]" = weakref.WeakValueDictionary()
+
+
+def _interned(key: Hashable, create):
+    result = _interned_requirements.get(key)
+    if result is None:
+        result = create()
+        _interned_requirements[key] = result
+    return result
+
+
+_MAX_PATCH_MEMOS = 8
+_patch_memos: "collections.OrderedDict[Hashable, Tuple[weakref.ref, Dict[Requirement, Requirement]]]" = \
+    collections.OrderedDict()
+
+
+def patched_requirements_memo(static_resources: CurrentResources, damage_multiplier: float,
+                              database: ResourceDatabase) -> Dict["Requirement", "Requirement"]:
+    """
+    Gets a dict for memoizing the `patch_requirements(...).simplify()` of requirements, for the given arguments.
+    As requirements are immutable, the same dict is returned whenever the arguments are equal and the database is the
+    same object, so repeated bootstraps with the same configuration patch each requirement only once.
+    :param static_resources:
+    :param damage_multiplier:
+    :param database:
+    :return:
+    """
+    # Databases can be modified, like in the editor, so only the same object is safe to share.
+    # The weakref makes sure the id wasn't reused by a new database.
+    key = (id(database), frozenset(static_resources.items()), damage_multiplier)
+    entry = _patch_memos.get(key)
+    if entry is None or entry[0]() is not database:
+        entry = _patch_memos[key] = (weakref.ref(database), {})
+        while len(_patch_memos) > _MAX_PATCH_MEMOS:
+            _patch_memos.popitem(last=False)
+    else:
+        _patch_memos.move_to_end(key)
+    return entry[1]
+
 
 class Requirement:
+    def __deepcopy__(self, memodict):
+        return self
+
     def damage(self, current_resources: CurrentResources, database: ResourceDatabase) -> int:
         raise NotImplementedError()
 
@@ -64,10 +114,18 @@ class Requirement:
 
 class RequirementAnd(Requirement):
     items: Tuple[Requirement, ...]
-    _cached_hash = None
+    _cached_simplify: Optional[Requirement] = None
+
+    def __new__(cls, items: Iterable[Requirement]):
+        items = tuple(items)
+        return _interned((cls, *map(id, items)), lambda: _create_with_items(cls, items))
+
+    def __reduce__(self):
+        return RequirementAnd, (self.items,)
 
-    def __init__(self, items: Iterable[Requirement]):
-        self.items = tuple(items)
+    def __deepcopy__(self, memodict):
+        # Interning returns this same instance, unless some template was bound to a copied database
+        return RequirementAnd(copy.deepcopy(item, memodict) for item in self.items)
 
     def damage(self, current_resources: CurrentResources, database: ResourceDatabase) -> int:
         result = 0
@@ -91,6 +149,11 @@ class RequirementAnd(Requirement):
         )
 
     def simplify(self) -> Requirement:
+        if self._cached_simplify is None:
+            self._cached_simplify = self._simplify()
+        return self._cached_simplify
+
+    def _simplify(self) -> Requirement:
         new_items = _expand_items(self.items, RequirementAnd, Requirement.trivial())
         if Requirement.impossible() in new_items:
             return Requirement.impossible()
@@ -111,14 +174,6 @@ class RequirementAnd(Requirement):
     def sorted(self) -> Tuple[Requirement]:
         return tuple(sorted(self.items))
 
-    def __eq__(self, other):
-        return isinstance(other, RequirementAnd) and self.items == other.items
-
-    def __hash__(self) -> int:
-        if self._cached_hash is None:
-            self._cached_hash = hash(self.items)
-        return self._cached_hash
-
     def __repr__(self):
         return repr(self.items)
 
@@ -136,10 +191,18 @@ class RequirementAnd(Requirement):
 
 class RequirementOr(Requirement):
     items: Tuple[Requirement, ...]
-    _cached_hash = None
+    _cached_simplify: Optional[Requirement] = None
 
-    def __init__(self, items: Iterable[Requirement]):
-        self.items = tuple(items)
+    def __new__(cls, items: Iterable[Requirement]):
+        items = tuple(items)
+        return _interned((cls, *map(id, items)), lambda: _create_with_items(cls, items))
+
+    def __reduce__(self):
+        return RequirementOr, (self.items,)
+
+    def __deepcopy__(self, memodict):
+        # Interning returns this same instance, unless some template was bound to a copied database
+        return RequirementOr(copy.deepcopy(item, memodict) for item in self.items)
 
     def damage(self, current_resources: CurrentResources, database: ResourceDatabase) -> int:
         try:
@@ -164,6 +227,11 @@ class RequirementOr(Requirement):
         )
 
     def simplify(self) -> Requirement:
+        if self._cached_simplify is None:
+            self._cached_simplify = self._simplify()
+        return self._cached_simplify
+
+    def _simplify(self) -> Requirement:
         new_items = _expand_items(self.items, RequirementOr, Requirement.impossible())
         if Requirement.trivial() in new_items:
             return Requirement.trivial()
@@ -220,14 +288,6 @@ class RequirementOr(Requirement):
     def sorted(self) -> Tuple[Requirement]:
         return tuple(sorted(self.items))
 
-    def __eq__(self, other):
-        return isinstance(other, RequirementOr) and self.items == other.items
-
-    def __hash__(self) -> int:
-        if self._cached_hash is None:
-            self._cached_hash = hash(self.items)
-        return self._cached_hash
-
     def __repr__(self):
         return repr(self.items)
 
@@ -243,6 +303,13 @@ class RequirementOr(Requirement):
             yield from item.iterate_resource_requirements()
 
 
+def _create_with_items(cls: Type[Union[RequirementAnd, RequirementOr]],
+                       items: Tuple[Requirement, ...]) -> Union[RequirementAnd, RequirementOr]:
+    result = object.__new__(cls)
+    result.items = items
+    return result
+
+
 def _expand_items(items: Tuple[Requirement, ...],
                   cls: Type[Union[RequirementAnd, RequirementOr]],
                   exclude: Requirement) -> List[Requirement]:
@@ -262,12 +329,39 @@ def _expand_items(items: Tuple[Requirement, ...],
     return expanded
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, init=False, eq=False)
 class ResourceRequirement(Requirement):
     resource: ResourceInfo
     amount: int
     negate: bool
 
+    def __new__(cls, resource: ResourceInfo, amount: int, negate: bool):
+        def create():
+            result = object.__new__(cls)
+            object.__setattr__(result, "resource", resource)
+            object.__setattr__(result, "amount", amount)
+            object.__setattr__(result, "negate", negate)
+            return result
+
+        return _interned((cls, resource, amount, negate), create)
+
+    def __reduce__(self):
+        return ResourceRequirement, (self.resource, self.amount, self.negate)
+
+    def index_in(self, indexer: ResourceIndexer) -> int:
+        """
+        The index of this requirement's resource in the given indexer. Cached, to avoid hashing the resource.
+        :param indexer:
+        :return:
+        """
+        cached = self.__dict__.get("_cached_index")
+        if cached is not None and cached[0] is indexer:
+            return cached[1]
+
+        index = indexer.index_for(self.resource)
+        object.__setattr__(self, "_cached_index", (indexer, index))
+        return index
+
     @classmethod
     def with_data(cls,
                   database: ResourceDatabase,
@@ -298,7 +392,10 @@ class ResourceRequirement(Requirement):
 
             return current_energy > self.damage(current_resources, database)
 
-        has_amount = current_resources.get(self.resource, 0) >= self.amount
+        if type(current_resources) is ResourceCollection:
+            has_amount = current_resources.get_by_index(self.index_in(current_resources.indexer)) >= self.amount
+        else:
+            has_amount = current_resources.get(self.resource, 0) >= self.amount
         if self.negate:
             return not has_amount
         else:
@@ -365,9 +462,20 @@ class RequirementTemplate(Requirement):
     database: ResourceDatabase
     template_name: str
 
-    def __init__(self, database: ResourceDatabase, template_name: str):
-        self.database = database
-        self.template_name = template_name
+    def __new__(cls, database: ResourceDatabase, template_name: str):
+        def create():
+            result = object.__new__(cls)
+            result.database = database
+            result.template_name = template_name
+            return result
+
+        return _interned((cls, id(database), template_name), create)
+
+    def __reduce__(self):
+        return RequirementTemplate, (self.database, self.template_name)
+
+    def __deepcopy__(self, memodict):
+        return RequirementTemplate(copy.deepcopy(self.database, memodict), self.template_name)
 
     @property
     def template_requirement(self) -> Requirement:
@@ -391,7 +499,9 @@ class RequirementTemplate(Requirement):
         return self.template_requirement.as_set
 
     def __eq__(self, other):
-        return isinstance(other, RequirementTemplate) and self.template_name == other.template_name
+        # Templates from the same database are interned, but equal databases can still exist, like in copies
+        return (isinstance(other, RequirementTemplate) and self.template_name == other.template_name
+                and (self.database is other.database or self.database == other.database))
 
     def __hash__(self) -> int:
         return hash(self.template_name)
@@ -406,10 +516,14 @@ class RequirementTemplate(Requirement):
 class RequirementList:
     items: FrozenSet[ResourceRequirement]
     _cached_hash: Optional[int] = None
+    _cached_mask: Optional[Tuple[ResourceIndexer, int, Tuple[ResourceRequirement, ...]]] = None
 
     def __deepcopy__(self, memodict):
         return self
 
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key != "_cached_mask"}
+
     def __init__(self, items: Iterable[ResourceRequirement]):
         self.items = frozenset(items)
 
@@ -443,6 +557,8 @@ class RequirementList:
         :param database:
         :return:
         """
+        if type(current_resources) is ResourceCollection:
+            return self._satisfied_with_collection(current_resources, current_energy, database)
 
         energy = current_energy
         for requirement in self.values():
@@ -453,6 +569,39 @@ class RequirementList:
                 return False
         return True
 
+    def _mask_for(self, indexer: ResourceIndexer) -> Tuple[int, Tuple[ResourceRequirement, ...]]:
+        """
+        Splits this list into a bitmask of all resources that only need to be present, and the requirements that
+        must be checked individually (negated, damage or with amount bigger than 1).
+        :param indexer:
+        :return:
+        """
+        cached = self._cached_mask
+        if cached is not None and cached[0] is indexer:
+            return cached[1], cached[2]
+
+        mask = 0
+        others = []
+        for requirement in self.items:
+            if requirement.negate or requirement.is_damage or requirement.amount > 1:
+                others.append(requirement)
+            elif requirement.amount > 0:
+                mask |= 1 << requirement.index_in(indexer)
+
+        self._cached_mask = (indexer, mask, tuple(others))
+        return mask, self._cached_mask[2]
+
+    def _satisfied_with_collection(self, current_resources: ResourceCollection, current_energy: int,
+                                   database: ResourceDatabase) -> bool:
+        mask, others = self._mask_for(current_resources.indexer)
+        if current_resources.mask & mask != mask:
+            return False
+
+        for requirement in others:
+            if not requirement.satisfied(current_resources, current_energy, database):
+                return False
+        return True
+
     def get(self, resource: ResourceInfo) -> Optional[ResourceRequirement]:
         """
         Gets an IndividualRequirement that uses the given resource
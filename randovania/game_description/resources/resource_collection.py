@@ -0,0 +1,180 @@
+from typing import Dict, List, Optional, Iterator, MutableMapping, Mapping, Hashable, Tuple
+
+
+class ResourceIndexer:
+    """
+    Assigns dense integer indices to resources, in the order they're first seen.
+    All ResourceCollection created for the same ResourceDatabase share one indexer, so the index of a resource
+    is stable for the whole generation/resolution.
+    """
+    _indices: Dict[Hashable, int]
+    _resources: List[Hashable]
+
+    def __init__(self):
+        self._indices = {}
+        self._resources = []
+
+    def __deepcopy__(self, memodict):
+        # The indexer is append-only, so it's safe to share between copies.
+        return self
+
+    def __len__(self):
+        return len(self._resources)
+
+    def index_for(self, resource) -> int:
+        """
+        Gets the index for the given resource, assigning a new one if it was never seen before.
+        :param resource:
+        :return:
+        """
+        index = self._indices.get(resource)
+        if index is None:
+            index = len(self._resources)
+            self._indices[resource] = index
+            self._resources.append(resource)
+        return index
+
+    def find_index(self, resource) -> Optional[int]:
+        return self._indices.get(resource)
+
+    def resource_at(self, index: int):
+        return self._resources[index]
+
+
+class ResourceCollection(MutableMapping):
+    """
+    A dict-like inventory of resources to quantity, backed by a list of counts indexed by a ResourceIndexer.
+    A bitmask of all resources with a positive quantity is kept, so membership checks are a single bit test.
+    Like a dict, a resource can be present with quantity 0, which is different from not being present.
+    """
+    __slots__ = ("indexer", "_counts", "_mask")
+    indexer: ResourceIndexer
+    _counts: List[Optional[int]]
+    _mask: int
+
+    def __init__(self, indexer: ResourceIndexer, counts: Optional[List[Optional[int]]] = None, mask: int = 0):
+        self.indexer = indexer
+        self._counts = counts if counts is not None else []
+        self._mask = mask
+
+    @classmethod
+    def from_dict(cls, indexer: ResourceIndexer, resources: Mapping) -> "ResourceCollection":
+        result = cls(indexer)
+        for resource, quantity in resources.items():
+            result[resource] = quantity
+        return result
+
+    def __copy__(self) -> "ResourceCollection":
+        return ResourceCollection(self.indexer, self._counts[:], self._mask)
+
+    def copy(self) -> "ResourceCollection":
+        return self.__copy__()
+
+    def __repr__(self):
+        return "ResourceCollection({!r})".format(dict(self.items()))
+
+    @property
+    def mask(self) -> int:
+        """A bitmask with the bit of every resource with a positive quantity set."""
+        return self._mask
+
+    def fingerprint(self) -> Tuple[Optional[int], ...]:
+        """
+        A hashable value that's equal for all collections of the same indexer with the same contents.
+        :return:
+        """
+        counts = self._counts
+        end = len(counts)
+        while end > 0 and counts[end - 1] is None:
+            end -= 1
+        return tuple(counts[:end])
+
+    def get_by_index(self, index: int, default: int = 0) -> int:
+        if index < len(self._counts):
+            value = self._counts[index]
+            if value is not None:
+                return value
+        return default
+
+    def has_index(self, index: int) -> bool:
+        return (self._mask >> index) & 1 == 1
+
+    def has_resource(self, resource) -> bool:
+        index = self.indexer.find_index(resource)
+        return index is not None and self.has_index(index)
+
+    def get(self, resource, default=None):
+        index = self.indexer.find_index(resource)
+        if index is not None and index < len(self._counts):
+            value = self._counts[index]
+            if value is not None:
+                return value
+        return default
+
+    def __getitem__(self, resource) -> int:
+        value = self.get(resource)
+        if value is None:
+            raise KeyError(resource)
+        return value
+
+    def __contains__(self, resource) -> bool:
+        return self.get(resource) is not None
+
+    def __setitem__(self, resource, quantity: int) -> None:
+        index = self.indexer.index_for(resource)
+        counts = self._counts
+        if index >= len(counts):
+            counts.extend([None] * (index + 1 - len(counts)))
+        counts[index] = quantity
+
+        bit = 1 << index
+        if quantity > 0:
+            self._mask |= bit
+        elif self._mask & bit:
+            self._mask ^= bit
+
+    def __delitem__(self, resource) -> None:
+        index = self.indexer.find_index(resource)
+        if index is None or index >= len(self._counts) or self._counts[index] is None:
+            raise KeyError(resource)
+        self._counts[index] = None
+        bit = 1 << index
+        if self._mask & bit:
+            self._mask ^= bit
+
+    def __iter__(self) -> Iterator:
+        resource_at = self.indexer.resource_at
+        for index, value in enumerate(self._counts):
+            if value is not None:
+                yield resource_at(index)
+
+    def __len__(self) -> int:
+        return len(self._counts) - self._counts.count(None)
+
+    def items(self):
+        resource_at = self.indexer.resource_at
+        return [
+            (resource_at(index), value)
+            for index, value in enumerate(self._counts)
+            if value is not None
+        ]
+
+    def changed_resources(self, previous: "ResourceCollection") -> Iterator:
+        """
+        Iterates over all resources with a different quantity than in previous, which must share the same indexer.
+        A resource that's missing is considered to have quantity 0.
+        :param previous:
+        :return:
+        """
+        assert previous.indexer is self.indexer
+        current_counts = self._counts
+        previous_counts = previous._counts
+        if current_counts == previous_counts:
+            return
+
+        resource_at = self.indexer.resource_at
+        for index in range(max(len(current_counts), len(previous_counts))):
+            current = current_counts[index] if index < len(current_counts) else None
+            old = previous_counts[index] if index < len(previous_counts) else None
+            if (current or 0) != (old or 0):
+                yield resource_at(index)
@@ -4,6 +4,7 @@ from typing import List, Dict, Optional, Callable
 from randovania.game_description.resources import search
 from randovania.game_description.resources.damage_resource_info import DamageReduction
 from randovania.game_description.resources.item_resource_info import ItemResourceInfo
+from randovania.game_description.resources.resource_collection import ResourceIndexer, ResourceCollection
 from randovania.game_description.resources.resource_info import ResourceInfo, CurrentResources
 from randovania.game_description.resources.resource_type import ResourceType
 from randovania.game_description.resources.simple_resource_info import SimpleResourceInfo
@@ -30,6 +31,7 @@ class ResourceDatabase:
     item_percentage_index: Optional[int]
     multiworld_magic_item_index: int
     base_damage_reduction: Callable[["ResourceDatabase", CurrentResources], float] = default_base_damage_reduction
+    resource_indexer: ResourceIndexer = dataclasses.field(default_factory=ResourceIndexer, compare=False, repr=False)
 
     def get_by_type(self, resource_type: ResourceType) -> List[ResourceInfo]:
         if resource_type == ResourceType.ITEM:
@@ -71,6 +73,16 @@ class ResourceDatabase:
     def multiworld_magic_item(self) -> ItemResourceInfo:
         return self.get_item(self.multiworld_magic_item_index)
 
+    def create_resource_collection(self, resources: Optional[CurrentResources] = None) -> ResourceCollection:
+        """
+        Creates a ResourceCollection that uses this database's indices, with a copy of the given resources.
+        :param resources:
+        :return:
+        """
+        if resources is None:
+            resources = {}
+        return ResourceCollection.from_dict(self.resource_indexer, resources)
+
     def get_damage_reduction(self, resource: SimpleResourceInfo, current_resources: CurrentResources):
         multiplier = self.base_damage_reduction(self, current_resources)
 
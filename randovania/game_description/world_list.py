@@ -1,19 +1,26 @@
+import collections
 import copy
+import dataclasses
+import itertools
 import re
-from typing import List, Dict, Iterator, Tuple, Iterable, Optional
+from typing import List, Dict, Iterator, Tuple, Iterable, Optional, Callable, Hashable
 
 from randovania.game_description.area import Area
 from randovania.game_description.area_location import AreaLocation
-from randovania.game_description.dock import DockConnection
+from randovania.game_description.compiled_requirement import compile_requirement
+from randovania.game_description.dock import DockConnection, DockWeakness
 from randovania.game_description.game_patches import GamePatches
 from randovania.game_description.node import Node, DockNode, TeleporterNode, PickupNode, PlayerShipNode
-from randovania.game_description.requirements import Requirement
+from randovania.game_description.requirements import Requirement, patched_requirements_memo
 from randovania.game_description.resources.pickup_index import PickupIndex
 from randovania.game_description.resources.resource_database import ResourceDatabase
 from randovania.game_description.resources.resource_info import CurrentResources
 from randovania.game_description.teleporter import Teleporter
 from randovania.game_description.world import World
 
+Adjacency = Dict[Node, Tuple[Tuple[Optional[Node], Requirement], ...]]
+_MAX_PATCHED_COPIES = 4
+
 
 class WorldList:
     worlds: List[World]
@@ -23,11 +30,18 @@ class WorldList:
     _ids_to_area: Dict[AreaLocation, Area]
     _nodes: Tuple[Node, ...]
     _pickup_index_to_node: Dict[PickupIndex, PickupNode]
+    _player_ship_nodes: Tuple[PlayerShipNode, ...]
+    _adjacency_cache: Optional[Tuple[Tuple[dict, dict, dict], Adjacency]]
+    _patched_copies: "collections.OrderedDict[Hashable, WorldList]"
+    _dock_weakness_patch: Optional[Callable[[Requirement], Requirement]] = None
+    _dock_weakness_requirements: Dict[DockWeakness, Requirement]
 
     def __deepcopy__(self, memodict):
-        return WorldList(
+        result = WorldList(
             worlds=copy.deepcopy(self.worlds, memodict),
         )
+        result._dock_weakness_patch = self._dock_weakness_patch
+        return result
 
     def __init__(self, worlds: List[World]):
         self.worlds = worlds
@@ -41,6 +55,10 @@ class WorldList:
             for node in self._nodes
             if isinstance(node, PickupNode)
         }
+        self._player_ship_nodes = tuple(node for node in self._nodes if isinstance(node, PlayerShipNode))
+        self._adjacency_cache = None
+        self._patched_copies = collections.OrderedDict()
+        self._dock_weakness_requirements = {}
 
     def _iterate_over_nodes(self) -> Iterator[Node]:
         for world in self.worlds:
@@ -173,7 +191,7 @@ class WorldList:
                 dock_weakness = patches.dock_weakness.get((original_area.area_asset_id, node.dock_index),
                                                           node.default_dock_weakness)
 
-                yield target_node, dock_weakness.requirement
+                yield target_node, self.dock_weakness_requirement(dock_weakness)
             except IndexError:
                 # TODO: fix data to not having docks pointing to nothing
                 yield None, Requirement.impossible()
@@ -187,8 +205,8 @@ class WorldList:
                 yield None, Requirement.impossible()
 
         if isinstance(node, PlayerShipNode):
-            for other_node in self.all_nodes:
-                if isinstance(other_node, PlayerShipNode) and other_node != node:
+            for other_node in self._player_ship_nodes:
+                if other_node != node:
                     yield other_node, other_node.is_unlocked
 
     def area_connections_from(self, node: Node) -> Iterator[Tuple[Node, Requirement]]:
@@ -208,8 +226,49 @@ class WorldList:
         :param patches:
         :return: Generator of pairs Node + Requirement for going to that node
         """
-        yield from self.connections_from(node, patches)
-        yield from self.area_connections_from(node)
+        return iter(self.adjacency_for(patches)[node])
+
+    def adjacency_for(self, patches: GamePatches) -> Adjacency:
+        """
+        Gets all connections of all nodes, as given by `connections_from` and `area_connections_from`.
+        The result is cached and only created again when the dock or elevator assignments of the patches change,
+        or when the requirements are patched.
+        :param patches:
+        :return: Dict of each Node to all pairs Node + Requirement for going to that node
+        """
+        key = (patches.elevator_connection, patches.dock_connection, patches.dock_weakness)
+        if self._adjacency_cache is not None and self._adjacency_cache[0] == key:
+            return self._adjacency_cache[1]
+
+        adjacency = {
+            node: tuple(itertools.chain(self.connections_from(node, patches), self.area_connections_from(node)))
+            for node in self._nodes
+        }
+        self._adjacency_cache = (tuple(dict(it) for it in key), adjacency)
+        return adjacency
+
+    def dock_weakness_requirement(self, weakness: DockWeakness) -> Requirement:
+        """
+        Gets the requirement of the given dock weakness, with the patching and compiling done to this WorldList.
+        Dock weaknesses are shared with other WorldList, so they're never modified.
+        :param weakness:
+        :return:
+        """
+        if self._dock_weakness_patch is None:
+            return weakness.requirement
+
+        result = self._dock_weakness_requirements.get(weakness)
+        if result is None:
+            result = self._dock_weakness_requirements[weakness] = self._dock_weakness_patch(weakness.requirement)
+        return result
+
+    def _add_dock_weakness_patch(self, patch: Callable[[Requirement], Requirement]):
+        previous = self._dock_weakness_patch
+        if previous is None:
+            self._dock_weakness_patch = patch
+        else:
+            self._dock_weakness_patch = lambda requirement: patch(previous(requirement))
+        self._dock_weakness_requirements = {}
 
     def patch_requirements(self, static_resources: CurrentResources, damage_multiplier: float,
                            database: ResourceDatabase) -> None:
@@ -222,19 +281,79 @@ class WorldList:
         :param database:
         :return:
         """
+        patch = _requirement_patcher(static_resources, damage_multiplier, database)
+        self._add_dock_weakness_patch(patch)
+
         for world in self.worlds:
             for area in world.areas:
-                for node in area.nodes:
-                    if isinstance(node, DockNode):
-                        requirement = node.default_dock_weakness.requirement
-                        object.__setattr__(node.default_dock_weakness, "requirement",
-                                           requirement.patch_requirements(static_resources,
-                                                                          damage_multiplier,
-                                                                          database).simplify())
                 for connections in area.connections.values():
                     for target, value in connections.items():
-                        connections[target] = value.patch_requirements(
-                            static_resources, damage_multiplier, database).simplify()
+                        connections[target] = patch(value)
+        self._adjacency_cache = None
+        self._patched_copies.clear()
+
+    def compile_requirements(self, database: ResourceDatabase) -> None:
+        """
+        Replaces all Node connections with a CompiledRequirement, for faster evaluation.
+        Should be called after patch_requirements, as patching discards the compiled form.
+        :param database:
+        :return:
+        """
+        self._add_dock_weakness_patch(lambda requirement: compile_requirement(requirement, database))
+
+        for world in self.worlds:
+            for area in world.areas:
+                for connections in area.connections.values():
+                    for target, value in connections.items():
+                        connections[target] = compile_requirement(value, database)
+        self._adjacency_cache = None
+        self._patched_copies.clear()
+
+    def patched_copy(self, static_resources: CurrentResources, damage_multiplier: float,
+                     database: ResourceDatabase) -> "WorldList":
+        """
+        Creates a new WorldList with the same result as `patch_requirements` followed by `compile_requirements`,
+        without modifying this one.
+        Nodes are shared with this WorldList. Dock weaknesses, both the default of each DockNode and the ones
+        from GamePatches, are patched when used, see `dock_weakness_requirement`.
+        The result is cached, so repeating with the same arguments returns the same WorldList. It must not be modified.
+        :param static_resources:
+        :param damage_multiplier:
+        :param database:
+        :return:
+        """
+        key = (frozenset(static_resources.items()), damage_multiplier, database.resource_indexer)
+        result = self._patched_copies.get(key)
+        if result is None:
+            patch = _requirement_patcher(static_resources, damage_multiplier, database)
+
+            def patch_and_compile(requirement: Requirement) -> Requirement:
+                return compile_requirement(patch(requirement), database)
+
+            result = self._patched_copies[key] = WorldList(self._create_patched_worlds(patch_and_compile))
+            result._dock_weakness_patch = self._dock_weakness_patch
+            result._add_dock_weakness_patch(patch_and_compile)
+            while len(self._patched_copies) > _MAX_PATCHED_COPIES:
+                self._patched_copies.popitem(last=False)
+        else:
+            self._patched_copies.move_to_end(key)
+
+        return result
+
+    def _create_patched_worlds(self, patch: Callable[[Requirement], Requirement]) -> List[World]:
+        return [
+            dataclasses.replace(world, areas=[
+                dataclasses.replace(area, nodes=list(area.nodes), connections={
+                    source: {
+                        target: patch(requirement)
+                        for target, requirement in connections.items()
+                    }
+                    for source, connections in area.connections.items()
+                })
+                for area in world.areas
+            ])
+            for world in self.worlds
+        ]
 
     def teleporter_to_node(self, teleporter: Teleporter) -> TeleporterNode:
         area = self.area_by_area_location(teleporter.area_location)
@@ -268,6 +387,21 @@ class WorldList:
     def add_new_node(self, area: Area, node: Node):
         self._nodes_to_area[node] = area
         self._nodes_to_world[node] = self.world_with_area(area)
+        self._patched_copies.clear()
+
+
+def _requirement_patcher(static_resources: CurrentResources, damage_multiplier: float,
+                         database: ResourceDatabase) -> Callable[[Requirement], Requirement]:
+    memo = patched_requirements_memo(static_resources, damage_multiplier, database)
+
+    def patch(requirement: Requirement) -> Requirement:
+        result = memo.get(requirement)
+        if result is None:
+            result = memo[requirement] = requirement.patch_requirements(
+                static_resources, damage_multiplier, database).simplify()
+        return result
+
+    return patch
 
 
 def _calculate_nodes_to_area_world(worlds: Iterable[World]):
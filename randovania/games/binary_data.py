@@ -1,18 +1,17 @@
 import copy
+import functools
 from pathlib import Path
-from typing import TypeVar, BinaryIO, Dict, Any
+from typing import TypeVar, BinaryIO, Dict, Any, List
 
 import construct
 from construct import (Struct, Int32ub, Const, CString, Byte, Rebuild, Float32b, Flag,
-                       Short, PrefixedArray, Array, Switch, If, VarInt, Sequence, Float64b)
+                       Short, PrefixedArray, Switch, If, VarInt, Sequence, Float64b)
 
 from randovania.game_description.node import LoreType
 from randovania.games.game import RandovaniaGame
 
 X = TypeVar('X')
-current_format_version = 8
-
-_IMPOSSIBLE_SET = {"type": "or", "data": []}
+current_format_version = 9
 
 
 def _convert_to_raw_python(value) -> Any:
@@ -35,35 +34,120 @@ def _convert_to_raw_python(value) -> Any:
     return value
 
 
+def _requirement_key(requirement: Dict):
+    data = requirement["data"]
+    if requirement["type"] in ("and", "or"):
+        data = tuple(_requirement_key(item) for item in data)
+    elif isinstance(data, dict):
+        data = tuple(data.items())
+    return requirement["type"], data
+
+
+class _RequirementInterner:
+    """
+    Assigns an id to each distinct requirement, including the ones nested inside and/or.
+    Each requirement is stored as a flat entry: and/or refer to their items by id and templates by index.
+    Items always have a lower id than the and/or containing them.
+    """
+
+    def __init__(self, template_indices: Dict[str, int]):
+        self.template_indices = template_indices
+        self.entries = []
+        self._ids = {}
+
+    def id_for(self, requirement: Dict) -> int:
+        key = _requirement_key(requirement)
+        requirement_id = self._ids.get(key)
+        if requirement_id is None:
+            requirement_type = requirement["type"]
+            data = requirement["data"]
+            if requirement_type in ("and", "or"):
+                data = [self.id_for(item) for item in data]
+            elif requirement_type == "template":
+                data = self.template_indices[data]
+
+            requirement_id = self._ids[key] = len(self.entries)
+            self.entries.append({"type": requirement_type, "data": data})
+
+        return requirement_id
+
+
+def _decode_requirements(entries: List[Dict], template_names: List[str]) -> List[Dict]:
+    """
+    Converts the entries created by _RequirementInterner back to requirements.
+    Requirements used multiple times are the same dict.
+    :param entries:
+    :param template_names:
+    :return: The requirement of each id.
+    """
+    requirements = []
+    for entry in entries:
+        requirement_type = entry["type"]
+        data = entry["data"]
+        if requirement_type in ("and", "or"):
+            data = [requirements[item_id] for item_id in data]
+        elif requirement_type == "template":
+            data = template_names[data]
+        requirements.append({"type": requirement_type, "data": data})
+    return requirements
+
+
+@functools.lru_cache()
+def _compiled_construct_game() -> construct.Compiled:
+    # Compiling takes a fraction of the time it saves when parsing a full game
+    return ConstructGame.compile()
+
+
 def decode(binary_io: BinaryIO) -> Dict:
-    decoded = _convert_to_raw_python(ConstructGame.parse_stream(binary_io))
+    """
+    Decodes a binary game data file into the same format as the JSON database.
+    Identical requirements are stored only once in the file, so the decoded data shares the dict of
+    requirements that are used in multiple places.
+    :param binary_io:
+    :return:
+    """
+    decoded = _convert_to_raw_python(_compiled_construct_game().parse_stream(binary_io))
 
     decoded.pop("format_version")
     decoded.pop("magic_number")
     decoded["initial_states"] = dict(decoded["initial_states"])
-    decoded["resource_database"]["requirement_template"] = dict(decoded["resource_database"]["requirement_template"])
+
+    templates = decoded["resource_database"]["requirement_template"]
+    requirements = _decode_requirements(decoded.pop("requirements"), [name for name, _ in templates])
+
+    def requirement_for(requirement_id: int):
+        return requirements[requirement_id]
+
+    decoded["resource_database"]["requirement_template"] = {
+        name: requirement_for(requirement_id)
+        for name, requirement_id in templates
+    }
+
+    for weakness_list in decoded["dock_weakness_database"].values():
+        for weakness in weakness_list:
+            weakness["requirement"] = requirement_for(weakness.pop("requirement_id"))
+    decoded["victory_condition"] = requirement_for(decoded.pop("victory_condition_id"))
 
     for world in decoded["worlds"]:
         for area in world["areas"]:
+            nodes = area["nodes"]
 
-            for node in area["nodes"]:
+            for node in nodes:
+                connections = node.pop("connections")
                 data = node.pop("data")
                 if data is not None:
                     for key, value in data.items():
-                        node[key] = value
-                node["connections"] = {}
-
-            for i, connections in enumerate(area.pop("connections")):
-                node = area["nodes"][i]
-
-                j = 0
-                for connection in connections:
-                    if j == i:
-                        j += 1
-
-                    if connection != _IMPOSSIBLE_SET:
-                        node["connections"][area["nodes"][j]["name"]] = connection
-                    j += 1
+                        if key == "is_unlocked_id":
+                            node["is_unlocked"] = requirement_for(value)
+                        else:
+                            node[key] = value
+                node["connections"] = connections
+
+            for node in nodes:
+                node["connections"] = {
+                    nodes[connection["target"]]["name"]: requirement_for(connection["requirement_id"])
+                    for connection in node["connections"]
+                }
 
     fields = [
         "game",
@@ -92,29 +176,47 @@ def decode_file_path(binary_file_path: Path) -> Dict:
 def encode(original_data: Dict, x: BinaryIO) -> None:
     data = copy.deepcopy(original_data)
 
+    template_indices = {
+        name: i
+        for i, name in enumerate(data["resource_database"]["requirement_template"].keys())
+    }
+    interner = _RequirementInterner(template_indices)
+
+    for weakness_list in data["dock_weakness_database"].values():
+        for weakness in weakness_list:
+            weakness["requirement_id"] = interner.id_for(weakness.pop("requirement"))
+    data["victory_condition_id"] = interner.id_for(data.pop("victory_condition"))
+
     for world in data["worlds"]:
         for area in world["areas"]:
-            area["connections"] = [
-                [
-                    origin["connections"].get(target["name"], _IMPOSSIBLE_SET)
-                    for target in area["nodes"]
-                    if origin != target
-                ]
-                for origin in area["nodes"]
-            ]
+            node_indices = {node["name"]: i for i, node in enumerate(area["nodes"])}
 
             for i, node in enumerate(area["nodes"]):
-                node.pop("connections")
+                connections = [
+                    {
+                        "target": node_indices[target_name],
+                        "requirement_id": interner.id_for(requirement),
+                    }
+                    for target_name, requirement in node.pop("connections").items()
+                ]
+                if node["node_type"] == "player_ship":
+                    node["is_unlocked_id"] = interner.id_for(node.pop("is_unlocked"))
+
                 area["nodes"][i] = {
                     "name": node.pop("name"),
                     "heal": node.pop("heal"),
                     "coordinates": node.pop("coordinates"),
                     "node_type": node.pop("node_type"),
                     "data": node,
+                    "connections": connections,
                 }
 
-    data["resource_database"]["requirement_template"] = list(data["resource_database"]["requirement_template"].items())
+    data["resource_database"]["requirement_template"] = [
+        (name, interner.id_for(requirement))
+        for name, requirement in data["resource_database"]["requirement_template"].items()
+    ]
     data["initial_states"] = list(data["initial_states"].items())
+    data["requirements"] = interner.entries
 
     ConstructGame.build_stream(data, x)
 
@@ -123,7 +225,8 @@ def encode(original_data: Dict, x: BinaryIO) -> None:
     data.pop("resource_database")
     data.pop("dock_weakness_database")
     data.pop("worlds")
-    data.pop("victory_condition")
+    data.pop("victory_condition_id")
+    data.pop("requirements")
     data.pop("starting_location")
     data.pop("initial_states")
 
@@ -174,23 +277,24 @@ ConstructResourceRequirement = Struct(
     negate=Flag,
 )
 
-requirement_type_map = {
-    "resource": ConstructResourceRequirement,
-    "template": CString("utf8"),
-}
-
-ConstructRequirement = Struct(
+ConstructRequirementEntry = Struct(
     type=construct.Enum(Byte, resource=0, **{"and": 1, "or": 2}, template=3),
-    data=Switch(lambda this: this.type, requirement_type_map)
+    data=Switch(
+        construct.this.type,
+        {
+            "resource": ConstructResourceRequirement,
+            "and": PrefixedArray(VarInt, VarInt),
+            "or": PrefixedArray(VarInt, VarInt),
+            "template": VarInt,
+        }
+    )
 )
-requirement_type_map["and"] = PrefixedArray(VarInt, ConstructRequirement)
-requirement_type_map["or"] = PrefixedArray(VarInt, ConstructRequirement)
 
 ConstructDockWeakness = Struct(
     index=VarInt,
     name=CString("utf8"),
     is_blast_door=Flag,
-    requirement=ConstructRequirement,
+    requirement_id=VarInt,
 )
 
 ConstructResourceDatabase = Struct(
@@ -200,7 +304,7 @@ ConstructResourceDatabase = Struct(
     damage=PrefixedArray(VarInt, ConstructResourceInfo),
     versions=PrefixedArray(VarInt, ConstructResourceInfo),
     misc=PrefixedArray(VarInt, ConstructResourceInfo),
-    requirement_template=PrefixedArray(VarInt, Sequence(CString("utf8"), ConstructRequirement)),
+    requirement_template=PrefixedArray(VarInt, Sequence(CString("utf8"), VarInt)),
     damage_reductions=PrefixedArray(VarInt, ConstructDamageReductions),
     energy_tank_item_index=VarInt,
     item_percentage_index=OptionalValue(VarInt),
@@ -245,7 +349,7 @@ ConstructNode = Struct(
     node_type=construct.Enum(Byte, generic=0, dock=1, pickup=2, teleporter=3, event=4, translator_gate=5,
                              logbook=6, player_ship=7),
     data=Switch(
-        lambda this: this.node_type,
+        construct.this.node_type,
         {
             "dock": Struct(
                 dock_index=Byte,
@@ -279,24 +383,23 @@ ConstructNode = Struct(
                 extra=VarInt,
             ),
             "player_ship": Struct(
-                is_unlocked=ConstructRequirement,
+                is_unlocked_id=VarInt,
             )
         }
-    )
+    ),
+    connections=PrefixedArray(VarInt, Struct(
+        target=VarInt,
+        requirement_id=VarInt,
+    )),
 )
 
 ConstructArea = Struct(
     name=CString("utf8"),
     in_dark_aether=Flag,
     asset_id=VarInt,
-    _node_count=Rebuild(VarInt, construct.len_(construct.this.nodes)),
     default_node_index=OptionalValue(VarInt),
     valid_starting_location=Flag,
-    nodes=Array(lambda this: this._node_count, ConstructNode),
-    connections=Array(
-        lambda this: this._node_count,
-        Array(lambda this: this._node_count - 1, ConstructRequirement)
-    )
+    nodes=PrefixedArray(VarInt, ConstructNode),
 )
 
 ConstructWorld = Struct(
@@ -313,12 +416,13 @@ ConstructGame = Struct(
     format_version=Const(current_format_version, Int32ub),
     game=ConstructGameEnum,
     resource_database=ConstructResourceDatabase,
+    requirements=PrefixedArray(VarInt, ConstructRequirementEntry),
     dock_weakness_database=Struct(
         door=PrefixedArray(VarInt, ConstructDockWeakness),
         portal=PrefixedArray(VarInt, ConstructDockWeakness),
         morph_ball=PrefixedArray(VarInt, ConstructDockWeakness),
     ),
-    victory_condition=ConstructRequirement,
+    victory_condition_id=VarInt,
     starting_location=Struct(
         world_asset_id=VarInt,
         area_asset_id=VarInt,
@@ -27,6 +27,13 @@ class UnableToGenerate(RuntimeError):
     pass
 
 
+class UnableToProgress(UnableToGenerate):
+    """
+    The filler failed without making any meaningful progress, which is usually caused by the configuration
+    instead of by the rng.
+    """
+
+
 def should_have_hint(item_category: ItemCategory) -> bool:
     return item_category.is_major_category
 
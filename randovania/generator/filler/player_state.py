@@ -1,9 +1,12 @@
 import collections
+import itertools
+import math
 import re
-from typing import List, DefaultDict, Dict, FrozenSet, Tuple, Iterator, Set
+from typing import List, DefaultDict, Dict, FrozenSet, Tuple, Iterator, Set, AbstractSet, Mapping, Optional
 
 from randovania.game_description.assignment import PickupTarget
 from randovania.game_description.game_description import GameDescription
+from randovania.game_description.hint import Hint
 from randovania.game_description.resources.logbook_asset import LogbookAsset
 from randovania.game_description.resources.pickup_entry import PickupEntry
 from randovania.game_description.resources.pickup_index import PickupIndex
@@ -34,6 +37,14 @@ class PlayerState:
     _unfiltered_potential_actions: List[Action]
     num_random_starting_items_placed: int
     num_assigned_pickups: int
+    _uncollected_key: tuple
+    _uncollected_state: Optional[UncollectedState]
+    _index_weights_source: Optional[UncollectedState]
+    _index_weights: Dict[PickupIndex, float]
+    _cumulative_index_weights: Optional[Tuple[List[PickupIndex], List[float]]]
+    _index_group: Dict[PickupIndex, int]
+    _assigned_count_per_group: List[int]
+    _groups_to_reweight: Set[int]
 
     def __init__(self,
                  index: int,
@@ -55,6 +66,18 @@ class PlayerState:
         self.num_assigned_pickups = 0
         self.num_actions = 0
         self.indices_groups, self.all_indices = build_available_indices(game.world_list, configuration)
+        self._uncollected_key = ()
+        self._uncollected_state = None
+        self._index_weights_source = None
+        self._index_weights = {}
+        self._cumulative_index_weights = None
+        self._index_group = {
+            index: group
+            for group, indices in enumerate(self.indices_groups)
+            for index in indices
+        }
+        self._assigned_count_per_group = []
+        self._groups_to_reweight = set()
 
     def __repr__(self):
         return f"Player {self.index}"
@@ -64,6 +87,8 @@ class PlayerState:
         self._advance_pickup_index_seen_count()
         self._advance_scan_asset_seen_count()
         self._calculate_potential_actions()
+        # The seen counts changed
+        self._index_weights_source = None
 
     def _advance_pickup_index_seen_count(self):
         for pickup_index in self.reach.state.collected_pickup_indices:
@@ -106,13 +131,121 @@ class PlayerState:
                                                      self.reach.state.resource_database)
 
     def assign_pickup(self, pickup_index: PickupIndex, target: PickupTarget):
+        """
+        Assigns the given target to one of this player's indices.
+        The index is removed from `pickup_index_weights` right away, but the weights of the other indices only change
+        in the next `refresh_index_weights`.
+        :param pickup_index:
+        :param target:
+        :return:
+        """
         self.num_assigned_pickups += 1
+        uncollected = self._current_uncollected_state()
         self.reach.state.patches = self.reach.state.patches.assign_new_pickups([
             (pickup_index, target),
         ])
+        if uncollected is not None:
+            # The index is the only change to what's uncollected
+            self._replace_uncollected_state(uncollected, uncollected._replace(
+                indices=uncollected.indices - {pickup_index}))
+
+        if pickup_index in self._index_weights:
+            del self._index_weights[pickup_index]
+            indices, cumulative_weights = self._cumulative_index_weights
+            position = indices.index(pickup_index)
+            offset = cumulative_weights[position] - (cumulative_weights[position - 1] if position > 0 else 0)
+            self._cumulative_index_weights = (
+                indices[:position] + indices[position + 1:],
+                cumulative_weights[:position] + [weight - offset for weight in cumulative_weights[position + 1:]],
+            )
+
+        group = self._index_group.get(pickup_index)
+        if self._index_weights_source is not None and group is not None:
+            self._assigned_count_per_group[group] += 1
+            self._groups_to_reweight.add(group)
+
+    def assign_hint(self, logbook: LogbookAsset, hint: Hint):
+        uncollected = self._current_uncollected_state()
+        self.reach.state.patches = self.reach.state.patches.assign_hint(logbook, hint)
+        if uncollected is not None:
+            # The logbook is the only change to what's uncollected
+            self._replace_uncollected_state(uncollected, uncollected._replace(
+                logbooks=uncollected.logbooks - {logbook}))
+
+    def _uncollected_key_for_reach(self) -> tuple:
+        return self.reach, self.reach.state, self.reach.state.patches
+
+    def _current_uncollected_state(self) -> Optional[UncollectedState]:
+        key = self._uncollected_key_for_reach()
+        if len(key) != len(self._uncollected_key) or any(a is not b for a, b in zip(key, self._uncollected_key)):
+            return None
+        return self._uncollected_state
+
+    def _replace_uncollected_state(self, old: UncollectedState, new: UncollectedState):
+        self._uncollected_state = new
+        self._uncollected_key = self._uncollected_key_for_reach()
+        if self._index_weights_source is old:
+            self._index_weights_source = new
+
+    def uncollected_state(self) -> UncollectedState:
+        """
+        The UncollectedState of the current reach.
+        Only calculated again after the reach, its state or its patches are replaced, except by `assign_pickup` and
+        `assign_hint`, so it must not be modified.
+        :return:
+        """
+        uncollected = self._current_uncollected_state()
+        if uncollected is None:
+            uncollected = self._uncollected_state = UncollectedState.from_reach(self.reach)
+            self._uncollected_key = self._uncollected_key_for_reach()
+        return uncollected
+
+    def refresh_index_weights(self):
+        """
+        Updates the weights of the indices a pickup can be placed in.
+        All of them are calculated again after the uncollected state or the seen counts change, otherwise only the
+        weights of the worlds that had pickups assigned since the last refresh.
+        """
+        uncollected = self.uncollected_state()
+        if uncollected is not self._index_weights_source:
+            assigned_indices = set(self.reach.state.patches.pickup_assignment)
+            self._assigned_count_per_group = [len(assigned_indices & indices) for indices in self.indices_groups]
+            self._index_weights = _calculate_uncollected_index_weights(
+                self.all_indices & uncollected.indices,
+                self._assigned_count_per_group,
+                self.pickup_index_seen_count,
+                self.indices_groups,
+            )
+            self._index_weights_source = uncollected
+
+        elif self._groups_to_reweight:
+            for group in sorted(self._groups_to_reweight):
+                indices = self.indices_groups[group]
+                weight_from_collected_indices = _weight_from_collected_indices(
+                    len(indices), self._assigned_count_per_group[group])
+                for index in indices & self._index_weights.keys():
+                    self._index_weights[index] = weight_from_collected_indices * _weight_from_seen_count(
+                        self.pickup_index_seen_count[index])
+
+        elif self._cumulative_index_weights is not None:
+            return
+
+        self._groups_to_reweight.clear()
+        self._cumulative_index_weights = (list(self._index_weights.keys()),
+                                          list(itertools.accumulate(self._index_weights.values())))
+
+    def pickup_index_weights(self) -> Tuple[List[PickupIndex], List[float]]:
+        """
+        The weights of the uncollected indices a pickup can be placed in, not counting the weight of the player,
+        as of the last `refresh_index_weights` and without the indices assigned since. It must not be modified.
+        :return: The indices and their cumulative weights, in the same order.
+        """
+        if self._cumulative_index_weights is None:
+            self.refresh_index_weights()
+        return self._cumulative_index_weights
 
     def current_state_report(self) -> str:
-        state = UncollectedState.from_reach(self.reach)
+        state = self.uncollected_state()
         pickups_by_name_and_quantity = collections.defaultdict(int)
 
         _KEY_MATCH = re.compile(r"Key (\d+)")
@@ -135,6 +268,30 @@ class PlayerState:
         )
 
 
+def _weight_from_collected_indices(group_size: int, assigned_count: int) -> float:
+    return math.sqrt(group_size / ((1 + assigned_count) ** 2))
+
+
+def _weight_from_seen_count(seen_count: int) -> float:
+    return min(10, seen_count) ** -2
+
+
+def _calculate_uncollected_index_weights(uncollected_indices: AbstractSet[PickupIndex],
+                                         assigned_count_per_group: List[int],
+                                         seen_counts: Mapping[PickupIndex, int],
+                                         indices_groups: List[Set[PickupIndex]],
+                                         ) -> Dict[PickupIndex, float]:
+    result = {}
+
+    for indices, assigned_count in zip(indices_groups, assigned_count_per_group):
+        weight_from_collected_indices = _weight_from_collected_indices(len(indices), assigned_count)
+
+        for index in sorted(uncollected_indices & indices):
+            result[index] = weight_from_collected_indices * _weight_from_seen_count(seen_counts[index])
+
+    return result
+
+
 def world_indices_for_mode(world: World, randomization_mode: RandomizationMode) -> Iterator[PickupIndex]:
     if randomization_mode is RandomizationMode.FULL:
         yield from world.pickup_indices
@@ -1,9 +1,13 @@
+import bisect
+import contextlib
+import itertools
 import math
+import multiprocessing.pool
 import pprint
+import threading
 import typing
 from random import Random
-from typing import Tuple, Iterator, Set, AbstractSet, Dict, \
-    Mapping, FrozenSet, Callable, List, Optional
+from typing import Tuple, Iterator, Dict, FrozenSet, Callable, List, Optional, NamedTuple, Union
 
 from randovania.game_description.assignment import PickupTarget
 from randovania.game_description.game_description import GameDescription
@@ -14,11 +18,12 @@ from randovania.game_description.resources.pickup_entry import PickupEntry
 from randovania.game_description.resources.pickup_index import PickupIndex
 from randovania.generator.filler.action import Action, action_name
 from randovania.generator.filler.filler_library import UnableToGenerate, should_have_hint, UncollectedState, \
-    find_node_with_resource
+    find_node_with_resource, UnableToProgress
 from randovania.generator.filler.filler_logging import debug_print_collect_event
 from randovania.generator.filler.player_state import PlayerState
 from randovania.generator.generator_reach import GeneratorReach, advance_reach_with_possible_unsafe_resources, \
     advance_to_with_reach_copy
+from randovania.lib import profiling_lib
 from randovania.resolver import debug
 from randovania.resolver.random_lib import select_element_with_weight
 
@@ -26,31 +31,88 @@ _RESOURCES_WEIGHT_MULTIPLIER = 1
 _INDICES_WEIGHT_MULTIPLIER = 1
 _LOGBOOKS_WEIGHT_MULTIPLIER = 1
 _VICTORY_WEIGHT = 1000
-WeightedLocations = Dict[Tuple["PlayerState", PickupIndex], float]
+# Failing before this many actions were done means the generation never made meaningful progress
+EARLY_FAILURE_ACTIONS = 5
+# Steps with fewer actions are weighted in the current process, as sending them to the workers costs more
+_MINIMUM_ACTIONS_FOR_PROCESSES = 4
 
 
-def _calculate_reach_for_progression(reach: GeneratorReach,
-                                     progressions: Iterator[PickupEntry],
-                                     ) -> GeneratorReach:
-    return advance_to_with_reach_copy(reach, reach.state.assign_pickups_resources(progressions))
+class PickupPlacement(NamedTuple):
+    """Where a pickup was placed, with the random choices already made."""
+    pickup: PickupEntry
+    owner_index: Optional[int]
+    pickup_index: Optional[PickupIndex]
+    hint_location: Optional[LogbookAsset]
+
 
+class FillerStep(NamedTuple):
+    """
+    One iteration of the filler, with the random choices already made.
+    Either places some pickups for the player, or collects the event node with the given index.
+    """
+    player_index: int
+    placements: Tuple[PickupPlacement, ...]
+    event_node_index: Optional[int]
 
-def _calculate_uncollected_index_weights(uncollected_indices: AbstractSet[PickupIndex],
-                                         assigned_indices: AbstractSet[PickupIndex],
-                                         seen_counts: Mapping[PickupIndex, int],
-                                         indices_groups: List[Set[PickupIndex]],
-                                         ) -> Dict[PickupIndex, float]:
-    result = {}
 
-    for indices in indices_groups:
-        weight_from_collected_indices = math.sqrt(len(indices) / ((1 + len(assigned_indices & indices)) ** 2))
+class WeightedLocations:
+    """
+    The uncollected indices of all players where a pickup can be placed, with their weights.
+    Each PlayerState keeps its indices with cumulative weights, removing an index as soon as it's assigned, so
+    selecting one is a walk over the players followed by a binary search in that player's indices.
+    """
+    _player_states: List[PlayerState]
+    _player_weights: List[float]
+
+    def __init__(self, player_states: List[PlayerState]):
+        self._player_states = player_states
+        self._player_weights = []
+
+    def start_step(self):
+        """
+        Updates the weights of the players and of their indices for a new filler step.
+        During the step, assigning pickups only removes their indices.
+        """
+        total_assigned_pickups = sum(player_state.num_assigned_pickups for player_state in self._player_states)
+        self._player_weights = []
+        for player_state in self._player_states:
+            self._player_weights.append(1 + (total_assigned_pickups - player_state.num_assigned_pickups))
+            player_state.refresh_index_weights()
+
+    def __len__(self):
+        return sum(len(player_state.pickup_index_weights()[0]) for player_state in self._player_states)
+
+    def select(self, rng: Random) -> Tuple[PlayerState, PickupIndex]:
+        """
+        Selects one of the locations, with chances proportional to their weights.
+        Uses the rng the same way as `select_element_with_weight`.
+        :param rng:
+        :return:
+        """
+        non_empty = [
+            (player_state, player_weight, *player_state.pickup_index_weights())
+            for player_state, player_weight in zip(self._player_states, self._player_weights)
+            if player_state.pickup_index_weights()[0]
+        ]
+        total = sum(player_weight * cumulative_weights[-1] for _, player_weight, _, cumulative_weights in non_empty)
+        target = rng.random() * total
 
-        for index in sorted(uncollected_indices & indices):
-            weight_from_seen_count = min(10, seen_counts[index]) ** -2
-            result[index] = weight_from_collected_indices * weight_from_seen_count
-            # print(f"## {index} : {weight_from_collected_indices} ___ {weight_from_seen_count}")
+        for player_state, player_weight, indices, cumulative_weights in non_empty:
+            player_total = player_weight * cumulative_weights[-1]
+            if target < player_total:
+                position = bisect.bisect_right(cumulative_weights, target / player_weight, 0, len(indices) - 1)
+                return player_state, indices[position]
+            target -= player_total
 
-    return result
+        # Rounding errors made the target go past the last location
+        player_state, _, indices, _ = non_empty[-1]
+        return player_state, indices[-1]
+
+
+def _calculate_reach_for_progression(reach: GeneratorReach,
+                                     progressions: Iterator[PickupEntry],
+                                     ) -> GeneratorReach:
+    return advance_to_with_reach_copy(reach, reach.state.assign_pickups_resources(progressions))
 
 
 def _get_next_player(rng: Random, player_states: List[PlayerState], num_indices: int) -> Optional[PlayerState]:
@@ -62,7 +124,7 @@ def _get_next_player(rng: Random, player_states: List[PlayerState], num_indices:
     :return:
     """
     all_uncollected: Dict[PlayerState, UncollectedState] = {
-        player_state: UncollectedState.from_reach(player_state.reach)
+        player_state: player_state.uncollected_state()
         for player_state in player_states
     }
 
@@ -88,20 +150,190 @@ def _get_next_player(rng: Random, player_states: List[PlayerState], num_indices:
             return None
         else:
             total_actions = sum(player_state.num_actions for player_state in player_states)
-            raise UnableToGenerate(f"No players with possible actions after {total_actions} total actions.")
+            error_type = UnableToProgress if total_actions < EARLY_FAILURE_ACTIONS else UnableToGenerate
+            raise error_type(f"No players with possible actions after {total_actions} total actions.")
+
+
+def _calculate_action_weight(player_state: PlayerState, action: Action,
+                             current_uncollected: UncollectedState) -> float:
+    if isinstance(action, tuple):
+        pickups = typing.cast(Tuple[PickupEntry, ...], action)
+        base_weight = _calculate_weights_for(_calculate_reach_for_progression(player_state.reach, pickups),
+                                             current_uncollected)
+
+        multiplier = sum(pickup.probability_multiplier for pickup in pickups) / len(pickups)
+        offset = sum(pickup.probability_offset for pickup in pickups)
+        return (base_weight * multiplier + offset) / len(pickups)
+
+    else:
+        return _calculate_weights_for(
+            advance_to_with_reach_copy(player_state.reach, player_state.reach.state.act_on_node(action)),
+            current_uncollected)
+
+
+def _player_with_index(player_states: List[PlayerState], index: int) -> PlayerState:
+    return next(player_state for player_state in player_states if player_state.index == index)
+
+
+def _apply_pickup_placement(placement: PickupPlacement, current_player: PlayerState,
+                            player_states: List[PlayerState]):
+    action = placement.pickup
+
+    if placement.owner_index is not None:
+        index_owner_state = _player_with_index(player_states, placement.owner_index)
+        index_owner_state.assign_pickup(placement.pickup_index, PickupTarget(action, current_player.index))
+
+        if placement.hint_location is not None:
+            index_owner_state.assign_hint(placement.hint_location,
+                                          Hint(HintType.LOCATION, None, placement.pickup_index))
+
+        if placement.pickup_index in index_owner_state.reach.state.collected_pickup_indices:
+            current_player.reach.advance_to(current_player.reach.state.assign_pickup_resources(action))
+        else:
+            # FIXME: isn't that condition always true?
+            pass
+
+    else:
+        current_player.num_random_starting_items_placed += 1
+        if (current_player.num_random_starting_items_placed
+                > current_player.configuration.maximum_random_starting_items):
+            raise UnableToGenerate("Attempting to place more extra starting items than the number allowed.")
+        current_player.reach.advance_to(current_player.reach.state.assign_pickup_to_starting_items(action))
+
+    # TODO: this item is potentially dangerous and we should remove the invalidated paths
+    current_player.pickups_left.remove(action)
+    current_player.num_actions += 1
+
+
+def _finish_step(current_player: PlayerState):
+    current_player.reach = advance_reach_with_possible_unsafe_resources(current_player.reach)
+    current_player.update_for_new_state()
+
+
+def _replay_step(step: FillerStep, player_states: List[PlayerState]):
+    current_player = _player_with_index(player_states, step.player_index)
+    if step.event_node_index is None:
+        for placement in step.placements:
+            _apply_pickup_placement(placement, current_player, player_states)
+    else:
+        current_player.reach.act_on(current_player.game.world_list.all_nodes[step.event_node_index])
+    _finish_step(current_player)
 
 
+WorkerAction = Union[Tuple[PickupEntry, ...], int]
+
+_worker_player_states: Optional[List[PlayerState]] = None
+_worker_steps_applied = 0
+_worker_barrier: Optional[threading.Barrier] = None
+
+
+def _initialize_worker(barrier: threading.Barrier, create_player_states: Callable[..., List[PlayerState]], *args):
+    global _worker_player_states, _worker_steps_applied, _worker_barrier
+    _worker_player_states = create_player_states(*args)
+    _worker_steps_applied = 0
+    _worker_barrier = barrier
+    for player_state in _worker_player_states:
+        player_state.update_for_new_state()
+
+
+def _calculate_action_weights_in_worker(first_step: int, new_steps: Tuple[FillerStep, ...], player_index: int,
+                                        actions: List[WorkerAction]) -> List[float]:
+    global _worker_steps_applied
+    assert first_step <= _worker_steps_applied, f"Missing steps {_worker_steps_applied} to {first_step}"
+    for step in new_steps[_worker_steps_applied - first_step:]:
+        _replay_step(step, _worker_player_states)
+    _worker_steps_applied = first_step + len(new_steps)
+
+    # Each process must take exactly one task of each batch, so all of them see the new steps
+    _worker_barrier.wait()
+
+    player_state = _player_with_index(_worker_player_states, player_index)
+    all_nodes = player_state.game.world_list.all_nodes
+    current_uncollected = player_state.uncollected_state()
+    return [
+        _calculate_action_weight(player_state, all_nodes[action] if isinstance(action, int) else action,
+                                 current_uncollected)
+        for action in actions
+    ]
+
+
+class FillerPool:
+    """
+    Weights the actions of the filler in other processes.
+    Each process has its own copy of every player's state, which is kept up to date by replaying the steps of the
+    filler, so neither the game nor the reach are ever sent to them.
+    Each step is sent to every process once, with the first batch of weights after it.
+    """
+    pool: multiprocessing.pool.Pool
+    process_count: int
+    steps: List[FillerStep]
+    _steps_sent: int
+
+    def __init__(self, pool: multiprocessing.pool.Pool, process_count: int):
+        self.pool = pool
+        self.process_count = process_count
+        self.steps = []
+        self._steps_sent = 0
+
+    def add_step(self, step: FillerStep):
+        self.steps.append(step)
+
+    def calculate_action_weights(self, player_state: PlayerState, actions: List[Action]) -> List[float]:
+        """
+        Calculates the weight of each action in the processes, split evenly between them.
+        There's one task for each process, even when there's fewer actions, as all of them must get the new steps.
+        The weights are returned in the same order as the actions, regardless of which process finished first.
+        :param player_state:
+        :param actions:
+        :return:
+        """
+        worker_actions = [action if isinstance(action, tuple) else action.index for action in actions]
+        chunk_size = math.ceil(len(actions) / self.process_count)
+        new_steps = tuple(self.steps[self._steps_sent:])
+
+        results = self.pool.starmap(_calculate_action_weights_in_worker, [
+            (self._steps_sent, new_steps, player_state.index, worker_actions[i * chunk_size:(i + 1) * chunk_size])
+            for i in range(self.process_count)
+        ], chunksize=1)
+        self._steps_sent = len(self.steps)
+        return list(itertools.chain.from_iterable(results))
+
+
+@contextlib.contextmanager
+def create_filler_pool(process_count: int, create_player_states: Callable[..., List[PlayerState]],
+                       *args) -> Iterator[Optional[FillerPool]]:
+    """
+    Creates a FillerPool with the given number of processes, or None when it's not more than 1.
+    The processes are spawned, so it's safe to use with an event loop or threads running.
+    :param process_count:
+    :param create_player_states: A module level function, creating the same player states given to the filler.
+    :param args: Picklable arguments for create_player_states.
+    :return:
+    """
+    if process_count <= 1:
+        yield None
+        return
+
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(processes=process_count, initializer=_initialize_worker,
+                      initargs=(context.Barrier(process_count), create_player_states, *args)) as pool:
+        yield FillerPool(pool, process_count)
+
+
+@profiling_lib.timed("retcon.weighted_potential_actions")
 def weighted_potential_actions(player_state: PlayerState, status_update: Callable[[str], None],
-                               num_available_indices: int) -> Dict[Action, float]:
+                               num_available_indices: int, pool: Optional[FillerPool] = None) -> Dict[Action, float]:
     """
     Weights all potential actions based on current criteria.
     :param player_state:
     :param status_update:
     :param num_available_indices: The number of indices available for placement.
+    :param pool: When given, steps with enough actions are weighted in its processes.
+    The result is the same as with a single process.
     :return:
     """
     actions_weights: Dict[Action, float] = {}
-    current_uncollected = UncollectedState.from_reach(player_state.reach)
+    current_uncollected = player_state.uncollected_state()
 
     actions = player_state.potential_actions(num_available_indices)
     options_considered = 0
@@ -111,21 +343,12 @@ def weighted_potential_actions(player_state: PlayerState, status_update: Callabl
         options_considered += 1
         status_update("Checked {} of {} options.".format(options_considered, len(actions)))
 
-    for action in actions:
-        if isinstance(action, tuple):
-            pickups = typing.cast(Tuple[PickupEntry, ...], action)
-            base_weight = _calculate_weights_for(_calculate_reach_for_progression(player_state.reach, pickups),
-                                                 current_uncollected)
-
-            multiplier = sum(pickup.probability_multiplier for pickup in pickups) / len(pickups)
-            offset = sum(pickup.probability_offset for pickup in pickups)
-            weight = (base_weight * multiplier + offset) / len(pickups)
-
-        else:
-            weight = _calculate_weights_for(
-                advance_to_with_reach_copy(player_state.reach, player_state.reach.state.act_on_node(action)),
-                current_uncollected)
+    if pool is not None and len(actions) >= _MINIMUM_ACTIONS_FOR_PROCESSES:
+        weights = pool.calculate_action_weights(player_state, actions)
+    else:
+        weights = (_calculate_action_weight(player_state, action, current_uncollected) for action in actions)
 
+    for action, weight in zip(actions, weights):
         actions_weights[action] = weight
         update_for_option()
 
@@ -139,12 +362,15 @@ def weighted_potential_actions(player_state: PlayerState, status_update: Callabl
 def retcon_playthrough_filler(rng: Random,
                               player_states: List[PlayerState],
                               status_update: Callable[[str], None],
+                              pool: Optional[FillerPool] = None,
                               ) -> Tuple[Dict[PlayerState, GamePatches], Tuple[str, ...]]:
     """
     Runs the retcon logic.
     :param rng:
     :param player_states:
     :param status_update:
+    :param pool: Used for weighting the actions of each step in other processes. Its workers must have been
+    created with the same player states.
     :return: A GamePatches for each player and a sequence of placed items.
     """
     debug.debug_print("{}\nRetcon filler started with major items:\n{}".format(
@@ -167,16 +393,21 @@ def retcon_playthrough_filler(rng: Random,
 
     for player_state in player_states:
         player_state.update_for_new_state()
+        # Only the player's own actions change its reach, so it'll never be able to do anything
+        if not player_state.victory_condition_satisfied() and not player_state.potential_actions(math.inf):
+            raise UnableToProgress(f"{player_state} has no possible actions at the start.")
 
     actions_log = []
+    all_locations_weighted = WeightedLocations(player_states)
 
     while True:
-        all_locations_weighted = _calculate_all_pickup_indices_weight(player_states)
+        all_locations_weighted.start_step()
         current_player = _get_next_player(rng, player_states, len(all_locations_weighted))
         if current_player is None:
             break
 
-        weighted_actions = weighted_potential_actions(current_player, action_report, len(all_locations_weighted))
+        weighted_actions = weighted_potential_actions(current_player, action_report, len(all_locations_weighted),
+                                                      pool)
         try:
             action = select_element_with_weight(weighted_actions, rng=rng)
         except StopIteration:
@@ -189,16 +420,15 @@ def retcon_playthrough_filler(rng: Random,
             rng.shuffle(new_pickups)
 
             debug.debug_print(f"\n>>> Will place {len(new_pickups)} pickups")
+            placements = []
             for new_pickup in new_pickups:
-                log_entry = _assign_pickup_somewhere(new_pickup, current_player, player_states, rng,
-                                                     all_locations_weighted)
+                log_entry, placement = _assign_pickup_somewhere(new_pickup, current_player, player_states, rng,
+                                                                all_locations_weighted)
+                placements.append(placement)
                 actions_log.append(log_entry)
                 debug.debug_print(f"* {log_entry}")
 
-                # TODO: this item is potentially dangerous and we should remove the invalidated paths
-                current_player.pickups_left.remove(new_pickup)
-                current_player.num_actions += 1
-
+            step = FillerStep(current_player.index, tuple(placements), None)
             count_pickups_left = sum(len(player_state.pickups_left) for player_state in player_states)
             last_message = "{} items left.".format(count_pickups_left)
             status_update(last_message)
@@ -210,9 +440,11 @@ def retcon_playthrough_filler(rng: Random,
 
             # This action is potentially dangerous. Use `act_on` to remove invalid paths
             current_player.reach.act_on(action)
+            step = FillerStep(current_player.index, (), action.index)
 
-        current_player.reach = advance_reach_with_possible_unsafe_resources(current_player.reach)
-        current_player.update_for_new_state()
+        _finish_step(current_player)
+        if pool is not None:
+            pool.add_step(step)
 
     all_patches = {player_state: player_state.reach.state.patches for player_state in player_states}
     return all_patches, tuple(actions_log)
@@ -223,86 +455,46 @@ def _assign_pickup_somewhere(action: PickupEntry,
                              player_states: List[PlayerState],
                              rng: Random,
                              all_locations_weighted: WeightedLocations,
-                             ) -> str:
+                             ) -> Tuple[str, PickupPlacement]:
     """
     Assigns a PickupEntry to a free, collected PickupIndex or as a starting item.
     :param action:
     :param current_player:
     :param player_states:
     :param rng:
-    :return:
+    :return: The spoiler entry and how the pickup was placed.
     """
     assert action in current_player.pickups_left
 
     if all_locations_weighted and (current_player.num_random_starting_items_placed
                                    >= current_player.configuration.minimum_random_starting_items):
 
-        index_owner_state, pickup_index = select_element_with_weight(all_locations_weighted, rng)
-        index_owner_state.assign_pickup(pickup_index, PickupTarget(action, current_player.index))
-        all_locations_weighted.pop((index_owner_state, pickup_index))
+        index_owner_state, pickup_index = all_locations_weighted.select(rng)
 
-        # Place a hint for the new item
+        # Place a hint for the new item. Assigning the pickup doesn't change which logbooks are uncollected.
         hint_location = _calculate_hint_location_for_action(
             action,
-            UncollectedState.from_reach(index_owner_state.reach),
+            index_owner_state.uncollected_state(),
             pickup_index,
             rng,
             index_owner_state.scan_asset_initial_pickups,
         )
-        if hint_location is not None:
-            index_owner_state.reach.state.patches = index_owner_state.reach.state.patches.assign_hint(
-                hint_location, Hint(HintType.LOCATION, None, pickup_index))
-
-        if pickup_index in index_owner_state.reach.state.collected_pickup_indices:
-            current_player.reach.advance_to(current_player.reach.state.assign_pickup_resources(action))
-        else:
-            # FIXME: isn't that condition always true?
-            pass
+        placement = PickupPlacement(action, index_owner_state.index, pickup_index, hint_location)
+        _apply_pickup_placement(placement, current_player, player_states)
 
         spoiler_entry = pickup_placement_spoiler_entry(current_player.index, action, index_owner_state.game,
                                                        pickup_index, hint_location, index_owner_state.index,
                                                        len(player_states) > 1)
 
     else:
-        current_player.num_random_starting_items_placed += 1
-        if (current_player.num_random_starting_items_placed
-                > current_player.configuration.maximum_random_starting_items):
-            raise UnableToGenerate("Attempting to place more extra starting items than the number allowed.")
+        placement = PickupPlacement(action, None, None, None)
+        _apply_pickup_placement(placement, current_player, player_states)
 
         spoiler_entry = f"{action.name} as starting item"
         if len(player_states) > 1:
             spoiler_entry += f" for Player {current_player.index + 1}"
-        current_player.reach.advance_to(current_player.reach.state.assign_pickup_to_starting_items(action))
-
-    return spoiler_entry
-
-
-def _calculate_all_pickup_indices_weight(player_states: List[PlayerState]) -> WeightedLocations:
-    all_weights = {}
-
-    total_assigned_pickups = sum(player_state.num_assigned_pickups for player_state in player_states)
-
-    # print("================ WEIGHTS! ==================")
-    for player_state in player_states:
-        delta = (total_assigned_pickups - player_state.num_assigned_pickups)
-        player_weight = 1 + delta
-
-        # print(f"** Player {player_state.index} -- {player_weight}")
-
-        pickup_index_weights = _calculate_uncollected_index_weights(
-            player_state.all_indices & UncollectedState.from_reach(player_state.reach).indices,
-            set(player_state.reach.state.patches.pickup_assignment),
-            player_state.pickup_index_seen_count,
-            player_state.indices_groups,
-        )
-        for pickup_index, weight in pickup_index_weights.items():
-            all_weights[(player_state, pickup_index)] = weight * player_weight
-
-    # for (player_state, pickup_index), weight in all_weights.items():
-    #     print(f"> {player_state.index} - {pickup_index}: {weight}")
-    # print("============================================")
 
-    return all_weights
+    return spoiler_entry, placement
 
 
 def _calculate_hint_location_for_action(action: PickupEntry,
@@ -3,7 +3,7 @@ import dataclasses
 from random import Random
 from typing import List, Tuple, Callable, TypeVar, Set, Dict, FrozenSet, Union, Iterator, Optional
 
-from randovania.game_description import node_search
+from randovania.game_description import node_search, default_database
 from randovania.game_description.area import Area
 from randovania.game_description.game_description import GameDescription
 from randovania.game_description.game_patches import GamePatches
@@ -19,8 +19,9 @@ from randovania.games.game import RandovaniaGame
 from randovania.generator.filler.filler_configuration import FillerConfiguration
 from randovania.generator.filler.filler_library import should_have_hint, UnableToGenerate
 from randovania.generator.filler.player_state import PlayerState
-from randovania.generator.filler.retcon import retcon_playthrough_filler
+from randovania.generator.filler.retcon import retcon_playthrough_filler, create_filler_pool
 from randovania.layout.echoes_configuration import EchoesConfiguration
+from randovania.lib import profiling_lib
 from randovania.resolver import bootstrap, debug, random_lib
 
 T = TypeVar("T")
@@ -318,9 +319,45 @@ class FillerResults:
     action_log: Tuple[str, ...]
 
 
+def _create_player_state(index: int, configuration: EchoesConfiguration, game: GameDescription,
+                         patches: GamePatches, major_items: List[PickupEntry]) -> PlayerState:
+    with profiling_lib.phase("logic_bootstrap"):
+        new_game, state = bootstrap.logic_bootstrap(configuration, game, patches)
+
+    major_configuration = configuration.major_items_configuration
+    return PlayerState(
+        index=index,
+        game=new_game,
+        initial_state=state,
+        pickups_left=major_items,
+        configuration=FillerConfiguration(
+            randomization_mode=configuration.available_locations.randomization_mode,
+            minimum_random_starting_items=major_configuration.minimum_random_starting_items,
+            maximum_random_starting_items=major_configuration.maximum_random_starting_items,
+            indices_to_exclude=configuration.available_locations.excluded_indices,
+            multi_pickup_placement=configuration.multi_pickup_placement,
+        ),
+    )
+
+
+def _create_worker_player_states(players: List[Tuple[int, EchoesConfiguration, GamePatches, List[PickupEntry]]],
+                                 ) -> List[PlayerState]:
+    """
+    Creates the player states in a filler worker, with the game of each configuration from the default database.
+    :param players: The index, configuration, patches and major items of each player.
+    :return:
+    """
+    return [
+        _create_player_state(index, configuration, default_database.shared_game_description_for(configuration.game),
+                             patches, major_items)
+        for index, configuration, patches, major_items in players
+    ]
+
+
 async def run_filler(rng: Random,
                      player_pools: Dict[int, PlayerPool],
                      status_update: Callable[[str], None],
+                     process_count: int = 1,
                      ) -> FillerResults:
     """
     Runs the filler logic for the given configuration and item pool.
@@ -330,10 +367,13 @@ async def run_filler(rng: Random,
     :param player_pools:
     :param rng:
     :param status_update:
+    :param process_count: How many processes the filler can use for weighting actions. The processes use the game
+    of each configuration from the default database.
     :return:
     """
 
     player_states = []
+    worker_players = []
     player_expansions: Dict[int, List[PickupEntry]] = {}
 
     for index, pool in player_pools.items():
@@ -345,25 +385,15 @@ async def run_filler(rng: Random,
         rng.shuffle(major_items)
         rng.shuffle(player_expansions[index])
 
-        new_game, state = bootstrap.logic_bootstrap(pool.configuration, pool.game, pool.patches)
-
-        major_configuration = pool.configuration.major_items_configuration
-        player_states.append(PlayerState(
-            index=index,
-            game=new_game,
-            initial_state=state,
-            pickups_left=major_items,
-            configuration=FillerConfiguration(
-                randomization_mode=pool.configuration.available_locations.randomization_mode,
-                minimum_random_starting_items=major_configuration.minimum_random_starting_items,
-                maximum_random_starting_items=major_configuration.maximum_random_starting_items,
-                indices_to_exclude=pool.configuration.available_locations.excluded_indices,
-                multi_pickup_placement=pool.configuration.multi_pickup_placement,
-            ),
-        ))
+        player_states.append(_create_player_state(index, pool.configuration, pool.game, pool.patches,
+                                                  major_items))
+        worker_players.append((index, pool.configuration, pool.patches, list(major_items)))
 
     try:
-        filler_result, actions_log = retcon_playthrough_filler(rng, player_states, status_update=status_update)
+        with create_filler_pool(process_count, _create_worker_player_states, worker_players) as filler_pool, \
+                profiling_lib.phase("filler"):
+            filler_result, actions_log = retcon_playthrough_filler(rng, player_states, status_update=status_update,
+                                                                  pool=filler_pool)
     except UnableToGenerate as e:
         message = "{}\n\n{}".format(
             str(e),
@@ -373,24 +403,25 @@ async def run_filler(rng: Random,
             ),
         )
         debug.debug_print(message)
-        raise UnableToGenerate(message) from e
+        raise type(e)(message) from e
 
     results = {}
 
     for player_state, patches in filler_result.items():
         game = player_state.game
 
-        if game.game == RandovaniaGame.PRIME2:
-            # Since we haven't added expansions yet, these hints will always be for items added by the filler.
-            full_hints_patches = fill_unassigned_hints(patches, game.world_list, rng,
-                                                       player_state.scan_asset_initial_pickups)
+        with profiling_lib.phase("hints"):
+            if game.game == RandovaniaGame.PRIME2:
+                # Since we haven't added expansions yet, these hints will always be for items added by the filler.
+                full_hints_patches = fill_unassigned_hints(patches, game.world_list, rng,
+                                                           player_state.scan_asset_initial_pickups)
 
-            if player_pools[player_state.index].configuration.hints.item_hints:
-                result = add_hints_precision(player_state, full_hints_patches, rng)
+                if player_pools[player_state.index].configuration.hints.item_hints:
+                    result = add_hints_precision(player_state, full_hints_patches, rng)
+                else:
+                    result = replace_hints_without_precision_with_jokes(full_hints_patches)
             else:
-                result = replace_hints_without_precision_with_jokes(full_hints_patches)
-        else:
-            result = patches
+                result = patches
 
         results[player_state.index] = FillerPlayerResult(
             game=game,
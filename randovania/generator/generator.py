@@ -1,4 +1,5 @@
 import asyncio
+import dataclasses
 from random import Random
 from typing import Optional, Callable, List, Dict
 
@@ -11,15 +12,18 @@ from randovania.game_description.game_description import GameDescription
 from randovania.game_description.game_patches import GamePatches
 from randovania.game_description.resources.pickup_entry import PickupEntry
 from randovania.game_description.world_list import WorldList
+from randovania.games.game import RandovaniaGame
 from randovania.generator import base_patches_factory
-from randovania.generator.filler.filler_library import filter_unassigned_pickup_nodes, UnableToGenerate
+from randovania.generator.filler.filler_library import filter_unassigned_pickup_nodes, UnableToGenerate, \
+    UnableToProgress
 from randovania.generator.filler.runner import run_filler, FillerPlayerResult, PlayerPool, FillerResults
-from randovania.generator.item_pool import pool_creator
+from randovania.generator.item_pool import pool_creator, PoolResults
 from randovania.layout.available_locations import RandomizationMode
 from randovania.layout.echoes_configuration import EchoesConfiguration
 from randovania.layout.layout_description import LayoutDescription
 from randovania.layout.permalink import Permalink
 from randovania.layout.preset import Preset
+from randovania.lib import profiling_lib
 from randovania.resolver import resolver
 from randovania.resolver.exceptions import GenerationFailure, InvalidConfiguration, ImpossibleForSolver
 
@@ -33,14 +37,53 @@ def _validate_item_pool_size(item_pool: List[PickupEntry], game: GameDescription
                 len(item_pool), game.world_list.num_pickup_nodes, min_starting_items))
 
 
+@dataclasses.dataclass(frozen=True)
+class PresetBootstrap:
+    """
+    The parts of creating a PlayerPool that don't depend on the rng, shared by all seeds of the same configuration.
+    """
+    configuration: EchoesConfiguration
+    game: GameDescription
+    pool_results: PoolResults
+
+
+_MAX_PRESET_BOOTSTRAPS = 8
+_preset_bootstraps: List[PresetBootstrap] = []
+
+
+def preset_bootstrap_for(configuration: EchoesConfiguration) -> PresetBootstrap:
+    """
+    Gets the PresetBootstrap for the given configuration, creating it if the configuration wasn't used recently.
+    :param configuration:
+    :return:
+    """
+    # Configurations aren't hashable, but comparing them is cheap compared to creating a bootstrap
+    for i, bootstrap in enumerate(_preset_bootstraps):
+        if bootstrap.configuration == configuration:
+            _preset_bootstraps.append(_preset_bootstraps.pop(i))
+            return bootstrap
+
+    # Never modified: logic_bootstrap only creates patched copies of it, which are cached by its WorldList
+    game = default_database.shared_game_description_for(configuration.game)
+    bootstrap = PresetBootstrap(
+        configuration=configuration,
+        game=game,
+        pool_results=pool_creator.calculate_pool_results(configuration, game.resource_database),
+    )
+    _preset_bootstraps.append(bootstrap)
+    del _preset_bootstraps[:-_MAX_PRESET_BOOTSTRAPS]
+    return bootstrap
+
+
 def create_player_pool(rng: Random, configuration: EchoesConfiguration,
                        player_index: int, num_players: int) -> PlayerPool:
-    game = default_database.game_description_for(configuration.game)
+    preset_bootstrap = preset_bootstrap_for(configuration)
+    game = preset_bootstrap.game
     base_patches = base_patches_factory.create_base_patches(configuration, rng, game, num_players > 1,
                                                             player_index=player_index)
 
-    item_pool, pickup_assignment, initial_items = pool_creator.calculate_pool_results(configuration,
-                                                                                      game.resource_database)
+    item_pool, pickup_assignment, initial_items = preset_bootstrap.pool_results
+    item_pool = list(item_pool)
     target_assignment = {
         index: PickupTarget(pickup, player_index)
         for index, pickup in pickup_assignment.items()
@@ -102,28 +145,65 @@ def _assign_remaining_items(rng: Random,
     return assignment
 
 
+# Retrying after failing this many times without making progress is most likely a waste of time
+MAX_EARLY_FAILURES = 3
+
+# How many generations were attempted by this process, including retries. Works without profiling.
+_generation_attempts = 0
+
+
+def generation_attempts() -> int:
+    """
+    How many times this process attempted to generate a game, including retries.
+    :return:
+    """
+    return _generation_attempts
+
+
+class _StopAfterEarlyFailures(tenacity.stop.stop_base):
+    """
+    Stops retrying after the given number of attempts failed with UnableToProgress, as it's unlikely that
+    the configuration can be generated at all.
+    """
+
+    def __init__(self, max_early_failures: int):
+        self.max_early_failures = max_early_failures
+        self.early_failures = 0
+
+    def __call__(self, retry_state: tenacity.RetryCallState) -> bool:
+        if isinstance(retry_state.outcome.exception(), UnableToProgress):
+            self.early_failures += 1
+        return self.early_failures >= self.max_early_failures
+
+
 async def _create_pools_and_fill(rng: Random,
                                  presets: Dict[int, Preset],
                                  status_update: Callable[[str], None],
+                                 process_count: int = 1,
                                  ) -> FillerResults:
     """
     Runs the rng-dependant parts of the generation, with retries
     :param rng:
     :param presets:
     :param status_update:
+    :param process_count:
     :return:
     """
+    global _generation_attempts
+    _generation_attempts += 1
+    profiling_lib.increment("generation_attempts")
     player_pools: Dict[int, PlayerPool] = {}
 
-    for player_index, player_preset in presets.items():
-        status_update(f"Creating item pool for player {player_index + 1}")
-        player_pools[player_index] = create_player_pool(rng, player_preset.configuration, player_index,
-                                                        len(presets))
+    with profiling_lib.phase("pool_creation"):
+        for player_index, player_preset in presets.items():
+            status_update(f"Creating item pool for player {player_index + 1}")
+            player_pools[player_index] = create_player_pool(rng, player_preset.configuration, player_index,
+                                                            len(presets))
 
     for player_pool in player_pools.values():
         _validate_item_pool_size(player_pool.pickups, player_pool.game, player_pool.configuration)
 
-    return await run_filler(rng, player_pools, status_update)
+    return await run_filler(rng, player_pools, status_update, process_count)
 
 
 def _distribute_remaining_items(rng: Random,
@@ -166,10 +246,12 @@ def _distribute_remaining_items(rng: Random,
 async def _create_description(permalink: Permalink,
                               status_update: Callable[[str], None],
                               attempts: int,
+                              process_count: int = 1,
                               ) -> LayoutDescription:
     """
     :param permalink:
     :param status_update:
+    :param process_count:
     :return:
     """
     rng = Random(permalink.as_bytes)
@@ -180,14 +262,15 @@ async def _create_description(permalink: Permalink,
     }
 
     retrying = tenacity.AsyncRetrying(
-        stop=tenacity.stop_after_attempt(attempts),
+        stop=tenacity.stop_after_attempt(attempts) | _StopAfterEarlyFailures(MAX_EARLY_FAILURES),
         retry=tenacity.retry_if_exception_type(UnableToGenerate),
         reraise=True
     )
 
-    filler_results = await retrying(_create_pools_and_fill, rng, presets, status_update)
+    filler_results = await retrying(_create_pools_and_fill, rng, presets, status_update, process_count)
 
-    all_patches = _distribute_remaining_items(rng, filler_results.player_results)
+    with profiling_lib.phase("distribute_remaining_items"):
+        all_patches = _distribute_remaining_items(rng, filler_results.player_results)
     return LayoutDescription(
         permalink=permalink,
         version=VERSION,
@@ -201,6 +284,7 @@ async def generate_and_validate_description(permalink: Permalink,
                                             validate_after_generation: bool,
                                             timeout: Optional[int] = 600,
                                             attempts: int = 15,
+                                            process_count: int = 1,
                                             ) -> LayoutDescription:
     """
     Creates a LayoutDescription for the given Permalink.
@@ -209,6 +293,8 @@ async def generate_and_validate_description(permalink: Permalink,
     :param validate_after_generation:
     :param timeout: Abort generation after this many seconds.
     :param attempts: Attempt this many generations.
+    :param process_count: How many processes to use for weighting the possible actions of each filler step.
+    The generated game is the same regardless of how many are used.
     :return:
     """
     if status_update is None:
@@ -219,6 +305,7 @@ async def generate_and_validate_description(permalink: Permalink,
             permalink=permalink,
             status_update=status_update,
             attempts=attempts,
+            process_count=process_count,
         )
     except UnableToGenerate as e:
         raise GenerationFailure("Could not generate a game with the given settings",
@@ -231,7 +318,8 @@ async def generate_and_validate_description(permalink: Permalink,
             status_update=status_update,
         )
         try:
-            final_state_by_resolve = await asyncio.wait_for(final_state_async, timeout)
+            with profiling_lib.phase("validation"):
+                final_state_by_resolve = await asyncio.wait_for(final_state_async, timeout)
         except asyncio.TimeoutError as e:
             raise GenerationFailure("Timeout reached when validating possibility",
                                     permalink=permalink, source=e) from e
@@ -5,7 +5,11 @@ from randovania.game_description.game_description import GameDescription
 from randovania.game_description.node import Node, ResourceNode, PickupNode
 from randovania.game_description.requirements import RequirementSet, Requirement, RequirementAnd, \
     ResourceRequirement
+from randovania.game_description.resources.resource_collection import ResourceCollection
+from randovania.game_description.resources.resource_info import ResourceInfo, CurrentResources
+from randovania.game_description.world_list import Adjacency
 from randovania.generator import graph as graph_module
+from randovania.lib import profiling_lib
 from randovania.resolver.state import State
 
 
@@ -63,28 +67,79 @@ class GeneratorReach:
     _digraph: graph_module.BaseGraph
     _state: State
     _game: GameDescription
-    _reachable_paths: Optional[Dict[int, List[Node]]]
     _reachable_costs: Optional[Dict[int, int]]
     _node_reachable_cache: Dict[int, bool]
     _unreachable_paths: Dict[Tuple[Node, Node], Requirement]
+    _unreachable_paths_order: Dict[Tuple[Node, Node], int]
+    _unreachable_paths_by_resource: Dict[ResourceInfo, Dict[Tuple[Node, Node], None]]
+    _unreachable_paths_with_damage: Dict[Tuple[Node, Node], None]
     _safe_nodes: Optional[Set[int]]
     _is_node_safe_cache: Dict[Node, bool]
+    _shares_unreachable_paths: bool
+    _shares_caches: bool
 
     def __deepcopy__(self, memodict):
+        # Copies share everything with the original, and only copy the dicts they need to change
         reach = GeneratorReach(
             self._game,
             self._state,
             self._digraph.copy()
         )
-        reach._unreachable_paths = copy.copy(self._unreachable_paths)
-        reach._reachable_paths = self._reachable_paths
+        reach._unreachable_paths = self._unreachable_paths
+        reach._unreachable_paths_order = self._unreachable_paths_order
+        reach._next_unreachable_path_order = self._next_unreachable_path_order
+        reach._unreachable_paths_by_resource = self._unreachable_paths_by_resource
+        reach._unreachable_paths_with_damage = self._unreachable_paths_with_damage
         reach._reachable_costs = self._reachable_costs
         reach._safe_nodes = self._safe_nodes
+        reach._node_reachable_cache = self._node_reachable_cache
+        reach._is_node_safe_cache = self._is_node_safe_cache
 
-        reach._node_reachable_cache = copy.copy(self._node_reachable_cache)
-        reach._is_node_safe_cache = copy.copy(self._is_node_safe_cache)
+        reach._shares_unreachable_paths = self._shares_unreachable_paths = True
+        reach._shares_caches = self._shares_caches = True
         return reach
 
+    def _own_unreachable_paths(self):
+        if self._shares_unreachable_paths:
+            self._unreachable_paths = copy.copy(self._unreachable_paths)
+            self._unreachable_paths_order = copy.copy(self._unreachable_paths_order)
+            self._shares_unreachable_paths = False
+
+    def _add_unreachable_path(self, edge: Tuple[Node, Node], requirement: Requirement):
+        self._own_unreachable_paths()
+        if edge not in self._unreachable_paths:
+            self._unreachable_paths_order[edge] = self._next_unreachable_path_order
+            self._next_unreachable_path_order += 1
+        self._unreachable_paths[edge] = requirement
+
+        # The index is shared by all copies and never shrinks, so it's a superset of what's actually unreachable
+        for individual in requirement.iterate_resource_requirements():
+            if individual.is_damage:
+                self._unreachable_paths_with_damage[edge] = None
+            else:
+                self._unreachable_paths_by_resource.setdefault(individual.resource, {})[edge] = None
+
+    def _unreachable_paths_affected_by(self, previous_resources: CurrentResources) -> List[Tuple[Node, Node]]:
+        """
+        Finds which unreachable paths could have been unlocked by the current state, given the resources of the
+        previous state.
+        Damage requirements depend on the energy and damage reductions, so paths with these are always included.
+        :param previous_resources:
+        :return: The paths, in the order they were added to _unreachable_paths.
+        """
+        candidates = set(self._unreachable_paths_with_damage.keys())
+        for resource in _changed_resources(previous_resources, self._state.resources):
+            candidates.update(self._unreachable_paths_by_resource.get(resource, {}).keys())
+
+        order = self._unreachable_paths_order
+        return sorted((edge for edge in candidates if edge in order), key=order.__getitem__)
+
+    def _own_caches(self):
+        if self._shares_caches:
+            self._node_reachable_cache = copy.copy(self._node_reachable_cache)
+            self._is_node_safe_cache = copy.copy(self._is_node_safe_cache)
+            self._shares_caches = False
+
     def __init__(self,
                  game: GameDescription,
                  state: State,
@@ -95,9 +150,15 @@ class GeneratorReach:
         self._state = state
         self._digraph = graph
         self._unreachable_paths = {}
-        self._reachable_paths = None
+        self._unreachable_paths_order = {}
+        self._next_unreachable_path_order = 0
+        self._unreachable_paths_by_resource = {}
+        self._unreachable_paths_with_damage = {}
+        self._reachable_costs = None
         self._node_reachable_cache = {}
         self._is_node_safe_cache = {}
+        self._shares_unreachable_paths = False
+        self._shares_caches = False
 
     @classmethod
     def reach_from_state(cls,
@@ -109,11 +170,11 @@ class GeneratorReach:
         reach._expand_graph([GraphPath(None, initial_state.node, Requirement.trivial())])
         return reach
 
-    def _potential_nodes_from(self, node: Node) -> Iterator[Tuple[Node, Requirement, bool]]:
+    def _potential_nodes_from(self, node: Node, adjacency: Adjacency) -> Iterator[Tuple[Node, Requirement, bool]]:
         extra_requirement = _extra_requirement_for_node(self._game, node)
         requirement_to_leave = node.requirement_to_leave(self._state.patches, self._state.resources)
 
-        for target_node, requirement in self._game.world_list.potential_nodes_from(node, self.state.patches):
+        for target_node, requirement in adjacency[node]:
             if target_node is None:
                 continue
 
@@ -126,9 +187,11 @@ class GeneratorReach:
             satisfied = requirement.satisfied(self._state.resources, self._state.energy, self._state.resource_database)
             yield target_node, requirement, satisfied
 
+    @profiling_lib.timed("generator_reach.expand_graph")
     def _expand_graph(self, paths_to_check: List[GraphPath]):
         # print("!! _expand_graph", len(paths_to_check))
-        self._reachable_paths = None
+        self._reachable_costs = None
+        adjacency = self._game.world_list.adjacency_for(self._state.patches)
         while paths_to_check:
             path = paths_to_check.pop(0)
 
@@ -139,13 +202,13 @@ class GeneratorReach:
             # print(">>> will check starting at", self.game.world_list.node_name(path.node))
             path.add_to_graph(self._digraph)
 
-            for target_node, requirement, satisfied in self._potential_nodes_from(path.node):
+            for target_node, requirement, satisfied in self._potential_nodes_from(path.node, adjacency):
                 if satisfied:
                     # print("* Queue path to", self.game.world_list.node_name(target_node))
                     paths_to_check.append(GraphPath(path.node, target_node, requirement))
                 else:
                     # print("* Unreachable", self.game.world_list.node_name(target_node), requirement)
-                    self._unreachable_paths[path.node, target_node] = requirement
+                    self._add_unreachable_path((path.node, target_node), requirement)
             # print("> done")
 
         self._safe_nodes = None
@@ -168,27 +231,23 @@ class GeneratorReach:
         if self._safe_nodes is not None:
             return
 
-        for component in self._digraph.strongly_connected_components():
-            if self._state.node.index in component:
-                assert self._safe_nodes is None
-                self._safe_nodes = component
+        self._safe_nodes = self._digraph.strongly_connected_component_of(self._state.node.index)
 
-        assert self._safe_nodes is not None
-
-    def _calculate_reachable_paths(self):
-        if self._reachable_paths is not None:
+    def _calculate_reachable_costs(self):
+        if self._reachable_costs is not None:
             return
 
         all_nodes = self.game.world_list.all_nodes
+        cost_to_enter = {}
 
         def weight(source: int, target: int, attributes):
-            if self._can_advance(all_nodes[target]):
-                return 0
-            else:
-                return 1
+            # Only depends on the target, so calculate once per node
+            cost = cost_to_enter.get(target)
+            if cost is None:
+                cost = cost_to_enter[target] = 0 if self._can_advance(all_nodes[target]) else 1
+            return cost
 
-        self._reachable_costs, self._reachable_paths = self._digraph.multi_source_dijkstra({self.state.node.index},
-                                                                                           weight=weight)
+        self._reachable_costs = self._digraph.multi_source_distances({self.state.node.index}, weight=weight)
 
     def is_reachable_node(self, node: Node) -> bool:
         index = node.index
@@ -197,10 +256,11 @@ class GeneratorReach:
         if cached_value is not None:
             return cached_value
 
-        self._calculate_reachable_paths()
+        self._calculate_reachable_costs()
 
         cost = self._reachable_costs.get(index)
         if cost is not None:
+            self._own_caches()
             if cost == 0:
                 self._node_reachable_cache[index] = True
             elif cost == 1:
@@ -218,9 +278,9 @@ class GeneratorReach:
         An iterator of all nodes there's an path from the reach's starting point. Similar to is_reachable_node
         :return:
         """
-        self._calculate_reachable_paths()
+        self._calculate_reachable_costs()
         all_nodes = self.game.world_list.all_nodes
-        for index in self._reachable_paths.keys():
+        for index in self._reachable_costs.keys():
             yield all_nodes[index]
 
     @property
@@ -249,9 +309,11 @@ class GeneratorReach:
             return is_safe
 
         self._calculate_safe_nodes()
+        self._own_caches()
         self._is_node_safe_cache[node] = node.index in self._safe_nodes
         return self._is_node_safe_cache[node]
 
+    @profiling_lib.timed("generator_reach.advance_to")
     def advance_to(self, new_state: State,
                    is_safe: bool = False,
                    ) -> None:
@@ -259,30 +321,34 @@ class GeneratorReach:
         # assert self.is_reachable_node(new_state.node)
 
         if is_safe or self.is_safe_node(new_state.node):
-            for index, _ in list(filter(lambda x: not x[1], self._node_reachable_cache.items())):
-                del self._node_reachable_cache[index]
-
-            for node, _ in list(filter(lambda x: not x[1], self._is_node_safe_cache.items())):
-                del self._is_node_safe_cache[node]
+            # Only what was reachable/safe is still valid. New dicts, as the current ones might be shared.
+            self._node_reachable_cache = {index: value for index, value in self._node_reachable_cache.items() if value}
+            self._is_node_safe_cache = {node: value for node, value in self._is_node_safe_cache.items() if value}
         else:
             self._node_reachable_cache = {}
             self._is_node_safe_cache = {}
+        self._shares_caches = False
 
+        previous_resources = self._state.resources
         self._state = new_state
 
         paths_to_check: List[GraphPath] = []
 
         edges_to_remove = []
         # Check if we can expand the corners of our graph
-        # TODO: check if expensive. We filter by only nodes that depends on a new resource
-        for edge, requirement in self._unreachable_paths.items():
+        # Only paths that depends on a resource that changed can have become satisfied
+        for edge in self._unreachable_paths_affected_by(previous_resources):
+            requirement = self._unreachable_paths[edge]
             if requirement.satisfied(self._state.resources, self._state.energy, self._state.resource_database):
                 from_node, to_node = edge
                 paths_to_check.append(GraphPath(from_node, to_node, requirement))
                 edges_to_remove.append(edge)
 
+        if edges_to_remove:
+            self._own_unreachable_paths()
         for edge in edges_to_remove:
             del self._unreachable_paths[edge]
+            del self._unreachable_paths_order[edge]
 
         self._expand_graph(paths_to_check)
 
@@ -330,6 +396,21 @@ class GeneratorReach:
         return results
 
 
+def _changed_resources(previous: CurrentResources, current: CurrentResources) -> Iterator[ResourceInfo]:
+    if (isinstance(current, ResourceCollection) and isinstance(previous, ResourceCollection)
+            and current.indexer is previous.indexer):
+        yield from current.changed_resources(previous)
+        return
+
+    for resource, quantity in current.items():
+        if previous.get(resource, 0) != quantity:
+            yield resource
+
+    for resource, quantity in previous.items():
+        if quantity != 0 and resource not in current:
+            yield resource
+
+
 def _extra_requirement_for_node(game: GameDescription, node: Node) -> Optional[Requirement]:
     extra_requirement = None
 
@@ -1,5 +1,7 @@
+import collections
 import copy
-from typing import Dict, Iterator, Tuple, Set, Callable
+import math
+from typing import Dict, Iterator, Tuple, Set, Callable, Iterable
 
 from randovania.game_description.requirements import Requirement
 
@@ -26,7 +28,8 @@ class BaseGraph:
     def edges_data(self) -> Iterator[Tuple[int, int, Requirement]]:
         raise NotImplementedError()
 
-    def multi_source_dijkstra(self, sources: Set[int], weight: Callable[[int, int, Requirement], float]):
+    def multi_source_distances(self, sources: Set[int],
+                               weight: Callable[[int, int, Requirement], int]) -> Dict[int, int]:
         raise NotImplementedError()
 
     def single_source_dijkstra_path(self, source: int):
@@ -35,36 +38,49 @@ class BaseGraph:
     def strongly_connected_components(self) -> Iterator[Set[int]]:
         raise NotImplementedError()
 
+    def strongly_connected_component_of(self, node: int) -> Set[int]:
+        raise NotImplementedError()
+
 
 class RandovaniaGraph(BaseGraph):
+    """
+    A directed graph, with a Requirement for each edge.
+    Copies are copy-on-write: the edges of each node are shared with the original graph until either changes them.
+    """
     edges: Dict[int, Dict[int, Requirement]]
+    _owned_nodes: Set[int]
 
     @classmethod
     def new(cls):
         return cls({})
 
     def __init__(self, edges: Dict[int, Dict[int, Requirement]]):
-        import networkx
-        self.networkx = networkx
         self.edges = edges
+        self._owned_nodes = set(edges.keys())
 
     def copy(self):
-        return RandovaniaGraph(
-            {
-                source: copy.copy(data)
-                for source, data in self.edges.items()
-            },
-        )
+        result = RandovaniaGraph(copy.copy(self.edges))
+        # All edge dicts are now shared, so neither graph can change them without copying first
+        result._owned_nodes = set()
+        self._owned_nodes = set()
+        return result
+
+    def _edges_to_change(self, node: int) -> Dict[int, Requirement]:
+        if node not in self._owned_nodes:
+            self.edges[node] = copy.copy(self.edges[node])
+            self._owned_nodes.add(node)
+        return self.edges[node]
 
     def add_node(self, node: int):
         if node not in self.edges:
             self.edges[node] = {}
+            self._owned_nodes.add(node)
 
     def add_edge(self, previous_node: int, next_node: int, requirement: Requirement):
-        self.edges[previous_node][next_node] = requirement
+        self._edges_to_change(previous_node)[next_node] = requirement
 
     def remove_edge(self, previous: int, target: int):
-        self.edges[previous].pop(target)
+        self._edges_to_change(previous).pop(target)
 
     def has_edge(self, previous_node: int, next_node: int) -> bool:
         return next_node in self.edges.get(previous_node, {})
@@ -77,28 +93,129 @@ class RandovaniaGraph(BaseGraph):
             for target, requirement in data.items():
                 yield source, target, requirement
 
-    def multi_source_dijkstra(self, sources: Set[int], weight: Callable[[int, int, Requirement], float]):
-        return self.networkx.multi_source_dijkstra(self, sources, weight=weight)
+    def multi_source_distances(self, sources: Set[int],
+                               weight: Callable[[int, int, Requirement], int]) -> Dict[int, int]:
+        """
+        Calculates the distance from any of the sources to all reachable nodes.
+        Uses a 0-1 BFS, so the weight function must only return 0 or 1.
+        :param sources:
+        :param weight:
+        :return: A dict with the distance to each reachable node.
+        """
+        edges = self.edges
+        dist = {}
+        seen = {}
+        queue = collections.deque()
+
+        for source in sources:
+            if source not in edges:
+                raise KeyError(f"Source {source} not in graph")
+            seen[source] = 0
+            queue.append(source)
+
+        while queue:
+            node = queue.popleft()
+            if node in dist:
+                continue
+            node_dist = seen[node]
+            dist[node] = node_dist
+
+            for target, requirement in edges[node].items():
+                if target in dist:
+                    continue
+                cost = weight(node, target, requirement)
+                if node_dist + cost < seen.get(target, math.inf):
+                    seen[target] = node_dist + cost
+                    if cost == 0:
+                        queue.appendleft(target)
+                    else:
+                        queue.append(target)
+
+        return dist
 
     def single_source_dijkstra_path(self, source: int):
-        return self.networkx.single_source_dijkstra_path(self, source, weight="unweighted")
+        """
+        Calculates the path with the fewest edges from the source to all reachable nodes.
+        :param source:
+        :return: A dict with the path to each node.
+        """
+        edges = self.edges
+        paths = {source: [source]}
+        queue = collections.deque([source])
+
+        while queue:
+            node = queue.popleft()
+            for target in edges[node]:
+                if target not in paths:
+                    paths[target] = paths[node] + [target]
+                    queue.append(target)
+
+        return paths
 
     def strongly_connected_components(self) -> Iterator[Set[int]]:
-        yield from self.networkx.strongly_connected_components(self)
-
-    # Networkx compatibility API
-    def is_multigraph(self):
-        return False
-
-    def is_directed(self):
-        return True
-
-    @property
-    def _succ(self):
-        return self.edges
-
-    def __iter__(self):
-        yield from self.edges.keys()
-
-    def __getitem__(self, n):
-        return self.edges[n].keys()
+        yield from self._tarjan(self.edges.keys())
+
+    def strongly_connected_component_of(self, node: int) -> Set[int]:
+        """
+        Calculates the strongly connected component that contains the given node.
+        Only nodes reachable from it are visited.
+        :param node:
+        :return:
+        """
+        # The component of the root is always the last one found
+        component = None
+        for component in self._tarjan([node]):
+            pass
+        return component
+
+    def _tarjan(self, roots: Iterable[int]) -> Iterator[Set[int]]:
+        """
+        Iterative version of Tarjan's algorithm, visiting all nodes reachable from the given roots.
+        :param roots:
+        :return:
+        """
+        edges = self.edges
+        index_of = {}
+        low_link = {}
+        on_stack = set()
+        stack = []
+        next_index = 0
+
+        for root in roots:
+            if root in index_of:
+                continue
+
+            index_of[root] = low_link[root] = next_index
+            next_index += 1
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(edges[root]))]
+
+            while work:
+                node, targets = work[-1]
+                for target in targets:
+                    if target not in index_of:
+                        index_of[target] = low_link[target] = next_index
+                        next_index += 1
+                        stack.append(target)
+                        on_stack.add(target)
+                        work.append((target, iter(edges[target])))
+                        break
+                    elif target in on_stack and index_of[target] < low_link[node]:
+                        low_link[node] = index_of[target]
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        if low_link[node] < low_link[parent]:
+                            low_link[parent] = low_link[node]
+
+                    if low_link[node] == index_of[node]:
+                        component = set()
+                        while True:
+                            member = stack.pop()
+                            on_stack.remove(member)
+                            component.add(member)
+                            if member == node:
+                                break
+                        yield component
@@ -63,6 +63,11 @@ class QtNetworkClient(QWidget, NetworkClient):
         await super().on_game_session_updated(data)
         self.GameSessionUpdated.emit(self._current_game_session)
 
+    async def on_game_session_delta(self, data):
+        # When the whole session was requested instead, on_game_session_updated already emitted it
+        if await super().on_game_session_delta(data):
+            self.GameSessionUpdated.emit(self._current_game_session)
+
     async def login_with_discord(self):
         if self.discord is None:
             raise RuntimeError("Missing Discord configuration for Randovania")
@@ -91,6 +96,7 @@ class QtNetworkClient(QWidget, NetworkClient):
         self.session_data_path.unlink()
         self._current_user = None
         self._current_game_session = None
+        self._current_game_session_sequence = None
         self.connection_state = ConnectionState.ConnectedNotLogged
         await self._emit_with_result("logout")
 
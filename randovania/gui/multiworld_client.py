@@ -64,6 +64,8 @@ class Data(AsyncContextManager):
 class MultiworldClient(QObject):
     _data: Optional[Data] = None
     _received_pickups: List[Tuple[str, PickupEntry]]
+    _received_pickups_row: Optional[int] = None
+    _received_pickups_next_index: int = 0
     _notify_task: Optional[asyncio.Task] = None
     _pid: Optional[pid.PidFile] = None
 
@@ -117,6 +119,9 @@ class MultiworldClient(QObject):
 
         async with self._pickups_lock:
             self.game_connection.set_permanent_pickups([])
+            self._received_pickups = []
+            self._received_pickups_row = None
+            self._received_pickups_next_index = 0
 
         self._data = None
         if self._pid is not None:
@@ -159,14 +164,20 @@ class MultiworldClient(QObject):
     async def refresh_received_pickups(self):
         self.logger.debug(f"start")
         async with self._pickups_lock:
-            game, result = await self.network_client.game_session_request_pickups()
-            resource_database = default_database.resource_database_for(game)
+            result = await self.network_client.game_session_request_pickups(self._received_pickups_next_index,
+                                                                            self._received_pickups_row)
+            resource_database = default_database.resource_database_for(result.game)
 
-            self.logger.info(f"received {len(result)} items")
-            self._received_pickups = [
+            self.logger.info(f"received {len(result.pickups)} items, starting at {result.start_index}")
+            if result.start_index == 0:
+                self._received_pickups = []
+
+            self._received_pickups.extend(
                 (provider_name, _decode_pickup(data, resource_database))
-                for provider_name, data in result
-            ]
+                for provider_name, data in filter(None, result.pickups)
+            )
+            self._received_pickups_row = result.row
+            self._received_pickups_next_index = result.next_index
 
     @asyncSlot()
     async def on_network_game_updated(self):
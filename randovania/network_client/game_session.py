@@ -1,9 +1,10 @@
 import dataclasses
 import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 from randovania.games.game import RandovaniaGame
 from randovania.layout.preset_migration import VersionedPreset
+from randovania.network_common.session_delta import GameSessionDeltaKind
 from randovania.network_common.session_state import GameSessionState
 
 
@@ -70,6 +71,18 @@ class GameSessionAction:
         )
 
 
+@dataclasses.dataclass(frozen=True)
+class GameSessionPickups:
+    game: RandovaniaGame
+    row: Optional[int]
+    start_index: int
+    pickups: Tuple[Optional[Tuple[str, bytes]], ...]
+
+    @property
+    def next_index(self) -> int:
+        return self.start_index + len(self.pickups)
+
+
 @dataclasses.dataclass(frozen=True)
 class GameSessionEntry:
     id: int
@@ -117,6 +130,28 @@ class GameSessionEntry:
             allowed_games=[RandovaniaGame(game) for game in data["allowed_games"]],
         )
 
+    def with_delta(self, kind: GameSessionDeltaKind, data) -> "GameSessionEntry":
+        """
+        Creates a copy of this session with a single change applied.
+        :param kind: What changed.
+        :param data: The JSON of the change, as sent by the server.
+        :return:
+        """
+        if kind == GameSessionDeltaKind.PLAYER:
+            player_entry = PlayerSessionEntry.from_json(data)
+            return dataclasses.replace(self, players={**self.players, player_entry.id: player_entry})
+
+        elif kind == GameSessionDeltaKind.ACTION:
+            return dataclasses.replace(self, actions=[*self.actions, GameSessionAction.from_json(data)])
+
+        elif kind == GameSessionDeltaKind.PRESET:
+            presets = list(self.presets)
+            presets[data["row"]] = VersionedPreset(data["preset"])
+            return dataclasses.replace(self, presets=presets)
+
+        else:
+            raise ValueError(f"Unknown delta: {kind}")
+
 
 @dataclasses.dataclass(frozen=True)
 class User:
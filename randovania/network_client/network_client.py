@@ -17,9 +17,10 @@ from randovania.game_connection.backend_choice import GameBackendChoice
 from randovania.game_connection.connection_base import InventoryItem, GameConnectionStatus
 from randovania.game_description.resources.item_resource_info import ItemResourceInfo
 from randovania.games.game import RandovaniaGame
-from randovania.network_client.game_session import GameSessionListEntry, GameSessionEntry, User
+from randovania.network_client.game_session import GameSessionListEntry, GameSessionEntry, User, GameSessionPickups
 from randovania.network_common.admin_actions import SessionAdminUserAction, SessionAdminGlobalAction
 from randovania.network_common.error import decode_error, InvalidSession
+from randovania.network_common.session_delta import GameSessionDeltaKind
 
 
 class ConnectionState(Enum):
@@ -48,6 +49,7 @@ class UnableToConnect(Exception):
 class NetworkClient:
     sio: socketio.AsyncClient
     _current_game_session: Optional[GameSessionEntry] = None
+    _current_game_session_sequence: Optional[int] = None
     _current_user: Optional[User] = None
     _connection_state: ConnectionState
     _call_lock: asyncio.Lock
@@ -73,6 +75,7 @@ class NetworkClient:
         self.sio.on('disconnect', self.on_disconnect)
         self.sio.on('user_session_update', self.on_user_session_updated)
         self.sio.on('game_session_update', self.on_game_session_updated)
+        self.sio.on('game_session_delta', self.on_game_session_delta)
         self.sio.on('game_has_update', self.on_game_update_notification)
 
     @property
@@ -230,10 +233,41 @@ class NetworkClient:
         async with aiofiles.open(self.session_data_path, "wb") as open_file:
             await open_file.write(encoded_session_data)
 
-    async def on_game_session_updated(self, data):
+    def _set_current_game_session(self, data: dict):
         self._current_game_session = GameSessionEntry.from_json(data)
+        self._current_game_session_sequence = data.get("sequence")
+
+    async def on_game_session_updated(self, data):
+        self._set_current_game_session(data)
         self.logger.debug(f"{self._current_game_session.id}")
 
+    async def on_game_session_delta(self, data) -> bool:
+        """
+        Applies a single change to the current game session.
+        When a previous change was missed, requests the whole session instead.
+        :param data:
+        :return: If the change was applied to the current session. Requesting the whole session goes through
+        on_game_session_updated instead.
+        """
+        if self._current_game_session is None or data["session"] != self._current_game_session.id:
+            return False
+
+        expected_sequence = self._current_game_session_sequence
+        if expected_sequence is not None and data["sequence"] <= expected_sequence:
+            # Already included in the session we have
+            return False
+
+        if expected_sequence is None or data["sequence"] != expected_sequence + 1:
+            self.logger.debug(f"missed session changes, expected {expected_sequence} and got {data['sequence']}")
+            await self.on_game_session_updated(
+                await self._emit_with_result("game_session_request_update", self._current_game_session.id))
+            return False
+
+        self._current_game_session = self._current_game_session.with_delta(GameSessionDeltaKind(data["kind"]),
+                                                                           data["data"])
+        self._current_game_session_sequence = data["sequence"]
+        return True
+
     async def on_game_update_notification(self, details):
         pass
 
@@ -261,16 +295,28 @@ class NetworkClient:
         await self._emit_with_result("game_session_collect_locations",
                                      (self._current_game_session.id, locations))
 
-    async def game_session_request_pickups(self) -> Tuple[RandovaniaGame, List[Tuple[str, bytes]]]:
-        data = await self._emit_with_result("game_session_request_pickups", self._current_game_session.id)
+    async def game_session_request_pickups(self, start_index: int = 0,
+                                           start_row: Optional[int] = None) -> GameSessionPickups:
+        """
+        Requests the pickups received from other players.
+        :param start_index: How many pickups were already received, which aren't sent again.
+        :param start_row: The row these pickups were received for.
+        :return: The pickups after start_index, or all of them in case start_row is no longer our row.
+        """
+        data = await self._emit_with_result("game_session_request_pickups",
+                                            (self._current_game_session.id, start_index, start_row))
         if data is None:
-            return RandovaniaGame.PRIME2, []
-
-        return RandovaniaGame(data["game"]), [
-            (item["provider_name"], base64.b85decode(item["pickup"]))
-            for item in data["pickups"]
-            if item is not None
-        ]
+            return GameSessionPickups(RandovaniaGame.PRIME2, None, 0, ())
+
+        return GameSessionPickups(
+            game=RandovaniaGame(data["game"]),
+            row=data["row"],
+            start_index=data["start"],
+            pickups=tuple(
+                (item["provider_name"], base64.b85decode(item["pickup"])) if item is not None else None
+                for item in data["pickups"]
+            ),
+        )
 
     async def get_game_session_list(self) -> List[GameSessionListEntry]:
         return [
@@ -280,18 +326,19 @@ class NetworkClient:
 
     async def create_new_session(self, session_name: str) -> GameSessionEntry:
         result = await self._emit_with_result("create_game_session", session_name)
-        self._current_game_session = GameSessionEntry.from_json(result)
+        self._set_current_game_session(result)
         return self._current_game_session
 
     async def join_game_session(self, session: GameSessionListEntry, password: Optional[str]):
         result = await self._emit_with_result("join_game_session", (session.id, password))
-        self._current_game_session = GameSessionEntry.from_json(result)
+        self._set_current_game_session(result)
 
     async def leave_game_session(self, permanent: bool):
         if permanent:
             await self.session_admin_player(self._current_user.id, SessionAdminUserAction.KICK, None)
         await self._emit_with_result("disconnect_game_session", self._current_game_session.id)
         self._current_game_session = None
+        self._current_game_session_sequence = None
 
     async def session_admin_global(self, action: SessionAdminGlobalAction, arg):
         return await self._emit_with_result("game_session_admin_session",
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class GameSessionDeltaKind(Enum):
+    """What changed in a game session, for updates that don't send the whole session"""
+    PLAYER = "player"
+    ACTION = "action"
+    PRESET = "preset"
@@ -109,7 +109,7 @@ def _add_minimal_logic_initial_resources(resources: CurrentResources,
 
 def calculate_starting_state(game: GameDescription, patches: GamePatches, energy_per_tank: int) -> "State":
     starting_node = game.world_list.resolve_teleporter_connection(patches.starting_location)
-    initial_resources = copy.copy(patches.starting_items)
+    initial_resources = game.resource_database.create_resource_collection(patches.starting_items)
 
     if isinstance(starting_node, PlayerShipNode):
         add_resource_gain_to_current_resources(
@@ -237,7 +237,8 @@ def logic_bootstrap(configuration: AnyGameConfiguration,
     :param patches:
     :return:
     """
-    game = copy.deepcopy(game)
+    # The world list is shared with the given game until the requirements are patched
+    game = copy.copy(game)
     game.resource_database = patch_resource_database(game.resource_database, configuration)
     starting_state = calculate_starting_state(game, patches, configuration.energy_per_tank)
 
@@ -254,6 +255,17 @@ def logic_bootstrap(configuration: AnyGameConfiguration,
     for resource, quantity in static_resources.items():
         starting_state.resources[resource] = quantity
 
-    game.patch_requirements(starting_state.resources, configuration.damage_strictness.value)
+    game = game.patched_copy(starting_state.resources, configuration.damage_strictness.value)
+
+    # Use the nodes of the patched world list
+    starting_state = State(
+        starting_state.resources,
+        (),
+        starting_state.energy,
+        game.world_list.resolve_teleporter_connection(patches.starting_location),
+        patches,
+        None,
+        dataclasses.replace(starting_state.game_data, world_list=game.world_list),
+    )
 
     return game, starting_state
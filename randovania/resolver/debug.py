@@ -1,5 +1,5 @@
 import time
-from typing import Set
+from typing import Set, Tuple
 
 from randovania.game_description.node import Node
 from randovania.game_description.requirements import RequirementList, RequirementSet
@@ -10,6 +10,8 @@ _DEBUG_LEVEL = 0
 count = 0
 _current_indent = 0
 _last_printed_additional: dict = None
+_transposition_hits = 0
+_transposition_misses = 0
 
 
 def n(node: Node, world_list, with_world=False) -> str:
@@ -35,9 +37,31 @@ def _indent(offset=0):
 
 
 def log_resolve_start():
-    global _current_indent, _last_printed_additional
+    global _current_indent, _last_printed_additional, _transposition_hits, _transposition_misses
     _current_indent = 0
     _last_printed_additional = {}
+    _transposition_hits = 0
+    _transposition_misses = 0
+
+
+def log_transposition_hit():
+    global _transposition_hits
+    _transposition_hits += 1
+    if _DEBUG_LEVEL > 1:
+        print("{}* Skip, state already explored".format(_indent()))
+
+
+def log_transposition_miss():
+    global _transposition_misses
+    _transposition_misses += 1
+
+
+def transposition_table_stats() -> Tuple[int, int]:
+    """
+    How many states, since the last resolve started, were found in the transposition table and how many weren't.
+    :return: Pair of hits and misses
+    """
+    return _transposition_hits, _transposition_misses
 
 
 def log_new_advance(state: "State", reach: "ResolverReach"):
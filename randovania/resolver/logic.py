@@ -4,6 +4,7 @@ from randovania.game_description.game_description import GameDescription
 from randovania.game_description.node import Node
 from randovania.game_description.requirements import RequirementSet
 from randovania.layout.echoes_configuration import EchoesConfiguration
+from randovania.resolver.transposition_table import TranspositionTable
 
 
 class Logic:
@@ -12,11 +13,27 @@ class Logic:
     game: GameDescription
     configuration: EchoesConfiguration
     additional_requirements: Dict[Node, RequirementSet]
+    additional_requirements_version: int
+    transposition_table: TranspositionTable
 
     def __init__(self, game: GameDescription, configuration: EchoesConfiguration):
         self.game = game
         self.configuration = configuration
         self.additional_requirements = {}
+        self.additional_requirements_version = 0
+        self.transposition_table = TranspositionTable()
 
     def get_additional_requirements(self, node: Node) -> RequirementSet:
         return self.additional_requirements.get(node, RequirementSet.trivial())
+
+    def set_additional_requirements(self, node: Node, requirements: RequirementSet):
+        """
+        Changes the additional requirements of the given node.
+        Any change increments `additional_requirements_version`, as it might change the reach of any state.
+        :param node:
+        :param requirements:
+        :return:
+        """
+        if self.additional_requirements.get(node) != requirements:
+            self.additional_requirements[node] = requirements
+            self.additional_requirements_version += 1
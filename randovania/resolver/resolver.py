@@ -1,13 +1,19 @@
 import asyncio
 import copy
-from typing import Optional, Tuple, Callable, FrozenSet
+import functools
+import multiprocessing
+import multiprocessing.pool
+from typing import Optional, Tuple, Callable, FrozenSet, Dict, List
 
 from randovania.game_description import data_reader, default_database
+from randovania.game_description.game_description import GameDescription
 from randovania.game_description.game_patches import GamePatches
 from randovania.game_description.node import PickupNode, ResourceNode, EventNode, Node
 from randovania.game_description.requirements import RequirementSet, RequirementList
 from randovania.game_description.resources.resource_info import ResourceInfo
+from randovania.games.game import RandovaniaGame
 from randovania.layout.echoes_configuration import EchoesConfiguration
+from randovania.lib import profiling_lib
 from randovania.resolver import debug, event_pickup
 from randovania.resolver.bootstrap import logic_bootstrap
 from randovania.resolver.event_pickup import EventPickupNode
@@ -85,6 +91,7 @@ async def _inner_advance_depth(state: State,
                                status_update: Callable[[str], None],
                                *,
                                reach: Optional[ResolverReach] = None,
+                               pool: Optional["_ResolverPool"] = None,
                                ) -> Tuple[Optional[State], bool]:
     """
 
@@ -92,12 +99,32 @@ async def _inner_advance_depth(state: State,
     :param logic:
     :param status_update:
     :param reach: A precalculated reach for the given state
+    :param pool: When set, the satisfiable actions of the first state that has no safe action are explored in it
     :return:
     """
 
     if logic.game.victory_condition.satisfied(state.resources, state.energy, state.resource_database):
         return state, True
 
+    # The same state can be reached with a different order of actions, with the same result
+    fingerprint = state.fingerprint()
+    result = logic.transposition_table.get(fingerprint)
+    if result is None:
+        result = await _explore_state(state, logic, status_update, reach, pool)
+        # A success carries the path that reached it, which isn't part of the fingerprint. It also ends the resolve,
+        # so there's nothing to gain by storing it.
+        if result[0] is None:
+            logic.transposition_table.store(fingerprint, result)
+
+    return result
+
+
+async def _explore_state(state: State,
+                         logic: Logic,
+                         status_update: Callable[[str], None],
+                         reach: Optional[ResolverReach],
+                         pool: Optional["_ResolverPool"],
+                         ) -> Tuple[Optional[State], bool]:
     # Yield back to the asyncio runner, so cancel can do something
     await asyncio.sleep(0)
 
@@ -107,12 +134,16 @@ async def _inner_advance_depth(state: State,
     debug.log_new_advance(state, reach)
     status_update("Resolving... {} total resources".format(len(state.resources)))
 
+    # Reaches calculated while checking for safe actions, reused if the action is tried later
+    potential_reaches: Dict[ResourceNode, Tuple[int, State, ResolverReach]] = {}
+
     for action, energy in reach.possible_actions(state):
         if _should_check_if_action_is_safe(state, action, logic.game.dangerous_resources,
                                            logic.game.world_list.all_nodes):
 
             potential_state = state.act_on_node(action, path=reach.path_to_node[action], new_energy=energy)
             potential_reach = ResolverReach.calculate_reach(logic, potential_state)
+            potential_reaches[action] = (logic.additional_requirements_version, potential_state, potential_reach)
 
             # If we can go back to where we were, it's a simple safe node
             if state.node in potential_reach.nodes:
@@ -121,6 +152,7 @@ async def _inner_advance_depth(state: State,
                     logic=logic,
                     status_update=status_update,
                     reach=potential_reach,
+                    pool=pool,
                 )
 
                 if not new_result[1]:
@@ -130,12 +162,22 @@ async def _inner_advance_depth(state: State,
                 return new_result
 
     debug.log_checking_satisfiable_actions()
+    if pool is not None:
+        return await pool.explore_actions(state, reach, logic)
+
     has_action = False
     for action, energy in reach.satisfiable_actions(state, logic.game.victory_condition):
+        # A reach only depends on the state and additional requirements, so it's still valid if these didn't change
+        version, potential_state, potential_reach = potential_reaches.pop(action, (None, None, None))
+        if version != logic.additional_requirements_version:
+            potential_state = state.act_on_node(action, path=reach.path_to_node[action], new_energy=energy)
+            potential_reach = None
+
         new_result = await _inner_advance_depth(
-            state=state.act_on_node(action, path=reach.path_to_node[action], new_energy=energy),
+            state=potential_state,
             logic=logic,
             status_update=status_update,
+            reach=potential_reach,
         )
 
         # We got a positive result. Send it back up
@@ -154,12 +196,14 @@ async def _inner_advance_depth(state: State,
 
         additional_requirements = additional_requirements.union(RequirementSet(additional))
 
-    logic.additional_requirements[state.node] = _simplify_additional_requirement_set(additional_requirements,
-                                                                                     state,
-                                                                                     logic.game.dangerous_resources)
+    logic.set_additional_requirements(state.node, _simplify_additional_requirement_set(additional_requirements,
+                                                                                       state,
+                                                                                       logic.game.dangerous_resources))
     return None, has_action
 
 
+# Timed here instead of in the recursive _inner_advance_depth, which would add a frame to each level of the recursion
+@profiling_lib.timed("resolver.advance_depth")
 async def advance_depth(state: State, logic: Logic, status_update: Callable[[str], None]) -> Optional[State]:
     return (await _inner_advance_depth(state, logic, status_update))[0]
 
@@ -168,19 +212,156 @@ def _quiet_print(s):
     pass
 
 
+@functools.lru_cache()
+def _game_with_event_pickups_for(game_enum: RandovaniaGame) -> GameDescription:
+    # Event pickups change the nodes, so it needs its own WorldList. The copy still shares the resource database
+    # with the generator's game, and with it the patched requirements memo.
+    # Never modified afterwards: logic_bootstrap only creates patched copies of it.
+    game = copy.deepcopy(default_database.shared_game_description_for(game_enum))
+    event_pickup.replace_with_event_pickups(game)
+    return game
+
+
+def _setup_resolver(configuration: EchoesConfiguration, patches: GamePatches) -> Tuple[Logic, State]:
+    new_game, starting_state = logic_bootstrap(configuration, _game_with_event_pickups_for(configuration.game), patches)
+    logic = Logic(new_game, configuration)
+    starting_state.resources["add_self_as_requirement_to_resources"] = 1
+    return logic, starting_state
+
+
+# An action taken by the resolver, in a form that's valid for any process that resolves the same game:
+# position of the node in WorldList.all_nodes, the path from the previous node and the energy after the action.
+ResolverStep = Tuple[int, Tuple[int, ...], int]
+
+
+def steps_between(initial_state: State, final_state: State) -> List[ResolverStep]:
+    """
+    Lists the actions that were taken to get from initial_state to final_state.
+    :param initial_state:
+    :param final_state: A state created from initial_state with `act_on_node`.
+    :return:
+    """
+    node_positions = {node: i for i, node in enumerate(initial_state.world_list.all_nodes)}
+
+    steps = []
+    state = final_state
+    while state is not initial_state:
+        steps.append((node_positions[state.node],
+                      tuple(node_positions[node] for node in state.path_from_previous_state),
+                      state.energy))
+        state = state.previous_state
+
+    steps.reverse()
+    return steps
+
+
+def replay_steps(state: State, steps: List[ResolverStep]) -> State:
+    """
+    Takes all given actions, starting from the given state.
+    :param state:
+    :param steps: As created by `steps_between`.
+    :return:
+    """
+    all_nodes = state.world_list.all_nodes
+    for node, path, energy in steps:
+        # When the action doesn't give an energy tank, the new energy is exactly what we asked for
+        state = state.act_on_node(all_nodes[node], path=tuple(all_nodes[i] for i in path), new_energy=energy)
+    return state
+
+
+_worker_logic: Optional[Logic] = None
+_worker_starting_state: Optional[State] = None
+
+
+def _initialize_worker(configuration: EchoesConfiguration, patches: GamePatches):
+    global _worker_logic, _worker_starting_state
+    _worker_logic, _worker_starting_state = _setup_resolver(configuration, patches)
+
+
+def _resolve_in_worker(steps: List[ResolverStep]) -> Optional[List[ResolverStep]]:
+    initial_state = replay_steps(_worker_starting_state, steps)
+    final_state = asyncio.run(advance_depth(initial_state, _worker_logic, _quiet_print))
+    if final_state is None:
+        return None
+    return steps_between(initial_state, final_state)
+
+
+class _ResolverPool:
+    """Explores actions of the resolver in other processes, each with its own copy of the game."""
+    pool: multiprocessing.pool.Pool
+    starting_state: State
+
+    def __init__(self, pool: multiprocessing.pool.Pool, starting_state: State):
+        self.pool = pool
+        self.starting_state = starting_state
+
+    def _submit(self, steps: List[ResolverStep]) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def callback(result):
+            loop.call_soon_threadsafe(future.set_result, result)
+
+        def error_callback(e):
+            loop.call_soon_threadsafe(future.set_exception, e)
+
+        self.pool.apply_async(_resolve_in_worker, (steps,), callback=callback, error_callback=error_callback)
+        return future
+
+    async def explore_actions(self, state: State, reach: ResolverReach,
+                              logic: Logic) -> Tuple[Optional[State], bool]:
+        """
+        Explores all satisfiable actions of the given state in parallel, returning as soon as any reaches victory.
+        :param state:
+        :param reach:
+        :param logic:
+        :return:
+        """
+        base_steps = steps_between(self.starting_state, state)
+
+        potential_states = {}
+        for action, energy in reach.satisfiable_actions(state, logic.game.victory_condition):
+            potential_state = state.act_on_node(action, path=reach.path_to_node[action], new_energy=energy)
+            future = self._submit(base_steps + steps_between(state, potential_state))
+            potential_states[future] = potential_state
+
+        pending = set(potential_states.keys())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                steps = future.result()
+                if steps is not None:
+                    return replay_steps(potential_states[future], steps), True
+
+        debug.log_rollback(state, bool(potential_states), False)
+        return None, bool(potential_states)
+
+
 async def resolve(configuration: EchoesConfiguration,
                   patches: GamePatches,
-                  status_update: Optional[Callable[[str], None]] = None
+                  status_update: Optional[Callable[[str], None]] = None,
+                  process_count: int = 1,
                   ) -> Optional[State]:
+    """
+    Checks if the game can be completed with the given patches.
+    :param configuration:
+    :param patches:
+    :param status_update:
+    :param process_count: When more than 1, the first time there's multiple actions to choose from, each one is
+    explored in a separate process. All processes are terminated once any finds a solution.
+    :return: The final state, if the game can be completed.
+    """
     if status_update is None:
         status_update = _quiet_print
 
-    game = copy.deepcopy(default_database.game_description_for(configuration.game))
-    event_pickup.replace_with_event_pickups(game)
-
-    new_game, starting_state = logic_bootstrap(configuration, game, patches)
-    logic = Logic(new_game, configuration)
-    starting_state.resources["add_self_as_requirement_to_resources"] = 1
+    logic, starting_state = _setup_resolver(configuration, patches)
     debug.log_resolve_start()
 
-    return await advance_depth(starting_state, logic, status_update)
+    if process_count <= 1:
+        return await advance_depth(starting_state, logic, status_update)
+
+    with multiprocessing.Pool(processes=process_count, initializer=_initialize_worker,
+                              initargs=(configuration, patches)) as pool, profiling_lib.phase("resolver.advance_depth"):
+        result = await _inner_advance_depth(starting_state, logic, status_update,
+                                            pool=_ResolverPool(pool, starting_state))
+        return result[0]
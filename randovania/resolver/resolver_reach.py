@@ -7,6 +7,7 @@ from randovania.game_description.game_description import calculate_interesting_r
 from randovania.game_description.node import ResourceNode, Node
 from randovania.game_description.requirements import RequirementList, RequirementSet, SatisfiableRequirements, \
     RequirementAnd, Requirement
+from randovania.lib import profiling_lib
 from randovania.resolver import debug
 from randovania.resolver.logic import Logic
 from randovania.resolver.state import State
@@ -44,6 +45,7 @@ class ResolverReach:
         self._satisfiable_requirements = requirements
 
     @classmethod
+    @profiling_lib.timed("resolver_reach.calculate_reach")
     def calculate_reach(cls,
                         logic: Logic,
                         initial_state: State) -> "ResolverReach":
@@ -63,6 +65,8 @@ class ResolverReach:
         path_to_node: Dict[Node, Tuple[Node, ...]] = {}
         path_to_node[initial_state.node] = tuple()
 
+        adjacency = logic.game.world_list.adjacency_for(initial_state.patches)
+
         while nodes_to_check:
             node = next(iter(nodes_to_check))
             energy = nodes_to_check.pop(node)
@@ -76,7 +80,7 @@ class ResolverReach:
 
             requirement_to_leave = node.requirement_to_leave(initial_state.patches, initial_state.resources)
 
-            for target_node, requirement in logic.game.world_list.potential_nodes_from(node, initial_state.patches):
+            for target_node, requirement in adjacency[node]:
                 if target_node is None:
                     continue
 
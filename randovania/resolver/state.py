@@ -1,12 +1,13 @@
 import copy
 import dataclasses
-from typing import Optional, Tuple, Iterator
+from typing import Optional, Tuple, Iterator, Hashable
 
 from randovania.game_description.game_patches import GamePatches
 from randovania.game_description.node import ResourceNode, Node
 from randovania.game_description.resources.logbook_asset import LogbookAsset
 from randovania.game_description.resources.pickup_entry import PickupEntry
 from randovania.game_description.resources.pickup_index import PickupIndex
+from randovania.game_description.resources.resource_collection import ResourceCollection
 from randovania.game_description.resources.resource_database import ResourceDatabase
 from randovania.game_description.resources.resource_info import ResourceInfo, CurrentResources, \
     add_resource_gain_to_current_resources, add_resources_into_another, convert_resource_gain_to_current_resources
@@ -68,6 +69,18 @@ class State:
     def has_resource(self, resource: ResourceInfo) -> bool:
         return self.resources.get(resource, 0) > 0
 
+    def fingerprint(self) -> Hashable:
+        """
+        A hashable value that's equal for states at the same node, with the same energy and resources,
+        regardless of how these states were reached.
+        :return:
+        """
+        if isinstance(self.resources, ResourceCollection):
+            resources = self.resources.fingerprint()
+        else:
+            resources = frozenset(self.resources.items())
+        return self.node, self.energy, resources
+
     def copy(self) -> "State":
         return State(copy.copy(self.resources),
                      self.collected_resource_nodes,
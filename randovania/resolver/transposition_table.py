@@ -0,0 +1,45 @@
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from randovania.resolver import debug
+
+DEFAULT_MAX_SIZE = 50000
+
+ResolverResult = Tuple[Optional["State"], bool]
+
+
+class TranspositionTable:
+    """
+    Remembers the states that were fully explored without reaching victory, so states reached again by a different
+    order of actions aren't explored again.
+    When full, the least recently used entries are discarded.
+    """
+    max_size: int
+    _entries: "OrderedDict[Hashable, ResolverResult]"
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, fingerprint: Hashable) -> Optional[ResolverResult]:
+        """
+        Gets the result stored for the given state fingerprint.
+        :param fingerprint: As given by `State.fingerprint`
+        :return: None, if there's no stored result.
+        """
+        result = self._entries.get(fingerprint)
+        if result is None:
+            debug.log_transposition_miss()
+        else:
+            self._entries.move_to_end(fingerprint)
+            debug.log_transposition_hit()
+        return result
+
+    def store(self, fingerprint: Hashable, result: ResolverResult):
+        self._entries[fingerprint] = result
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
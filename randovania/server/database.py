@@ -1,16 +1,23 @@
+import base64
+import collections
+import dataclasses
 import datetime
-import functools
 import json
-from typing import Iterator, List, Optional, Callable, Any
+import time
+from typing import Iterator, List, Optional, Callable, Any, Tuple, Dict, NamedTuple
 
 import peewee
 
+from randovania.bitpacking import bitpacking
 from randovania.game_description import default_database
+from randovania.game_description.resources.pickup_entry import PickupEntry
 from randovania.game_description.resources.pickup_index import PickupIndex
+from randovania.game_description.resources.resource_database import ResourceDatabase
 from randovania.games.game import RandovaniaGame
 from randovania.layout.layout_description import LayoutDescription
 from randovania.layout.preset import Preset
 from randovania.layout.preset_migration import VersionedPreset
+from randovania.network_common.pickup_serializer import BitPackPickupEntry
 from randovania.network_common.session_state import GameSessionState
 
 db = peewee.SqliteDatabase(None, pragmas={'foreign_keys': 1})
@@ -56,9 +63,111 @@ class User(BaseModel):
         }
 
 
-@functools.lru_cache()
-def _decode_layout_description(s):
-    return LayoutDescription.from_json_dict(json.loads(s))
+class SessionPickup(NamedTuple):
+    receiver_row: int
+    name: str
+    encoded_pickup: Optional[str]
+
+
+PickupLookup = Dict[Tuple[int, int], SessionPickup]
+
+
+def _base64_encode_pickup(pickup: PickupEntry, resource_database: ResourceDatabase) -> str:
+    encoded_pickup = bitpacking.pack_value(BitPackPickupEntry(pickup, resource_database))
+    return base64.b85encode(encoded_pickup).decode("utf-8")
+
+
+def _create_pickup_lookup(description: LayoutDescription) -> PickupLookup:
+    """
+    Indexes all pickups of the given layout by (provider row, location index).
+    Pickups for another player are encoded with the receiver's resource database, as they're sent to them.
+    :param description:
+    :return:
+    """
+    resource_databases = {
+        row: default_database.resource_database_for(preset.game)
+        for row, preset in description.permalink.presets.items()
+    }
+    return {
+        (provider, pickup_index.index): SessionPickup(
+            receiver_row=target.player,
+            name=target.pickup.name,
+            encoded_pickup=(_base64_encode_pickup(target.pickup, resource_databases[target.player])
+                            if target.player != provider else None),
+        )
+        for provider, patches in description.all_patches.items()
+        for pickup_index, target in patches.pickup_assignment.items()
+    }
+
+
+@dataclasses.dataclass()
+class _CachedLayout:
+    description_json: str
+    description: LayoutDescription
+    last_used: float
+    pickup_lookup: Optional[PickupLookup] = None
+
+
+class _LayoutDescriptionCache:
+    """
+    Decoded LayoutDescription of the most recently used sessions, along with what's derived from it.
+    Each entry remembers the JSON it came from, so a layout changed by another process is never returned.
+    Entries not used for `ttl` seconds are dropped, as are the least recently used ones past `max_size`.
+    """
+    _entries: "collections.OrderedDict[int, _CachedLayout]"
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+
+    def _evict(self, now: float):
+        while self._entries:
+            oldest_id, oldest = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_size and now - oldest.last_used <= self.ttl:
+                break
+            del self._entries[oldest_id]
+
+    def _entry(self, session_id: int, description_json: str) -> _CachedLayout:
+        now = time.monotonic()
+        entry = self._entries.get(session_id)
+        # Comparing equal strings is a memcmp, unlike hashing them
+        if entry is not None and (entry.description_json is description_json
+                                  or entry.description_json == description_json):
+            entry.last_used = now
+            self._entries.move_to_end(session_id)
+            self._evict(now)
+            return entry
+
+        return self.store(session_id, description_json,
+                          LayoutDescription.from_json_dict(json.loads(description_json)), now)
+
+    def get(self, session_id: int, description_json: str) -> LayoutDescription:
+        return self._entry(session_id, description_json).description
+
+    def pickup_lookup(self, session_id: int, description_json: str) -> PickupLookup:
+        entry = self._entry(session_id, description_json)
+        if entry.pickup_lookup is None:
+            entry.pickup_lookup = _create_pickup_lookup(entry.description)
+        return entry.pickup_lookup
+
+    def store(self, session_id: int, description_json: str, description: LayoutDescription,
+              now: Optional[float] = None) -> _CachedLayout:
+        if now is None:
+            now = time.monotonic()
+        entry = self._entries[session_id] = _CachedLayout(description_json, description, now)
+        self._entries.move_to_end(session_id)
+        self._evict(now)
+        return entry
+
+    def invalidate(self, session_id: int):
+        self._entries.pop(session_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+_layout_description_cache = _LayoutDescriptionCache(max_size=64, ttl=3600)
 
 
 def _datetime_now():
@@ -90,11 +199,28 @@ class GameSession(BaseModel):
     @property
     def layout_description(self) -> Optional[LayoutDescription]:
         # FIXME: a server can have an invalid layout description. Likely from an old version!
-        return _decode_layout_description(self.layout_description_json) if self.layout_description_json else None
+        if not self.layout_description_json:
+            return None
+        return _layout_description_cache.get(self.id, self.layout_description_json)
 
     @layout_description.setter
     def layout_description(self, description: Optional[LayoutDescription]):
-        self.layout_description_json = json.dumps(description.as_json) if description is not None else None
+        if description is not None:
+            self.layout_description_json = json.dumps(description.as_json)
+            _layout_description_cache.store(self.id, self.layout_description_json, description)
+        else:
+            self.layout_description_json = None
+            _layout_description_cache.invalidate(self.id)
+
+    @property
+    def pickup_lookup(self) -> Optional[PickupLookup]:
+        """
+        Who receives the pickup of each location of the layout, indexed by (provider row, location index).
+        Built once per layout and kept along with the decoded LayoutDescription.
+        """
+        if not self.layout_description_json:
+            return None
+        return _layout_description_cache.pickup_lookup(self.id, self.layout_description_json)
 
     @property
     def creation_datetime(self) -> datetime.datetime:
@@ -111,31 +237,42 @@ class GameSession(BaseModel):
             "creation_date": self.creation_datetime.astimezone(datetime.timezone.utc).isoformat(),
         }
 
-    def create_session_entry(self):
-        description = self.layout_description
-
+    def _location_to_name(self) -> Dict[int, str]:
         location_to_name = {
             row: f"Player {row + 1}" for row in range(self.num_rows)
         }
         for membership in self.players:
             if not membership.is_observer:
                 location_to_name[membership.row] = membership.effective_name
+        return location_to_name
+
+    def describe_actions(self, actions: Iterator["GameSessionTeamAction"]) -> List[dict]:
+        location_to_name = self._location_to_name()
+        pickup_lookup = self.pickup_lookup
 
         def _describe_action(action: GameSessionTeamAction) -> dict:
             provider: int = action.provider_row
             receiver: int = action.receiver_row
             provider_location_index = PickupIndex(action.provider_location_index)
-            time = datetime.datetime.fromisoformat(action.time)
-            target = description.all_patches[provider].pickup_assignment[provider_location_index]
+            time = action.time
+            if isinstance(time, str):
+                # Only actions read back from the database have it as a string
+                time = datetime.datetime.fromisoformat(time)
+            session_pickup = pickup_lookup[(provider, action.provider_location_index)]
 
             return {
                 "provider": location_to_name[provider],
                 "receiver": location_to_name[receiver],
-                "pickup": target.pickup.name,
+                "pickup": session_pickup.name,
                 "location": str(provider_location_index),
                 "time": time.astimezone(datetime.timezone.utc).isoformat(),
             }
 
+        return [_describe_action(action) for action in actions]
+
+    def create_session_entry(self):
+        description = self.layout_description
+
         if description is not None:
             game_details = {
                 "spoiler": description.permalink.spoiler,
@@ -167,11 +304,10 @@ class GameSession(BaseModel):
                 json.loads(preset.preset)
                 for preset in sorted(self.presets, key=lambda it: it.row)
             ],
-            "actions": [
-                _describe_action(action)
-                for action in GameSessionTeamAction.select().where(GameSessionTeamAction.session == self
-                                                                   ).order_by(GameSessionTeamAction.time.asc())
-            ],
+            "actions": self.describe_actions(
+                GameSessionTeamAction.select().where(GameSessionTeamAction.session == self
+                                                     ).order_by(GameSessionTeamAction.time.asc())
+            ),
             **game_details,
             "generation_in_progress": (self.generation_in_progress.id
                                        if self.generation_in_progress is not None else None),
@@ -180,6 +316,7 @@ class GameSession(BaseModel):
 
     def reset_layout_description(self):
         self.layout_description_json = None
+        _layout_description_cache.invalidate(self.id)
         self.save()
 
 
@@ -255,6 +392,10 @@ class GameSessionTeamAction(BaseModel):
 
     class Meta:
         primary_key = peewee.CompositeKey('session', 'provider_row', 'provider_location_index')
+        indexes = (
+            # For querying the pickups a player received, in order
+            (('session', 'receiver_row', 'time'), False),
+        )
 
 
 all_classes = [User, GameSession, GameSessionPreset, GameSessionMembership, GameSessionTeamAction]
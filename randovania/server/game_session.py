@@ -1,19 +1,14 @@
-import base64
 import hashlib
 import json
 import logging
 import typing
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict
 
 import flask
 import flask_socketio
 import peewee
 
-from randovania.bitpacking import bitpacking
 from randovania.game_description import default_database
-from randovania.game_description.assignment import PickupTarget
-from randovania.game_description.resources.pickup_entry import PickupEntry
-from randovania.game_description.resources.pickup_index import PickupIndex
 from randovania.game_description.resources.resource_database import ResourceDatabase
 from randovania.games.game import RandovaniaGame
 from randovania.interface_common.cosmetic_patches import CosmeticPatches
@@ -24,11 +19,11 @@ from randovania.layout.preset_migration import VersionedPreset
 from randovania.network_common.admin_actions import SessionAdminGlobalAction, SessionAdminUserAction
 from randovania.network_common.error import WrongPassword, \
     NotAuthorizedForAction, InvalidAction
-from randovania.network_common.pickup_serializer import BitPackPickupEntry
+from randovania.network_common.session_delta import GameSessionDeltaKind
 from randovania.network_common.session_state import GameSessionState
 from randovania.server import database
 from randovania.server.database import GameSession, GameSessionMembership, GameSessionTeamAction, \
-    GameSessionPreset
+    GameSessionPreset, PickupLookup, SessionPickup
 from randovania.server.lib import logger
 from randovania.server.server_app import ServerApp
 
@@ -56,7 +51,7 @@ def create_game_session(sio: ServerApp, session_name: str):
             row=0, admin=True, connection_state="Online, Unknown")
 
     sio.join_game_session(membership)
-    return new_session.create_session_entry()
+    return _create_session_entry(new_session)
 
 
 def join_game_session(sio: ServerApp, session_id: int, password: Optional[str]):
@@ -72,10 +67,10 @@ def join_game_session(sio: ServerApp, session_id: int, password: Optional[str]):
                                                      defaults={"row": None, "admin": False,
                                                                "connection_state": "Online, Unknown"})[0]
 
-    _emit_session_update(session)
+    _emit_player_delta(membership)
     sio.join_game_session(membership)
 
-    return session.create_session_entry()
+    return _create_session_entry(session)
 
 
 def disconnect_game_session(sio: ServerApp, session_id: int):
@@ -84,7 +79,7 @@ def disconnect_game_session(sio: ServerApp, session_id: int):
         current_membership = GameSessionMembership.get_by_ids(current_user.id, session_id)
         current_membership.connection_state = "Offline"
         current_membership.save()
-        _emit_session_update(current_membership.session)
+        _emit_player_delta(current_membership)
     except peewee.DoesNotExist:
         pass
     sio.leave_game_session()
@@ -131,13 +126,47 @@ def _get_preset(preset_json: dict) -> VersionedPreset:
         raise InvalidAction(f"invalid preset: {e}")
 
 
+# Incremented for every update sent to a session, so clients can detect missed updates.
+# Not persisted: after a restart the numbers don't match and clients ask for the whole session again.
+_session_sequences: Dict[int, int] = {}
+
+
+def _create_session_entry(session: GameSession) -> dict:
+    return {
+        **session.create_session_entry(),
+        "sequence": _session_sequences.get(session.id, 0),
+    }
+
+
 def _emit_session_update(session: GameSession):
-    flask_socketio.emit("game_session_update", session.create_session_entry(), room=f"game-session-{session.id}")
+    _session_sequences[session.id] = _session_sequences.get(session.id, 0) + 1
+    flask_socketio.emit("game_session_update", _create_session_entry(session), room=f"game-session-{session.id}")
+
+
+def _emit_session_delta(session_id: int, kind: GameSessionDeltaKind, data):
+    """
+    Sends a single change of the session, instead of the whole session.
+    :param session_id:
+    :param kind:
+    :param data:
+    :return:
+    """
+    sequence = _session_sequences[session_id] = _session_sequences.get(session_id, 0) + 1
+    flask_socketio.emit("game_session_delta", {
+        "session": session_id,
+        "sequence": sequence,
+        "kind": kind.value,
+        "data": data,
+    }, room=f"game-session-{session_id}")
+
+
+def _emit_player_delta(membership: GameSessionMembership):
+    _emit_session_delta(membership.session.id, GameSessionDeltaKind.PLAYER, membership.as_json)
 
 
 def game_session_request_update(sio: ServerApp, session_id):
     session: database.GameSession = database.GameSession.get_by_id(session_id)
-    return session.create_session_entry()
+    return _create_session_entry(session)
 
 
 def _create_row(sio: ServerApp, session: GameSession, preset_json: dict):
@@ -175,6 +204,8 @@ def _change_row(sio: ServerApp, session: GameSession, arg: Tuple[int, dict]):
     except peewee.DoesNotExist:
         raise InvalidAction(f"invalid row: {row_id}")
 
+    _emit_session_delta(session.id, GameSessionDeltaKind.PRESET, {"row": row_id, "preset": preset.as_json})
+
 
 def _delete_row(sio: ServerApp, session: GameSession, row_id: int):
     _verify_has_admin(sio, session.id, None)
@@ -321,6 +352,8 @@ def game_session_admin_session(sio: ServerApp, session_id: int, action: str, arg
 
     elif action == SessionAdminGlobalAction.CHANGE_ROW:
         _change_row(sio, session, arg)
+        # Only that row changed, which _change_row already sent
+        return
 
     elif action == SessionAdminGlobalAction.DELETE_ROW:
         _delete_row(sio, session, arg)
@@ -456,53 +489,82 @@ def _query_for_actions(membership: GameSessionMembership) -> peewee.ModelSelect:
         GameSessionTeamAction.provider_row != membership.row,
         GameSessionTeamAction.session == membership.session,
         GameSessionTeamAction.receiver_row == membership.row,
-    ).order_by(GameSessionTeamAction.time.asc())
-
+    ).order_by(GameSessionTeamAction.time.asc(),
+               GameSessionTeamAction.provider_row.asc(),
+               GameSessionTeamAction.provider_location_index.asc())
 
-def _base64_encode_pickup(pickup: PickupEntry, resource_database: ResourceDatabase) -> str:
-    encoded_pickup = bitpacking.pack_value(BitPackPickupEntry(pickup, resource_database))
-    return base64.b85encode(encoded_pickup).decode("utf-8")
 
-
-def _collect_location(session: GameSession, membership: GameSessionMembership,
-                      description: LayoutDescription,
-                      pickup_location: int) -> Optional[int]:
+def _collect_locations(session: GameSession, membership: GameSessionMembership,
+                       pickup_lookup: PickupLookup,
+                       pickup_locations: Tuple[int, ...]) -> List[GameSessionTeamAction]:
     """
-    Collects the pickup in the given location. Returns
+    Collects the pickups in the given locations, creating all new actions in a single transaction.
     :param session:
     :param membership:
-    :param description:
-    :param pickup_location:
-    :return: The rewarded player if some player must be updated of the fact.
+    :param pickup_lookup:
+    :param pickup_locations:
+    :return: The new actions, for which some player must be updated of the fact.
     """
     player_row: int = membership.row
-    pickup_target = _get_pickup_target(description, player_row, pickup_location)
 
-    def log(msg):
-        logger().info(f"Session {session.id}, Row {membership.row} found item at {pickup_location}. {msg}")
+    def log(pickup_location: int, msg: str):
+        logger().info(f"Session {session.id}, Row {player_row} found item at {pickup_location}. {msg}")
 
-    if pickup_target is None:
-        log(f"It's an ETM.")
-        return None
+    targets: Dict[int, SessionPickup] = {}
+    for pickup_location in sorted(set(pickup_locations)):
+        pickup_target = pickup_lookup.get((player_row, pickup_location))
 
-    if pickup_target.player == membership.row:
-        log(f"It's a {pickup_target.pickup.name} for themselves.")
-        return None
+        if pickup_target is None:
+            log(pickup_location, f"It's an ETM.")
 
-    try:
-        GameSessionTeamAction.create(
-            session=session,
-            provider_row=membership.row,
-            provider_location_index=pickup_location,
-            receiver_row=pickup_target.player,
-        )
-    except peewee.IntegrityError:
-        # Already exists and it's for another player, no inventory update needed
-        log(f"It's a {pickup_target.pickup.name} for {pickup_target.player}, but it was already collected.")
-        return None
+        elif pickup_target.receiver_row == player_row:
+            log(pickup_location, f"It's a {pickup_target.name} for themselves.")
 
-    log(f"It's a {pickup_target.pickup.name} for {pickup_target.player}.")
-    return pickup_target.player
+        else:
+            targets[pickup_location] = pickup_target
+
+    if not targets:
+        return []
+
+    # IMMEDIATE takes the write lock before reading, so a concurrent request for the same locations waits for this
+    # one to finish instead of also seeing them as not collected
+    with database.db.atomic("IMMEDIATE"):
+        existing_locations = {
+            action.provider_location_index
+            for action in GameSessionTeamAction.select(GameSessionTeamAction.provider_location_index).where(
+                GameSessionTeamAction.session == session,
+                GameSessionTeamAction.provider_row == player_row,
+                GameSessionTeamAction.provider_location_index.in_(list(targets.keys())),
+            )
+        }
+
+        new_actions = []
+        for pickup_location, pickup_target in targets.items():
+            if pickup_location in existing_locations:
+                # Already exists and it's for another player, no inventory update needed
+                log(pickup_location, f"It's a {pickup_target.name} for {pickup_target.receiver_row}, "
+                                     f"but it was already collected.")
+            else:
+                log(pickup_location, f"It's a {pickup_target.name} for {pickup_target.receiver_row}.")
+                new_actions.append(GameSessionTeamAction(
+                    session=session,
+                    provider_row=player_row,
+                    provider_location_index=pickup_location,
+                    receiver_row=pickup_target.receiver_row,
+                ))
+
+        fields = [GameSessionTeamAction.session, GameSessionTeamAction.provider_row,
+                  GameSessionTeamAction.provider_location_index, GameSessionTeamAction.receiver_row,
+                  GameSessionTeamAction.time]
+        rows = [
+            (session.id, action.provider_row, action.provider_location_index, action.receiver_row, action.time)
+            for action in new_actions
+        ]
+        # Keep each statement under SQLite's limit of variables
+        for batch in peewee.chunked(rows, 100):
+            GameSessionTeamAction.insert_many(batch, fields=fields).on_conflict_ignore().execute()
+
+    return new_actions
 
 
 def game_session_collect_locations(sio: ServerApp, session_id: int, pickup_locations: Tuple[int, ...]):
@@ -516,42 +578,41 @@ def game_session_collect_locations(sio: ServerApp, session_id: int, pickup_locat
     if membership.is_observer:
         raise InvalidAction("Observers can't collect locations")
 
-    description = session.layout_description
-
-    receiver_players = set()
-    for location in pickup_locations:
-        receiver_player = _collect_location(session, membership, description, location)
-        if receiver_player is not None:
-            receiver_players.add(receiver_player)
-
-    if not receiver_players:
+    new_actions = _collect_locations(session, membership, session.pickup_lookup, pickup_locations)
+    if not new_actions:
         return
 
-    for receiver_player in receiver_players:
-        try:
-            receiver_membership = GameSessionMembership.get_by_session_position(session, row=receiver_player)
-            flask_socketio.emit(
-                "game_has_update",
-                {
-                    "session": session_id,
-                    "row": receiver_player,
-                },
-                room=f"game-session-{receiver_membership.session.id}-{receiver_membership.user.id}")
-        except peewee.DoesNotExist:
-            pass
-    _emit_session_update(session)
+    receiver_memberships = GameSessionMembership.select().where(
+        GameSessionMembership.session == session,
+        GameSessionMembership.row.in_(list({action.receiver_row for action in new_actions})),
+    )
+    for receiver_membership in receiver_memberships:
+        flask_socketio.emit(
+            "game_has_update",
+            {
+                "session": session_id,
+                "row": receiver_membership.row,
+            },
+            room=f"game-session-{session_id}-{receiver_membership.user_id}")
+
+    for description in session.describe_actions(new_actions):
+        _emit_session_delta(session_id, GameSessionDeltaKind.ACTION, description)
 
 
 def _get_resource_database(description: LayoutDescription, player: int) -> ResourceDatabase:
     return default_database.resource_database_for(description.permalink.get_preset(player).game)
 
 
-def _get_pickup_target(description: LayoutDescription, provider: int, location: int) -> Optional[PickupTarget]:
-    pickup_assignment = description.all_patches[provider].pickup_assignment
-    return pickup_assignment.get(PickupIndex(location))
-
-
-def game_session_request_pickups(sio: ServerApp, session_id: int):
+def game_session_request_pickups(sio: ServerApp, session_id: int, start_index: int = 0,
+                                 start_row: Optional[int] = None):
+    """
+    Gets the pickups the current user received from other players, in the order they were received.
+    :param sio:
+    :param session_id:
+    :param start_index: How many pickups the client already has. Only pickups after these are returned.
+    :param start_row: The row the client's pickups are for. When it isn't the user's row, all pickups are returned.
+    :return:
+    """
     current_user = sio.get_current_user()
     your_membership = GameSessionMembership.get_by_ids(current_user.id, session_id)
     session: GameSession = your_membership.session
@@ -566,6 +627,7 @@ def game_session_request_pickups(sio: ServerApp, session_id: int):
         return None
 
     description = session.layout_description
+    pickup_lookup = session.pickup_lookup
     row_to_member_name = {
         member.row: member.effective_name
         for member in GameSessionMembership.non_observer_members(session)
@@ -573,10 +635,14 @@ def game_session_request_pickups(sio: ServerApp, session_id: int):
 
     resource_database = _get_resource_database(description, your_membership.row)
 
+    query = _query_for_actions(your_membership)
+    if start_row != your_membership.row or start_index > query.count():
+        start_index = 0
+
     result = []
-    actions: List[GameSessionTeamAction] = list(_query_for_actions(your_membership))
+    actions: List[GameSessionTeamAction] = list(query.offset(start_index))
     for action in actions:
-        pickup_target = _get_pickup_target(description, action.provider_row, action.provider_location_index)
+        pickup_target = pickup_lookup.get((action.provider_row, action.provider_location_index))
 
         if pickup_target is None:
             logging.error(f"Action {action} has a location index with nothing.")
@@ -585,14 +651,17 @@ def game_session_request_pickups(sio: ServerApp, session_id: int):
             name = row_to_member_name.get(action.provider_row, f"Player {action.provider_row + 1}")
             result.append({
                 "provider_name": name,
-                "pickup": _base64_encode_pickup(pickup_target.pickup, resource_database),
+                "pickup": pickup_target.encoded_pickup,
             })
 
     logger().info(f"Session {session_id}, Row {your_membership.row} "
-                  f"requested pickups, returning {len(result)} elements for {resource_database.game_enum.value}.")
+                  f"requested pickups starting at {start_index}, "
+                  f"returning {len(result)} elements for {resource_database.game_enum.value}.")
 
     return {
         "game": resource_database.game_enum.value,
+        "row": your_membership.row,
+        "start": start_index,
         "pickups": result,
     }
 
@@ -604,7 +673,7 @@ def game_session_self_update(sio: ServerApp, session_id: int, inventory: str, ga
     membership.connection_state = f"Online, {game_connection_state}"
     membership.inventory = inventory
     membership.save()
-    _emit_session_update(membership.session)
+    _emit_player_delta(membership)
 
 
 def report_user_disconnected(sio: ServerApp, user_id: int, log):
@@ -612,16 +681,12 @@ def report_user_disconnected(sio: ServerApp, user_id: int, log):
         GameSessionMembership.user == user_id))
 
     log.info(f"User {user_id} is disconnected, disconnecting from sessions: {memberships}")
-    sessions_to_update = []
 
     for membership in memberships:
         if membership.connection_state != "Offline":
             membership.connection_state = "Offline"
-            sessions_to_update.append(membership.session)
             membership.save()
-
-    for session in sessions_to_update:
-        _emit_session_update(session)
+            _emit_player_delta(membership)
 
 
 def setup_app(sio: ServerApp):
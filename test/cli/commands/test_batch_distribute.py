@@ -1,3 +1,9 @@
+import contextlib
+import json
+import threading
+from argparse import Namespace
+
+import pytest
 from mock import MagicMock, AsyncMock
 
 from randovania.cli.commands import batch_distribute
@@ -28,13 +34,128 @@ def test_batch_distribute_helper(mocker):
     mock_perf_counter.side_effect = [1000, 5000]
 
     # Run
-    delta_time = batch_distribute.batch_distribute_helper(base_permalink, seed_number, timeout, validate, output_dir)
+    result = batch_distribute.batch_distribute_helper(base_permalink, seed_number, timeout, validate, output_dir)
 
     # Assert
     mock_generate_description.assert_awaited_once_with(permalink=expected_permalink, status_update=None,
                                                        validate_after_generation=validate, timeout=timeout,
                                                        attempts=0)
 
-    assert delta_time == 4000
+    assert result == {
+        "seed_number": seed_number,
+        "hash": description.shareable_hash,
+        "duration": 4000,
+        "attempts": 0,
+        "failure": None,
+    }
     output_dir.joinpath.assert_called_once_with("{}.rdvgame".format(seed_number))
     description.save_to_file.assert_called_once_with(output_dir.joinpath.return_value)
+
+
+def test_initialize_worker(mocker):
+    mock_preload = mocker.patch("randovania.game_description.default_database.preload_games")
+    mock_preset_bootstrap = mocker.patch("randovania.generator.generator.preset_bootstrap_for")
+    games = {MagicMock()}
+    configurations = [MagicMock(), MagicMock()]
+
+    # Run
+    batch_distribute._initialize_worker(games, configurations)
+
+    # Assert
+    mock_preload.assert_called_once_with(games)
+    mock_preset_bootstrap.assert_has_calls([mocker.call(configuration) for configuration in configurations])
+
+
+def test_batch_distribute_helper_profile(mocker, tmp_path):
+    # Setup
+    mocker.patch("randovania.generator.generator.generate_and_validate_description",
+                 new_callable=AsyncMock, side_effect=RuntimeError("timeout"))
+    base_permalink = MagicMock()
+
+    # Run
+    result = batch_distribute.batch_distribute_helper(base_permalink, 5000, 60, True, tmp_path,
+                                                      profile_dir=tmp_path, profile_format="chrome-trace")
+
+    # Assert
+    assert result["failure"] == "timeout"
+    assert result["hash"] is None
+    assert json.loads(tmp_path.joinpath("5000.chrome-trace.json").read_text())["traceEvents"] == []
+    assert list(tmp_path.glob("*.rdvgame")) == []
+
+
+def test_read_finished_seeds(tmp_path):
+    tmp_path.joinpath("1000.rdvgame").write_text("{}")
+    tmp_path.joinpath("other.rdvgame").write_text("{}")
+    tmp_path.joinpath(batch_distribute.INDEX_FILE_NAME).write_text(
+        json.dumps({"seed_number": 1001, "failure": "Timeout"}) + "\n"
+        + json.dumps({"seed_number": 1002, "failure": None}) + "\n"
+        + '{"seed_num'
+    )
+
+    # Run
+    result = batch_distribute.read_finished_seeds(tmp_path)
+
+    # Assert
+    assert result == {1000, 1001, 1002}
+
+
+def test_open_index_for_append(tmp_path):
+    index_path = tmp_path.joinpath(batch_distribute.INDEX_FILE_NAME)
+    index_path.write_text(json.dumps({"seed_number": 1001}) + "\n" + '{"seed_num')
+
+    # Run
+    with batch_distribute._open_index_for_append(index_path) as index_file:
+        index_file.write(json.dumps({"seed_number": 1002}) + "\n")
+
+    # Assert
+    assert batch_distribute.read_finished_seeds(tmp_path) == {1001, 1002}
+
+
+class _FakePool:
+    def __init__(self, processes, initializer, initargs):
+        self.arguments = iter(())
+        self.finished_giving_tasks = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # Like multiprocessing.Pool, wait for all tasks to be given before finishing
+        thread = threading.Thread(target=lambda: list(self.arguments))
+        thread.start()
+        thread.join(5)
+        self.finished_giving_tasks = not thread.is_alive()
+
+    def imap_unordered(self, function, arguments):
+        self.arguments = iter(arguments)
+        for argument in self.arguments:
+            yield function(argument)
+
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_batch_distribute_command_logic(mocker, tmp_path, fail):
+    def generate(arguments):
+        seed_number = arguments[1]
+        if fail and seed_number == 1001:
+            raise RuntimeError("Broken")
+        return {"seed_number": seed_number, "failure": None, "duration": 1}
+
+    pools = []
+    mocker.patch("multiprocessing.Pool", side_effect=lambda **kwargs: pools.append(_FakePool(**kwargs)) or pools[-1])
+    mocker.patch("randovania.cli.commands.batch_distribute._batch_distribute_helper_with_tuple", side_effect=generate)
+    mocker.patch("randovania.cli.commands.batch_distribute._initialize_worker")
+    mocker.patch("randovania.interface_common.sleep_inhibitor.get_inhibitor", return_value=contextlib.nullcontext())
+    mock_permalink = mocker.patch("randovania.layout.permalink.Permalink.from_str")
+    mock_permalink.return_value.seed_number = 1000
+    mock_permalink.return_value.presets = {}
+
+    args = Namespace(permalink="<permalink>", seed_count=4, timeout=60, validate=True, output_dir=tmp_path,
+                     profile_dir=None, profile_format="json", process_count=1, max_in_flight=1)
+
+    # Run
+    with pytest.raises(RuntimeError) if fail else contextlib.nullcontext():
+        batch_distribute.batch_distribute_command_logic(args)
+
+    # Assert
+    assert pools[0].finished_giving_tasks
+    assert batch_distribute.read_finished_seeds(tmp_path) == ({1000} if fail else {1000, 1001, 1002, 1003})
@@ -8,9 +8,10 @@ from randovania.games.game import RandovaniaGame
 from randovania.layout.permalink import Permalink
 
 
+@pytest.mark.parametrize("process_count", [1, 4])
 @pytest.mark.parametrize("preset_name", [None, "Starter Preset"])
 @pytest.mark.parametrize("no_retry", [False, True])
-def test_distribute_command_logic(no_retry: bool, preset_name: str, mocker, preset_manager):
+def test_distribute_command_logic(no_retry: bool, preset_name: str, process_count: int, mocker, preset_manager):
     # Setup
     mock_generate: AsyncMock = mocker.patch("randovania.generator.generator.generate_and_validate_description",
                                             new_callable=AsyncMock)
@@ -22,9 +23,12 @@ def test_distribute_command_logic(no_retry: bool, preset_name: str, mocker, pres
     args.game = RandovaniaGame.PRIME2.value
     args.preset_name = preset_name
     args.seed_number = 0
+    args.process_count = process_count
     extra_args = {}
     if no_retry:
         extra_args["attempts"] = 0
+    if process_count > 1:
+        extra_args["process_count"] = process_count
 
     if preset_name is None:
         permalink = mock_from_str.return_value
@@ -0,0 +1,62 @@
+from mock import MagicMock, AsyncMock
+
+from randovania.cli import benchmark
+from randovania.games.game import RandovaniaGame
+from randovania.lib import profiling_lib
+
+
+def test_run_benchmark_case(mocker):
+    async def generate(**kwargs):
+        with profiling_lib.phase("filler"):
+            profiling_lib.increment("generator_reach.advance_to", 5)
+
+    mock_generate: AsyncMock = mocker.patch("randovania.generator.generator.generate_and_validate_description",
+                                            side_effect=generate)
+    mocker.patch("randovania.cli.benchmark._peak_rss", return_value=1234)
+    mock_permalink = mocker.patch("randovania.layout.permalink.Permalink")
+    preset = MagicMock()
+    preset.game = RandovaniaGame.PRIME1
+    preset.name = "Starter Preset"
+
+    # Run
+    result = benchmark.run_benchmark_case(preset, 1000, True, 60)
+
+    # Assert
+    mock_permalink.assert_called_once_with(seed_number=1000, spoiler=True, presets={0: preset})
+    mock_generate.assert_called_once_with(permalink=mock_permalink.return_value, status_update=None,
+                                          validate_after_generation=True, timeout=60, attempts=0)
+    assert result["game"] == "prime1"
+    assert result["preset"] == "Starter Preset"
+    assert result["success"]
+    assert result["peak_rss"] == 1234
+    assert list(result["timers"].keys()) == ["filler"]
+    assert result["counters"] == {"generator_reach.advance_to": 5}
+
+
+def test_run_benchmark_case_in_subprocess(mocker):
+    mock_get_context = mocker.patch("multiprocessing.get_context")
+    pool = mock_get_context.return_value.Pool.return_value.__enter__.return_value
+    preset = MagicMock()
+
+    # Run
+    result = benchmark.run_benchmark_case_in_subprocess(preset, 1000, True, 60)
+
+    # Assert
+    mock_get_context.assert_called_once_with("spawn")
+    pool.apply.assert_called_once_with(benchmark.run_benchmark_case, (preset, 1000, True, 60))
+    assert result is pool.apply.return_value
+
+
+def test_compare_results():
+    def case(seed_number, total_time, filler):
+        return {"game": "prime1", "preset": "Starter Preset", "seed_number": seed_number,
+                "total_time": total_time, "timers": {"filler": filler}}
+
+    previous = {"cases": [case(1000, 2.0, 1.5), case(1001, 2.0, 1.5)]}
+    current = {"cases": [case(1000, 2.1, 1.6), case(1001, 3.0, 1.5), case(1002, 10.0, 9.0)]}
+
+    # Run
+    regressions = benchmark.compare_results(previous, current, 0.25)
+
+    # Assert
+    assert regressions == ["prime1 - Starter Preset - seed 1001: total_time went from 2.000s to 3.000s"]
@@ -0,0 +1,112 @@
+import itertools
+
+import pytest
+
+from randovania.game_description import compiled_requirement
+from randovania.game_description.compiled_requirement import compile_requirement, CompiledRequirement
+from randovania.game_description.requirements import ResourceRequirement, RequirementAnd, RequirementOr, \
+    Requirement, RequirementTemplate
+from randovania.game_description.resources.damage_resource_info import DamageReduction
+from randovania.game_description.resources.item_resource_info import ItemResourceInfo
+from randovania.game_description.resources.resource_database import ResourceDatabase
+from randovania.game_description.resources.resource_type import ResourceType
+from randovania.game_description.resources.simple_resource_info import SimpleResourceInfo
+from randovania.games.game import RandovaniaGame
+
+
+@pytest.fixture(name="database")
+def _database() -> ResourceDatabase:
+    items = [
+        ItemResourceInfo(0, "A", "A", 1, None),
+        ItemResourceInfo(1, "B", "B", 3, None),
+        ItemResourceInfo(2, "C", "C", 1, None),
+    ]
+    damage = SimpleResourceInfo(0, "Damage", "Damage", ResourceType.DAMAGE)
+    return ResourceDatabase(
+        game_enum=RandovaniaGame.PRIME2,
+        item=items,
+        event=[],
+        trick=[],
+        damage=[damage],
+        version=[],
+        misc=[],
+        requirement_template={},
+        damage_reductions={damage: [DamageReduction(items[2], 0.5)]},
+        energy_tank_item_index=0,
+        item_percentage_index=None,
+        multiworld_magic_item_index=0
+    )
+
+
+def _requirement(database: ResourceDatabase) -> Requirement:
+    a, b, c = database.item
+    damage = database.damage[0]
+
+    return RequirementOr([
+        RequirementAnd([
+            ResourceRequirement(a, 1, False),
+            RequirementOr([
+                ResourceRequirement(damage, 40, False),
+                ResourceRequirement(b, 2, False),
+            ]),
+        ]),
+        RequirementAnd([
+            ResourceRequirement(c, 1, True),
+            ResourceRequirement(damage, 30, False),
+            ResourceRequirement(damage, 30, False),
+        ]),
+        RequirementAnd([
+            ResourceRequirement(b, 1, False),
+            ResourceRequirement(c, 1, False),
+        ]),
+    ])
+
+
+def test_compiled_matches_tree(database):
+    requirement = _requirement(database)
+    compiled = compile_requirement(requirement, database)
+    assert isinstance(compiled, CompiledRequirement)
+
+    for a, b, c in itertools.product([0, 1], [0, 1, 2], [0, 1]):
+        resources = {
+            item: quantity
+            for item, quantity in zip(database.item, (a, b, c))
+        }
+        collection = database.create_resource_collection(resources)
+
+        assert compiled.damage(collection, database) == requirement.damage(resources, database)
+        for energy in (1, 30, 31, 41, 61):
+            assert compiled.satisfied(collection, energy, database) == requirement.satisfied(resources, energy,
+                                                                                           database)
+
+
+def test_compiled_inlines_templates(database):
+    a = database.item[0]
+    template = RequirementTemplate(database, "Template")
+    database.requirement_template["Template"] = ResourceRequirement(a, 1, False)
+
+    compiled = compile_requirement(RequirementAnd([template]), database)
+
+    assert compiled.satisfied(database.create_resource_collection({a: 1}), 99, database)
+    assert not compiled.satisfied(database.create_resource_collection({}), 99, database)
+
+
+def test_compiled_delegates_to_original(database):
+    requirement = _requirement(database)
+    compiled = compile_requirement(requirement, database)
+
+    assert compiled == requirement
+    assert hash(compiled) == hash(requirement)
+    assert str(compiled) == str(requirement)
+    assert compiled.as_set == requirement.as_set
+    assert compiled.simplify() == requirement.simplify()
+    assert compile_requirement(compiled, database) == requirement
+    # Plain dicts use the tree
+    assert compiled.satisfied({database.item[1]: 1, database.item[2]: 1}, 99, database)
+
+
+def test_compile_too_many_alternatives(database, monkeypatch):
+    monkeypatch.setattr(compiled_requirement, "MAX_ALTERNATIVES", 2)
+    requirement = _requirement(database)
+
+    assert compile_requirement(requirement, database) is requirement
@@ -1,3 +1,5 @@
+import copy
+import pickle
 from typing import Tuple
 from unittest.mock import MagicMock
 
@@ -5,7 +7,7 @@ import pytest
 
 from randovania.game_description import data_reader
 from randovania.game_description.requirements import ResourceRequirement, RequirementList, RequirementSet, \
-    RequirementAnd, RequirementOr, Requirement, MAX_DAMAGE, RequirementTemplate
+    RequirementAnd, RequirementOr, Requirement, MAX_DAMAGE, RequirementTemplate, patched_requirements_memo
 from randovania.game_description.resources.item_resource_info import ItemResourceInfo
 from randovania.game_description.resources.resource_database import ResourceDatabase
 from randovania.game_description.resources.resource_type import ResourceType
@@ -484,3 +486,92 @@ def test_simple_echoes_damage(echoes_resource_database):
     assert req.damage({}, db) == 50
     assert req.damage({d_suit: 1}, db) == 11
     assert req.damage({l_suit: 1}, db) == 0
+
+
+@pytest.mark.parametrize(["resources", "expected"], [
+    ({}, False),
+    ({"A": 1}, False),
+    ({"A": 1, "B": 1}, False),
+    ({"A": 1, "B": 3}, True),
+    ({"A": 1, "B": 3, "C": 1}, False),
+    ({"A": 0, "B": 3}, False),
+])
+def test_requirement_list_satisfied_with_collection(database, resources, expected):
+    def item(name):
+        return database.get_item_by_name(name)
+
+    requirement_list = RequirementList([
+        ResourceRequirement(item("A"), 1, False),
+        ResourceRequirement(item("B"), 2, False),
+        ResourceRequirement(item("C"), 1, True),
+    ])
+    collection = database.create_resource_collection({item(name): quantity for name, quantity in resources.items()})
+
+    # Run
+    result = requirement_list.satisfied(collection, 99, database)
+
+    # Assert
+    assert result == expected
+    assert result == requirement_list.satisfied(dict(collection.items()), 99, database)
+
+
+def test_requirements_are_interned(database):
+    def item(name):
+        return database.get_item_by_name(name)
+
+    # Run
+    first = RequirementOr([
+        RequirementAnd([ResourceRequirement(item("A"), 1, False), RequirementTemplate(database, "Foo")]),
+        ResourceRequirement(item("B"), 1, False),
+    ])
+    second = RequirementOr([
+        RequirementAnd([ResourceRequirement(item("A"), 1, False), RequirementTemplate(database, "Foo")]),
+        ResourceRequirement(item("B"), 1, False),
+    ])
+
+    # Assert
+    assert first is second
+    assert copy.deepcopy(first, {id(database): database}) is first
+    assert pickle.loads(pickle.dumps(first.items[1])) is first.items[1]
+    assert RequirementAnd(first.items) is not first
+    assert RequirementTemplate(database, "Foo") is not RequirementTemplate(MagicMock(), "Foo")
+
+
+def test_patched_requirements_memo(database):
+    trick = database.get_item_by_name("A")
+
+    # Run
+    first = patched_requirements_memo({trick: 1}, 1.0, database)
+    first[Requirement.trivial()] = Requirement.trivial()
+    second = patched_requirements_memo({trick: 1}, 1.0, database)
+    different = patched_requirements_memo({trick: 2}, 1.0, database)
+
+    # Assert
+    assert first is second
+    assert different is not first
+
+
+def test_deepcopy_rebinds_templates(database):
+    template = RequirementTemplate(database, "Foo")
+    requirement = RequirementOr([ResourceRequirement(database.get_item_by_name("A"), 1, False), template])
+
+    # Run
+    new_database = copy.deepcopy(database)
+    new_requirement = copy.deepcopy(requirement, {id(database): new_database})
+
+    # Assert
+    assert new_requirement is not requirement
+    assert new_requirement.items[1].database is new_database
+    assert new_requirement.items[1] == template
+    assert RequirementTemplate(new_database, "Foo") is new_requirement.items[1]
+
+
+def test_patched_requirements_memo_per_database(database):
+    trick = database.get_item_by_name("A")
+
+    # Run
+    first = patched_requirements_memo({trick: 1}, 1.0, database)
+    other = patched_requirements_memo({trick: 1}, 1.0, copy.deepcopy(database))
+
+    # Assert
+    assert first is not other
@@ -0,0 +1,99 @@
+import copy
+
+from randovania.game_description.resources.item_resource_info import ItemResourceInfo
+from randovania.game_description.resources.pickup_index import PickupIndex
+from randovania.game_description.resources.resource_collection import ResourceCollection, ResourceIndexer
+
+
+def _item(index: int) -> ItemResourceInfo:
+    return ItemResourceInfo(index, f"Item {index}", f"I{index}", 10, None)
+
+
+def test_indexer_dense():
+    indexer = ResourceIndexer()
+
+    assert indexer.index_for(_item(5)) == 0
+    assert indexer.index_for(PickupIndex(5)) == 1
+    assert indexer.index_for(_item(5)) == 0
+    assert indexer.find_index(_item(6)) is None
+    assert indexer.resource_at(1) == PickupIndex(5)
+    assert len(indexer) == 2
+
+
+def test_collection_behaves_like_dict():
+    collection = ResourceCollection(ResourceIndexer())
+
+    # Run
+    collection[_item(1)] = 2
+    collection[_item(2)] = 0
+    collection[PickupIndex(3)] = 1
+
+    # Assert
+    assert collection == {_item(1): 2, _item(2): 0, PickupIndex(3): 1}
+    assert collection.get(_item(2)) == 0
+    assert collection.get(_item(4)) is None
+    assert collection.get(_item(4), 0) == 0
+    assert _item(2) in collection
+    assert _item(4) not in collection
+    assert len(collection) == 3
+    assert list(collection.keys()) == [_item(1), _item(2), PickupIndex(3)]
+
+
+def test_collection_mask():
+    collection = ResourceCollection(ResourceIndexer())
+
+    # Run
+    collection[_item(1)] = 2
+    collection[_item(2)] = 0
+    collection[_item(3)] = 1
+    collection[_item(3)] = 0
+
+    # Assert
+    assert collection.mask == 0b001
+    assert collection.has_resource(_item(1))
+    assert not collection.has_resource(_item(2))
+    assert not collection.has_resource(_item(3))
+    assert not collection.has_resource(_item(4))
+
+
+def test_collection_copy_is_independent():
+    indexer = ResourceIndexer()
+    collection = ResourceCollection.from_dict(indexer, {_item(1): 1})
+
+    # Run
+    new_collection = copy.copy(collection)
+    new_collection[_item(2)] = 1
+    del new_collection[_item(1)]
+
+    # Assert
+    assert collection == {_item(1): 1}
+    assert new_collection == {_item(2): 1}
+    assert new_collection.indexer is indexer
+    assert copy.deepcopy(collection).indexer is indexer
+
+
+def test_fingerprint_ignores_unused_indices():
+    indexer = ResourceIndexer()
+    first = ResourceCollection.from_dict(indexer, {_item(1): 1})
+    second = ResourceCollection.from_dict(indexer, {_item(1): 1, _item(2): 1})
+
+    # Run
+    del second[_item(2)]
+
+    # Assert
+    assert first.fingerprint() == second.fingerprint()
+    second[_item(2)] = 0
+    assert first.fingerprint() != second.fingerprint()
+
+
+def test_changed_resources():
+    indexer = ResourceIndexer()
+    previous = ResourceCollection.from_dict(indexer, {_item(1): 1, _item(2): 2, _item(3): 0})
+    current = ResourceCollection.from_dict(indexer, {_item(1): 1, _item(2): 3, _item(4): 1})
+
+    # Run
+    result = list(current.changed_resources(previous))
+
+    # Assert
+    assert result == [_item(2), _item(4)]
+    assert list(previous.changed_resources(previous)) == []
@@ -0,0 +1,91 @@
+import copy
+import dataclasses
+
+from randovania.game_description.compiled_requirement import CompiledRequirement
+from randovania.game_description.node import TeleporterNode, DockNode
+
+
+def test_adjacency_matches_connections(corruption_game_description):
+    world_list = corruption_game_description.world_list
+    patches = corruption_game_description.create_game_patches()
+
+    # Run
+    adjacency = world_list.adjacency_for(patches)
+
+    # Assert
+    for node in world_list.all_nodes:
+        expected = list(world_list.connections_from(node, patches)) + list(world_list.area_connections_from(node))
+        assert list(adjacency[node]) == expected
+        assert list(world_list.potential_nodes_from(node, patches)) == expected
+
+
+def test_adjacency_cached_until_elevators_change(corruption_game_description):
+    world_list = corruption_game_description.world_list
+    patches = corruption_game_description.create_game_patches()
+    teleporter_node = next(node for node in world_list.all_nodes if isinstance(node, TeleporterNode))
+    other_node = next(node for node in world_list.all_nodes if isinstance(node, TeleporterNode)
+                      and world_list.nodes_to_area(node) != world_list.nodes_to_area(teleporter_node))
+
+    adjacency = world_list.adjacency_for(patches)
+
+    # Assert
+    assert world_list.adjacency_for(dataclasses.replace(patches, pickup_assignment={})) is adjacency
+
+    patches.elevator_connection[teleporter_node.teleporter] = other_node.default_connection
+    new_adjacency = world_list.adjacency_for(patches)
+    assert new_adjacency is not adjacency
+    assert new_adjacency[teleporter_node][0][0] == world_list.resolve_teleporter_node(teleporter_node, patches)
+
+
+def test_patched_copy_keeps_original(corruption_game_description):
+    world_list = corruption_game_description.world_list
+    database = corruption_game_description.resource_database
+    original_connections = [dict(area.connections) for area in world_list.all_areas]
+
+    # Run
+    patched = world_list.patched_copy({}, 1.0, database)
+    patched_again = world_list.patched_copy({}, 1.0, database)
+
+    # Assert
+    assert [dict(area.connections) for area in world_list.all_areas] == original_connections
+    assert patched is not world_list
+    assert patched is patched_again
+    assert len(list(patched.all_nodes)) == len(list(world_list.all_nodes))
+    for area, patched_area in zip(world_list.all_areas, patched.all_areas):
+        assert [node.name for node in patched_area.nodes] == [node.name for node in area.nodes]
+
+
+def test_patch_requirements_keeps_dock_weaknesses(corruption_game_description):
+    game = copy.deepcopy(corruption_game_description)
+    weakness = next(node.default_dock_weakness for node in game.world_list.all_nodes if isinstance(node, DockNode))
+    original_requirement = weakness.requirement
+
+    # Run
+    game.patch_requirements({}, 1.0)
+
+    # Assert
+    assert weakness.requirement is original_requirement
+    assert isinstance(game.world_list.dock_weakness_requirement(weakness), CompiledRequirement)
+
+
+def test_patched_copy_patches_dock_weaknesses(corruption_game_description):
+    world_list = corruption_game_description.world_list
+    patches = corruption_game_description.create_game_patches()
+    dock_node = next(node for node in world_list.all_nodes if isinstance(node, DockNode))
+    other_weakness = next(
+        weakness
+        for weakness in corruption_game_description.dock_weakness_database.get_by_type(dock_node.default_dock_weakness.dock_type)
+        if weakness != dock_node.default_dock_weakness
+    )
+    area = world_list.nodes_to_area(dock_node)
+    patches.dock_weakness[(area.area_asset_id, dock_node.dock_index)] = other_weakness
+
+    # Run
+    patched = world_list.patched_copy({}, 1.0, corruption_game_description.resource_database)
+
+    # Assert
+    assert world_list.dock_weakness_requirement(other_weakness) is other_weakness.requirement
+    assert patched.nodes_to_area(dock_node).name == area.name
+    requirement = next(requirement for target, requirement in patched.connections_from(dock_node, patches))
+    assert isinstance(requirement, CompiledRequirement)
+    assert requirement == patched.dock_weakness_requirement(other_weakness)
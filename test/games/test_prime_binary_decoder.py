@@ -144,6 +144,19 @@ def test_full_data_encode_is_equal():
     assert comparable_json == comparable_binary
 
 
+def _encode_and_decode_requirement(req):
+    interner = binary_data._RequirementInterner({"Example Template": 0})
+    requirement_id = interner.id_for(req)
+
+    entries = [
+        binary_data._convert_to_raw_python(
+            binary_data.ConstructRequirementEntry.parse(binary_data.ConstructRequirementEntry.build(entry))
+        )
+        for entry in interner.entries
+    ]
+    return interner, binary_data._decode_requirements(entries, ["Example Template"])[requirement_id]
+
+
 @pytest.mark.parametrize("req", [
     {"type": "or", "data": []},
     {"type": "and", "data": []},
@@ -152,11 +165,11 @@ def test_full_data_encode_is_equal():
 ])
 def test_encode_requirement_simple(req):
     # Run
-    encoded = binary_data.ConstructRequirement.build(req)
-    decoded = binary_data._convert_to_raw_python(binary_data.ConstructRequirement.parse(encoded))
+    interner, decoded = _encode_and_decode_requirement(req)
 
     # Assert
     assert req == decoded
+    assert len(interner.entries) == 1
 
 
 def test_encode_requirement_complex():
@@ -174,11 +187,12 @@ def test_encode_requirement_complex():
     }
 
     # Run
-    encoded = binary_data.ConstructRequirement.build(req)
-    decoded = binary_data._convert_to_raw_python(binary_data.ConstructRequirement.parse(encoded))
+    interner, decoded = _encode_and_decode_requirement(req)
 
     # Assert
     assert req == decoded
+    assert len(interner.entries) == 5
+    assert decoded["data"][0] is decoded["data"][2]
 
 
 def test_encode_resource_database():
@@ -193,18 +207,12 @@ def test_encode_resource_database():
         "damage": [],
         "versions": [],
         "misc": [],
-        "requirement_template": {
-            "Foo": {
-                "type": "or",
-                "data": []
-            }
-        },
+        "requirement_template": [("Foo", 0)],
         "damage_reductions": [],
     }
-    resource_database["requirement_template"] = list(resource_database["requirement_template"].items())
 
     # Run
     encoded = binary_data.ConstructResourceDatabase.build(resource_database)
 
     # Assert
-    assert encoded == b'\x00\x00\x00\x00\x00\x00\x01Foo\x00\x02\x00\x00\x00\x01\x00\x00'
+    assert encoded == b'\x00\x00\x00\x00\x00\x00\x01Foo\x00\x00\x00\x00\x01\x00\x00'
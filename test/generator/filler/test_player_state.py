@@ -0,0 +1,39 @@
+from random import Random
+
+from randovania.game_description.assignment import PickupTarget
+from randovania.games.game import RandovaniaGame
+from randovania.generator import generator
+from randovania.generator.filler import runner
+from randovania.generator.generator_reach import advance_reach_with_possible_unsafe_resources
+
+
+def test_assign_pickup_updates_index_weights(preset_manager):
+    configuration = preset_manager.default_preset_for_game(RandovaniaGame.PRIME1).get_preset().configuration
+    pool = generator.create_player_pool(Random(1000), configuration, 0, 1)
+    player_state = runner._create_player_state(0, configuration, pool.game, pool.patches, list(pool.pickups))
+    player_state.reach.advance_to(player_state.reach.state.assign_pickups_resources(pool.pickups))
+    player_state.reach = advance_reach_with_possible_unsafe_resources(player_state.reach)
+    player_state.update_for_new_state()
+    player_state.refresh_index_weights()
+
+    indices, cumulative_weights = player_state.pickup_index_weights()
+    uncollected = player_state.uncollected_state()
+    assigned_index = indices[1]
+
+    # Run
+    player_state.assign_pickup(assigned_index, PickupTarget(pool.pickups[0], 0))
+    removed_indices, removed_weights = player_state.pickup_index_weights()
+    player_state.refresh_index_weights()
+    refreshed_weights = player_state.pickup_index_weights()
+
+    # Assert
+    assert removed_indices == indices[:1] + indices[2:]
+    assert removed_weights[1:] == [weight - (cumulative_weights[1] - cumulative_weights[0])
+                                   for weight in cumulative_weights[2:]]
+    assert player_state.uncollected_state().indices == uncollected.indices - {assigned_index}
+
+    # The weights of the world of the assigned index changed, the same as calculating everything again
+    assert refreshed_weights[1] != removed_weights
+    player_state._index_weights_source = None
+    player_state.refresh_index_weights()
+    assert player_state.pickup_index_weights() == refreshed_weights
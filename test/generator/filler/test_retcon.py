@@ -0,0 +1,126 @@
+import pytest
+from mock import MagicMock, call
+
+from randovania.game_description.resources.pickup_index import PickupIndex
+from randovania.generator.filler import retcon
+from randovania.generator.filler.filler_library import UnableToProgress
+
+
+def test_retcon_fails_early_without_initial_actions():
+    player_state = MagicMock()
+    player_state.pickups_left = []
+    player_state.victory_condition_satisfied.return_value = False
+    player_state.potential_actions.return_value = []
+    rng = MagicMock()
+
+    # Run
+    with pytest.raises(UnableToProgress):
+        retcon.retcon_playthrough_filler(rng, [player_state], status_update=MagicMock())
+
+    # Assert
+    player_state.update_for_new_state.assert_called_once_with()
+    rng.assert_not_called()
+
+
+def test_weighted_locations_select():
+    player_a = MagicMock()
+    player_a.num_assigned_pickups = 2
+    player_a.pickup_index_weights.return_value = ([PickupIndex(1), PickupIndex(2)], [1.0, 3.0])
+    player_b = MagicMock()
+    player_b.num_assigned_pickups = 0
+    player_b.pickup_index_weights.return_value = ([PickupIndex(5)], [2.0])
+    rng = MagicMock()
+
+    # Run
+    locations = retcon.WeightedLocations([player_a, player_b])
+    locations.start_step()
+    # Player A has weight 1 and a total of 3, Player B has weight 3 and a total of 6
+    rng.random.return_value = 0.2
+    first = locations.select(rng)
+    rng.random.return_value = 0.4
+    second = locations.select(rng)
+    # Assigning a pickup removes the index from the player
+    player_a.pickup_index_weights.return_value = ([PickupIndex(2)], [2.0])
+    rng.random.return_value = 0.0
+    third = locations.select(rng)
+
+    # Assert
+    player_a.refresh_index_weights.assert_called_once_with()
+    player_b.refresh_index_weights.assert_called_once_with()
+    assert first == (player_a, PickupIndex(2))
+    assert second == (player_b, PickupIndex(5))
+    assert third == (player_a, PickupIndex(2))
+    assert len(locations) == 2
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_weighted_potential_actions(mocker, use_pool):
+    weights = {"a": 1.0, "b": 0.0, "c": 3.5, "d": 2.0}
+    mock_calculate = mocker.patch("randovania.generator.filler.retcon._calculate_action_weight",
+                                  side_effect=lambda player_state, action, current_uncollected: weights[action])
+    player_state = MagicMock()
+    player_state.potential_actions.return_value = list(weights.keys())
+    status_update = MagicMock()
+    pool = MagicMock() if use_pool else None
+    if use_pool:
+        pool.calculate_action_weights.return_value = list(weights.values())
+
+    # Run
+    result = retcon.weighted_potential_actions(player_state, status_update, 10, pool)
+
+    # Assert
+    assert list(result.items()) == list(weights.items())
+    assert status_update.call_count == 4
+    if use_pool:
+        pool.calculate_action_weights.assert_called_once_with(player_state, list(weights.keys()))
+        mock_calculate.assert_not_called()
+    else:
+        assert mock_calculate.call_count == 4
+
+
+def test_weighted_potential_actions_few_actions_skip_pool(mocker):
+    mocker.patch("randovania.generator.filler.retcon._calculate_action_weight", return_value=1.0)
+    player_state = MagicMock()
+    player_state.potential_actions.return_value = ["a", "b"]
+    pool = MagicMock()
+
+    # Run
+    result = retcon.weighted_potential_actions(player_state, MagicMock(), 10, pool)
+
+    # Assert
+    assert result == {"a": 1.0, "b": 1.0}
+    pool.calculate_action_weights.assert_not_called()
+
+
+def test_filler_pool_calculate_action_weights():
+    pool = MagicMock()
+    pool.starmap.side_effect = lambda function, arguments, chunksize: [
+        [float(len(action)) for action in actions]
+        for first_step, new_steps, player_index, actions in arguments
+    ]
+    player_state = MagicMock()
+    player_state.index = 1
+    actions = [("a",) * i for i in range(1, 6)]
+    filler_pool = retcon.FillerPool(pool, 2)
+    step = retcon.FillerStep(0, (), 10)
+    second_step = retcon.FillerStep(0, (), 11)
+    filler_pool.add_step(step)
+
+    # Run
+    first_result = filler_pool.calculate_action_weights(player_state, actions)
+    filler_pool.add_step(second_step)
+    second_result = filler_pool.calculate_action_weights(player_state, actions[:1])
+
+    # Assert
+    assert first_result == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert second_result == [1.0]
+    pool.starmap.assert_has_calls([
+        call(retcon._calculate_action_weights_in_worker, [
+            (0, (step,), 1, actions[:3]),
+            (0, (step,), 1, actions[3:]),
+        ], chunksize=1),
+        call(retcon._calculate_action_weights_in_worker, [
+            (1, (second_step,), 1, actions[:1]),
+            (1, (second_step,), 1, []),
+        ], chunksize=1),
+    ])
@@ -1,10 +1,15 @@
+import dataclasses
+import itertools
+from random import Random
 from typing import Callable, Union
 
 import pytest
 from mock import MagicMock, patch, call, AsyncMock
 
 import randovania
+from randovania.games.game import RandovaniaGame
 from randovania.generator import generator
+from randovania.generator.filler.filler_library import UnableToGenerate, UnableToProgress
 from randovania.layout.layout_description import LayoutDescription
 
 
@@ -48,7 +53,7 @@ async def test_create_patches(mock_random: MagicMock,
         call(player_pools[i].pickups, player_pools[i].game, player_pools[i].configuration)
         for i in range(num_players)
     ])
-    mock_run_filler.assert_awaited_once_with(rng, {i: player_pools[i] for i in range(num_players)}, status_update)
+    mock_run_filler.assert_awaited_once_with(rng, {i: player_pools[i] for i in range(num_players)}, status_update, 1)
     mock_distribute_remaining_items.assert_called_once_with(rng, filler_result.player_results)
 
     assert result == LayoutDescription(
@@ -57,3 +62,72 @@ async def test_create_patches(mock_random: MagicMock,
         all_patches=mock_distribute_remaining_items.return_value,
         item_order=filler_result.action_log,
     )
+
+
+def test_preset_bootstrap_for_reused(preset_manager):
+    configuration = preset_manager.default_preset_for_game(RandovaniaGame.PRIME1).get_preset().configuration
+    other_configuration = dataclasses.replace(configuration, energy_per_tank=configuration.energy_per_tank + 1)
+
+    # Run
+    bootstrap = generator.preset_bootstrap_for(configuration)
+    other_bootstrap = generator.preset_bootstrap_for(other_configuration)
+
+    # Assert
+    assert generator.preset_bootstrap_for(dataclasses.replace(configuration)) is bootstrap
+    assert other_bootstrap is not bootstrap
+    assert other_bootstrap.game is bootstrap.game
+    assert other_bootstrap.pool_results == bootstrap.pool_results
+
+
+class _InProcessPool:
+    """Runs the workers of a FillerPool in this process, with their own player states."""
+
+    def __init__(self, processes, initializer, initargs):
+        initializer(*initargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def starmap(self, function, arguments, chunksize=None):
+        return list(itertools.starmap(function, arguments))
+
+
+@pytest.mark.asyncio
+async def test_create_pools_and_fill_same_with_processes(mocker, preset_manager):
+    presets = {
+        0: preset_manager.default_preset_for_game(RandovaniaGame.PRIME1).get_preset(),
+    }
+    mock_get_context = mocker.patch("multiprocessing.get_context")
+    mock_get_context.return_value.Pool = _InProcessPool
+
+    # Run
+    single_result = await generator._create_pools_and_fill(Random(1000), presets, lambda s: None, 1)
+    multi_result = await generator._create_pools_and_fill(Random(1000), presets, lambda s: None, 2)
+
+    # Assert
+    mock_get_context.assert_called_once_with("spawn")
+    assert multi_result.action_log == single_result.action_log
+    assert multi_result.player_results[0].patches == single_result.player_results[0].patches
+
+
+@pytest.mark.parametrize(["error", "expected_calls"], [
+    (UnableToGenerate, 10),
+    (UnableToProgress, generator.MAX_EARLY_FAILURES),
+])
+@pytest.mark.asyncio
+async def test_create_description_retries(mocker, error, expected_calls):
+    mock_create_pools_and_fill: AsyncMock = mocker.patch("randovania.generator.generator._create_pools_and_fill",
+                                                         new_callable=AsyncMock, side_effect=error("Failed"))
+    mocker.patch("randovania.generator.generator.Random", autospec=False)
+    permalink = MagicMock()
+    permalink.player_count = 1
+
+    # Run
+    with pytest.raises(error):
+        await generator._create_description(permalink, MagicMock(), 10)
+
+    # Assert
+    assert mock_create_pools_and_fill.await_count == expected_calls
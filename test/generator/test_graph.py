@@ -0,0 +1,75 @@
+import random
+
+import networkx
+import pytest
+
+from randovania.game_description.requirements import Requirement
+from randovania.generator.graph import RandovaniaGraph
+
+
+def _random_graph(seed: int):
+    rng = random.Random(seed)
+    graph = RandovaniaGraph.new()
+    reference = networkx.DiGraph()
+
+    for node in range(30):
+        graph.add_node(node)
+        reference.add_node(node)
+
+    for _ in range(60):
+        source, target = rng.randrange(30), rng.randrange(30)
+        graph.add_edge(source, target, Requirement.trivial())
+        reference.add_edge(source, target)
+
+    return graph, reference
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_strongly_connected_components(seed):
+    graph, reference = _random_graph(seed)
+
+    expected = sorted(sorted(component) for component in networkx.strongly_connected_components(reference))
+
+    # Run
+    result = sorted(sorted(component) for component in graph.strongly_connected_components())
+
+    # Assert
+    assert result == expected
+    for node in range(30):
+        assert graph.strongly_connected_component_of(node) == next(
+            component for component in networkx.strongly_connected_components(reference) if node in component
+        )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_multi_source_distances(seed):
+    graph, reference = _random_graph(seed)
+
+    def weight(source, target, requirement):
+        return target % 2
+
+    expected = networkx.multi_source_dijkstra_path_length(reference, {0}, weight=lambda u, v, d: v % 2)
+
+    # Run
+    result = graph.multi_source_distances({0}, weight)
+
+    # Assert
+    assert result == expected
+
+
+def test_copy_is_independent():
+    graph = RandovaniaGraph.new()
+    for node in range(3):
+        graph.add_node(node)
+    graph.add_edge(0, 1, Requirement.trivial())
+
+    # Run
+    other = graph.copy()
+    other.add_edge(0, 2, Requirement.trivial())
+    graph.remove_edge(0, 1)
+    other.add_node(3)
+
+    # Assert
+    assert list(graph.edges_data()) == []
+    assert list(other.edges_data()) == [(0, 1, Requirement.trivial()), (0, 2, Requirement.trivial())]
+    assert 3 not in graph
@@ -4,6 +4,7 @@ import pytest
 from mock import AsyncMock, MagicMock
 
 from randovania.gui.lib import qt_network_client
+from randovania.network_client.game_session import GameSessionEntry
 from randovania.network_common.error import InvalidAction, ServerError, NotAuthorizedForAction
 
 
@@ -70,3 +71,24 @@ async def test_login_to_discord(client):
     client.discord.authorize.assert_awaited_once_with(1234, ['identify'])
     client._emit_with_result.assert_awaited_once_with("login_with_discord", "the-code")
     client.on_user_session_updated.assert_awaited_once_with(client._emit_with_result.return_value)
+
+
+@pytest.mark.parametrize("applied", [False, True])
+@pytest.mark.asyncio
+async def test_on_game_session_delta(client, mocker, applied):
+    mock_delta = mocker.patch("randovania.network_client.network_client.NetworkClient.on_game_session_delta",
+                              new_callable=AsyncMock, return_value=applied)
+    client._current_game_session = MagicMock(spec=GameSessionEntry)
+    updated = MagicMock()
+    client.GameSessionUpdated.connect(updated)
+    data = MagicMock()
+
+    # Run
+    await client.on_game_session_delta(data)
+
+    # Assert
+    mock_delta.assert_awaited_once_with(data)
+    if applied:
+        updated.assert_called_once_with(client._current_game_session)
+    else:
+        updated.assert_not_called()
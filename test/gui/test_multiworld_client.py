@@ -9,6 +9,7 @@ from randovania.game_description.resources.pickup_entry import PickupEntry, Pick
 from randovania.games.game import RandovaniaGame
 from randovania.gui import multiworld_client
 from randovania.gui.multiworld_client import MultiworldClient, Data
+from randovania.network_client.game_session import GameSessionPickups
 
 
 @pytest.fixture(name="client")
@@ -69,15 +70,21 @@ async def test_on_location_collected(client, tmpdir, exists):
         client.start_notify_collect_locations_task.assert_called_once_with()
 
 
+@pytest.mark.parametrize("start_index", [0, 2])
 @pytest.mark.asyncio
-async def test_refresh_received_pickups(client, corruption_game_description, mocker):
+async def test_refresh_received_pickups(client, corruption_game_description, mocker, start_index):
     db = corruption_game_description.resource_database
+    previous_pickup = ("Message Old", MagicMock())
+    client._received_pickups = [previous_pickup]
+    client._received_pickups_row = 1
+    client._received_pickups_next_index = 2
 
-    results = RandovaniaGame.PRIME3, [
+    results = GameSessionPickups(RandovaniaGame.PRIME3, 1, start_index, (
         ("Message A", b"bytesA"),
+        None,
         ("Message B", b"bytesB"),
         ("Message C", b"bytesC"),
-    ]
+    ))
     client.network_client.game_session_request_pickups = AsyncMock(return_value=results)
 
     pickups = [MagicMock(), MagicMock(), MagicMock()]
@@ -87,7 +94,12 @@ async def test_refresh_received_pickups(client, corruption_game_description, moc
     await client.refresh_received_pickups()
 
     # Assert
-    assert client._received_pickups == list(zip(["Message A", "Message B", "Message C"], pickups))
+    client.network_client.game_session_request_pickups.assert_awaited_once_with(2, 1)
+    expected = list(zip(["Message A", "Message B", "Message C"], pickups))
+    if start_index > 0:
+        expected.insert(0, previous_pickup)
+    assert client._received_pickups == expected
+    assert client._received_pickups_next_index == start_index + 4
     mock_decode.assert_has_calls([call(b"bytesA", db), call(b"bytesB", db), call(b"bytesC", db)])
 
 
@@ -159,7 +171,8 @@ async def test_notify_collect_locations(client, tmpdir):
 async def test_lock_file_on_init(skip_qtbot, tmpdir):
     # Setup
     network_client = MagicMock()
-    network_client.game_session_request_pickups = AsyncMock(return_value=(RandovaniaGame.PRIME1, []))
+    network_client.game_session_request_pickups = AsyncMock(
+        return_value=GameSessionPickups(RandovaniaGame.PRIME1, None, 0, ()))
     network_client.session_self_update = AsyncMock()
     game_connection = MagicMock()
     game_connection.backend.lock_identifier = str(tmpdir.join("my-lock"))
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from randovania.lib import profiling_lib
+
+
+@profiling_lib.timed("recursive")
+def _recursive(depth: int) -> int:
+    profiling_lib.increment("visited")
+    if depth == 0:
+        return 0
+    return 1 + _recursive(depth - 1)
+
+
+@profiling_lib.timed("async")
+async def _async_function(value: int) -> int:
+    return value * 2
+
+
+def test_timed_not_recording():
+    # Run
+    result = _recursive(3)
+
+    # Assert
+    assert result == 3
+
+
+@pytest.mark.asyncio
+async def test_record_json(tmp_path):
+    # Run
+    with profiling_lib.record() as recording:
+        assert _recursive(3) == 3
+        assert await _async_function(5) == 10
+    _recursive(2)
+    recording.save_to_file(tmp_path.joinpath("profile.json"))
+
+    # Assert
+    data = json.loads(tmp_path.joinpath("profile.json").read_text())
+    assert set(data["timers"].keys()) == {"recursive", "async"}
+    assert data["calls"] == {"recursive": 4, "async": 1}
+    assert data["counters"] == {"visited": 4}
+    assert recording.trace_events is None
+
+
+def test_record_chrome_trace():
+    # Run
+    with profiling_lib.record(trace=True) as recording:
+        _recursive(1)
+
+    # Assert
+    trace = recording.as_chrome_trace()
+    assert [event["name"] for event in trace["traceEvents"]] == ["recursive", "recursive"]
+    inner, outer = trace["traceEvents"]
+    assert outer["ts"] <= inner["ts"]
+    assert outer["dur"] >= inner["dur"]
+    assert recording.timers["recursive"] == pytest.approx(outer["dur"] / 1e6)
+    assert trace["otherData"] == {"counters": {"visited": 2}}
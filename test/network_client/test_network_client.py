@@ -4,6 +4,8 @@ import pytest
 from mock import MagicMock, AsyncMock, call
 
 import randovania
+from randovania.games.game import RandovaniaGame
+from randovania.network_client.game_session import GameSessionEntry, GameSessionPickups
 from randovania.network_client.network_client import NetworkClient, ConnectionState
 from randovania.network_common.admin_actions import SessionAdminGlobalAction, SessionAdminUserAction
 from randovania.network_common.error import InvalidSession
@@ -119,3 +121,67 @@ async def test_leave_game_session(client: NetworkClient, permanent: bool):
     client._emit_with_result.assert_has_awaits(calls)
 
     assert client._current_game_session is None
+
+
+def _session_json(sequence: int, players: list) -> dict:
+    return {
+        "id": 1234, "name": "Session", "state": "in-progress", "players": players, "presets": [], "actions": [],
+        "seed_hash": None, "word_hash": None, "spoiler": None, "permalink": None, "generation_in_progress": None,
+        "allowed_games": ["prime2"], "sequence": sequence,
+    }
+
+
+@pytest.mark.parametrize(["sequence", "expected"], [
+    (5, "ignored"),
+    (6, "applied"),
+    (8, "snapshot"),
+])
+@pytest.mark.asyncio
+async def test_on_game_session_delta(client: NetworkClient, sequence: int, expected: str):
+    player_json = {"id": 10, "name": "You", "row": 0, "admin": True, "connection_state": "Online"}
+    changed_player_json = {**player_json, "connection_state": "Offline"}
+    snapshot = _session_json(8, [{**player_json, "name": "Snapshot"}])
+
+    client._emit_with_result = AsyncMock(return_value=snapshot)
+    await client.on_game_session_updated(_session_json(5, [player_json]))
+    initial_session = client._current_game_session
+
+    # Run
+    applied = await client.on_game_session_delta({"session": 1234, "sequence": sequence, "kind": "player",
+                                                  "data": changed_player_json})
+
+    # Assert
+    assert applied == (expected == "applied")
+    if expected == "ignored":
+        assert client._current_game_session is initial_session
+        assert client._current_game_session_sequence == 5
+    elif expected == "applied":
+        assert client._current_game_session.players[10].connection_state == "Offline"
+        assert client._current_game_session_sequence == 6
+    else:
+        client._emit_with_result.assert_awaited_once_with("game_session_request_update", 1234)
+        assert client._current_game_session == GameSessionEntry.from_json(snapshot)
+        assert client._current_game_session_sequence == 8
+
+    if expected != "snapshot":
+        client._emit_with_result.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_game_session_request_pickups(client: NetworkClient):
+    client._emit_with_result = AsyncMock(return_value={
+        "game": "prime1",
+        "row": 1,
+        "start": 3,
+        "pickups": [{"provider_name": "Other", "pickup": "WMOn+"}, None],
+    })
+    client._current_game_session = MagicMock()
+    client._current_game_session.id = 1234
+
+    # Run
+    result = await client.game_session_request_pickups(3, 1)
+
+    # Assert
+    client._emit_with_result.assert_awaited_once_with("game_session_request_pickups", (1234, 3, 1))
+    assert result == GameSessionPickups(RandovaniaGame.PRIME1, 1, 3, (("Other", b"data"), None))
+    assert result.next_index == 5
@@ -0,0 +1,17 @@
+from unittest.mock import MagicMock
+
+from randovania.game_description.requirements import RequirementSet
+from randovania.resolver.logic import Logic
+
+
+def test_set_additional_requirements_version():
+    logic = Logic(MagicMock(), MagicMock())
+    node = MagicMock()
+
+    # Run
+    logic.set_additional_requirements(node, RequirementSet.impossible())
+    logic.set_additional_requirements(node, RequirementSet.impossible())
+
+    # Assert
+    assert logic.get_additional_requirements(node) == RequirementSet.impossible()
+    assert logic.additional_requirements_version == 1
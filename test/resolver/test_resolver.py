@@ -1,7 +1,9 @@
 import pytest
+from mock import MagicMock, AsyncMock
 
 from randovania.layout.layout_description import LayoutDescription
 from randovania.resolver import resolver, debug
+from randovania.resolver.transposition_table import TranspositionTable
 
 
 @pytest.mark.skip_resolver_tests
@@ -21,3 +23,58 @@ async def test_resolver_with_log_file(test_files_dir, seed_name: str):
 
     # Assert
     assert final_state_by_resolve is not None
+
+
+@pytest.mark.skip_resolver_tests
+@pytest.mark.asyncio
+async def test_resolver_with_process_pool(test_files_dir):
+    description = LayoutDescription.from_file(test_files_dir.joinpath("log_files", "corruption_seed_a.rdvgame"))
+    configuration = description.permalink.presets[0].configuration
+
+    # Run
+    final_state_by_resolve = await resolver.resolve(configuration=configuration,
+                                                    patches=description.all_patches[0],
+                                                    process_count=2)
+
+    # Assert
+    assert final_state_by_resolve is not None
+
+
+@pytest.mark.skip_resolver_tests
+@pytest.mark.asyncio
+async def test_replay_steps(test_files_dir):
+    description = LayoutDescription.from_file(test_files_dir.joinpath("log_files", "corruption_seed_a.rdvgame"))
+    configuration = description.permalink.presets[0].configuration
+    final_state = await resolver.resolve(configuration=configuration, patches=description.all_patches[0])
+    starting_state = final_state
+    while starting_state.previous_state is not None:
+        starting_state = starting_state.previous_state
+
+    # Run
+    steps = resolver.steps_between(starting_state, final_state)
+    replayed = resolver.replay_steps(starting_state, steps)
+
+    # Assert
+    assert replayed.fingerprint() == final_state.fingerprint()
+    assert replayed.path_from_previous_state == final_state.path_from_previous_state
+
+
+@pytest.mark.parametrize("success", [False, True])
+@pytest.mark.asyncio
+async def test_inner_advance_depth_only_stores_failures(mocker, success: bool):
+    result = (MagicMock() if success else None, True)
+    mock_explore: AsyncMock = mocker.patch("randovania.resolver.resolver._explore_state", new_callable=AsyncMock,
+                                           return_value=result)
+    state = MagicMock()
+    logic = MagicMock()
+    logic.game.victory_condition.satisfied.return_value = False
+    logic.transposition_table = TranspositionTable()
+
+    # Run
+    first = await resolver._inner_advance_depth(state, logic, MagicMock())
+    second = await resolver._inner_advance_depth(state, logic, MagicMock())
+
+    # Assert
+    assert first == second == result
+    assert len(logic.transposition_table) == (0 if success else 1)
+    assert mock_explore.await_count == (2 if success else 1)
@@ -0,0 +1,33 @@
+from randovania.resolver import debug
+from randovania.resolver.transposition_table import TranspositionTable
+
+
+def test_get_and_store():
+    debug.log_resolve_start()
+    table = TranspositionTable()
+
+    # Run
+    first = table.get("a")
+    table.store("a", (None, True))
+    second = table.get("a")
+
+    # Assert
+    assert first is None
+    assert second == (None, True)
+    assert debug.transposition_table_stats() == (1, 1)
+
+
+def test_discards_least_recently_used():
+    table = TranspositionTable(max_size=2)
+    table.store("a", (None, False))
+    table.store("b", (None, False))
+
+    # Run
+    table.get("a")
+    table.store("c", (None, False))
+
+    # Assert
+    assert len(table) == 2
+    assert table.get("a") is not None
+    assert table.get("b") is None
+    assert table.get("c") is not None
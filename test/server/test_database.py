@@ -1,6 +1,12 @@
+from mock import MagicMock
 from peewee import SqliteDatabase
 
+from randovania.game_description.assignment import PickupTarget
+from randovania.game_description.item.item_category import ItemCategory
+from randovania.game_description.resources.pickup_entry import PickupEntry, PickupModel
+from randovania.game_description.resources.pickup_index import PickupIndex
 from randovania.server import database
+from randovania.server.database import SessionPickup
 
 
 def test_init(tmpdir):
@@ -8,3 +14,68 @@ def test_init(tmpdir):
     with test_db.bind_ctx(database.all_classes):
         test_db.connect(reuse_if_open=True)
         test_db.create_tables(database.all_classes)
+
+
+def test_layout_description_cache(mocker):
+    mock_from_json_dict = mocker.patch("randovania.layout.layout_description.LayoutDescription.from_json_dict",
+                                       side_effect=lambda data: f"decoded {data}")
+    mock_time = mocker.patch("time.monotonic", return_value=0)
+    cache = database._LayoutDescriptionCache(max_size=2, ttl=100)
+
+    # Run
+    first = cache.get(1, '"a"')
+    again = cache.get(1, '"a"')
+    changed = cache.get(1, '"b"')
+    cache.get(2, '"c"')
+    cache.get(3, '"d"')
+    mock_time.return_value = 150
+    cache.get(3, '"d"')
+    cache.get(2, '"c"')
+
+    # Assert
+    assert first == again == "decoded a"
+    assert changed == "decoded b"
+    # 1 was evicted for size, 2 for the ttl
+    assert [call.args[0] for call in mock_from_json_dict.call_args_list] == ["a", "b", "c", "d", "c"]
+
+
+def test_layout_description_setter_populates_cache(clean_database, mocker):
+    mock_from_json_dict = mocker.patch("randovania.layout.layout_description.LayoutDescription.from_json_dict")
+    user = database.User.create(id=1234, name="The Name")
+    session = database.GameSession.create(id=1, name="Debug", creator=user)
+    description = MagicMock()
+    description.as_json = {"info": "something"}
+
+    # Run
+    session.layout_description = description
+    session.save()
+    from_cache = database.GameSession.get_by_id(1).layout_description
+    session.reset_layout_description()
+
+    # Assert
+    assert from_cache is description
+    mock_from_json_dict.assert_not_called()
+    assert database.GameSession.get_by_id(1).layout_description is None
+
+
+def test_create_pickup_lookup(mocker, echoes_resource_database):
+    mocker.patch("randovania.game_description.default_database.resource_database_for",
+                 return_value=echoes_resource_database)
+    pickup = PickupEntry("A", PickupModel(echoes_resource_database.game_enum, "AmmoModel"),
+                         ItemCategory.TEMPLE_KEY, ItemCategory.KEY,
+                         progression=((echoes_resource_database.item[0], 1),))
+    description = MagicMock()
+    description.permalink.presets = {0: MagicMock(), 1: MagicMock()}
+    description.all_patches = {
+        0: MagicMock(pickup_assignment={PickupIndex(0): PickupTarget(pickup, 0)}),
+        1: MagicMock(pickup_assignment={PickupIndex(0): PickupTarget(pickup, 0)}),
+    }
+
+    # Run
+    result = database._create_pickup_lookup(description)
+
+    # Assert
+    assert result == {
+        (0, 0): SessionPickup(0, "A", None),
+        (1, 0): SessionPickup(0, "A", "C@fSK*4Fga_C{94xPb="),
+    }
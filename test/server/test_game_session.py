@@ -2,22 +2,21 @@ import contextlib
 import dataclasses
 import datetime
 import json
-from unittest.mock import MagicMock, PropertyMock, patch, call
+from unittest.mock import MagicMock, PropertyMock, patch, ANY, call
 
 import peewee
 import pytest
 
-from randovania.game_description.assignment import PickupTarget
-from randovania.game_description.item.item_category import ItemCategory
-from randovania.game_description.resources.pickup_entry import PickupEntry, PickupModel
 from randovania.games.game import RandovaniaGame
 from randovania.interface_common.cosmetic_patches import CosmeticPatches
 from randovania.interface_common.players_configuration import PlayersConfiguration
 from randovania.layout.preset_migration import VersionedPreset
 from randovania.network_common.admin_actions import SessionAdminUserAction, SessionAdminGlobalAction
 from randovania.network_common.error import InvalidAction
+from randovania.network_common.session_delta import GameSessionDeltaKind
 from randovania.network_common.session_state import GameSessionState
 from randovania.server import game_session, database
+from randovania.server.database import SessionPickup
 
 
 @pytest.fixture(name="mock_emit_session_update")
@@ -25,6 +24,18 @@ def _mock_emit_session_update(mocker) -> MagicMock:
     return mocker.patch("randovania.server.game_session._emit_session_update", autospec=True)
 
 
+@pytest.fixture(name="mock_emit_session_delta")
+def _mock_emit_session_delta(mocker) -> MagicMock:
+    return mocker.patch("randovania.server.game_session._emit_session_delta", autospec=True)
+
+
+@pytest.fixture(autouse=True)
+def _clear_session_sequences():
+    game_session._session_sequences.clear()
+    yield
+    game_session._session_sequences.clear()
+
+
 def test_setup_app():
     game_session.setup_app(MagicMock())
 
@@ -85,10 +96,11 @@ def test_create_game_session(clean_database, preset_manager):
         'permalink': None,
         'generation_in_progress': None,
         'allowed_games': ['prime2'],
+        'sequence': 0,
     }
 
 
-def test_join_game_session(mock_emit_session_update: MagicMock,
+def test_join_game_session(mock_emit_session_delta: MagicMock,
                            clean_database):
     # Setup
     user1 = database.User.create(id=1234, name="The Name")
@@ -105,7 +117,10 @@ def test_join_game_session(mock_emit_session_update: MagicMock,
     result = game_session.join_game_session(sio, 1, None)
 
     # Assert
-    mock_emit_session_update.assert_called_once_with(session)
+    mock_emit_session_delta.assert_called_once_with(1, GameSessionDeltaKind.PLAYER, {
+        'admin': False, 'id': 1234, 'name': 'The Name', 'row': None, 'inventory': None,
+        'connection_state': 'Online, Unknown',
+    })
     assert result == {
         'id': 1,
         'state': GameSessionState.SETUP.value,
@@ -124,6 +139,7 @@ def test_join_game_session(mock_emit_session_update: MagicMock,
         'permalink': None,
         'generation_in_progress': None,
         'allowed_games': ['prime2'],
+        'sequence': 0,
     }
 
 
@@ -180,21 +196,18 @@ def two_player_session_fixture(clean_database):
     return session
 
 
-@patch("randovania.server.game_session._get_pickup_target", autospec=True)
 @patch("randovania.server.game_session._get_resource_database", autospec=True)
+@patch("randovania.server.database.GameSession.pickup_lookup", new_callable=PropertyMock)
 @patch("randovania.server.database.GameSession.layout_description", new_callable=PropertyMock)
 def test_game_session_request_pickups_one_action(mock_session_description: PropertyMock,
+                                                 mock_pickup_lookup: PropertyMock,
                                                  mock_get_resource_database: MagicMock,
-                                                 mock_get_pickup_target: MagicMock,
                                                  flask_app, two_player_session, echoes_resource_database):
     # Setup
     sio = MagicMock()
     sio.get_current_user.return_value = database.User.get_by_id(1234)
 
-    pickup = PickupEntry("A", PickupModel(echoes_resource_database.game_enum, "AmmoModel"),
-                         ItemCategory.TEMPLE_KEY, ItemCategory.KEY,
-                         progression=((echoes_resource_database.item[0], 1),))
-    mock_get_pickup_target.return_value = PickupTarget(pickup=pickup, player=0)
+    mock_pickup_lookup.return_value = {(1, 0): SessionPickup(0, "A", "C@fSK*4Fga_C{94xPb=")}
     mock_get_resource_database.return_value = echoes_resource_database
 
     # Run
@@ -202,29 +215,62 @@ def test_game_session_request_pickups_one_action(mock_session_description: Prope
 
     # Assert
     mock_get_resource_database.assert_called_once_with(mock_session_description.return_value, 0)
-    mock_get_pickup_target.assert_called_once_with(mock_session_description.return_value, 1, 0)
     assert result == {
         "game": "prime2",
+        "row": 0,
+        "start": 0,
         "pickups": [{'provider_name': 'Other Name', 'pickup': 'C@fSK*4Fga_C{94xPb='}]
     }
 
 
+@pytest.mark.parametrize(["start_index", "start_row", "expected_start"], [
+    (0, None, 0),
+    (2, 0, 2),
+    (2, 1, 0),
+    (5, 0, 0),
+])
+def test_game_session_request_pickups_from_index(flask_app, two_player_session, mocker,
+                                                 start_index, start_row, expected_start):
+    # Setup
+    mocker.patch("randovania.server.database.GameSession.layout_description", new_callable=PropertyMock)
+    mocker.patch("randovania.server.database.GameSession.pickup_lookup", new_callable=PropertyMock,
+                 return_value={(1, location): SessionPickup(0, "A", f"encoded {location}") for location in range(3)})
+    mock_get_resource_database: MagicMock = mocker.patch("randovania.server.game_session._get_resource_database",
+                                                         autospec=True)
+    mock_get_resource_database.return_value.game_enum = RandovaniaGame.PRIME2
+    sio = MagicMock()
+    sio.get_current_user.return_value = database.User.get_by_id(1234)
+
+    for location in (1, 2):
+        database.GameSessionTeamAction.create(
+            session=two_player_session, provider_row=1, provider_location_index=location, receiver_row=0,
+            time=datetime.datetime(2020, 5, 2, 10, 20 + location, tzinfo=datetime.timezone.utc))
+
+    # Run
+    result = game_session.game_session_request_pickups(sio, 1, start_index, start_row)
+
+    # Assert
+    assert result == {
+        "game": "prime2",
+        "row": 0,
+        "start": expected_start,
+        "pickups": [
+            {'provider_name': 'Other Name', 'pickup': f'encoded {location}'}
+            # The action from two_player_session was the last one created
+            for location in (1, 2, 0)
+        ][expected_start:],
+    }
+
+
 @patch("flask_socketio.emit", autospec=True)
-@patch("randovania.server.game_session._get_pickup_target", autospec=True)
-@patch("randovania.server.game_session._get_resource_database", autospec=True)
-@patch("randovania.server.database.GameSession.layout_description", new_callable=PropertyMock)
-def test_game_session_collect_pickup_for_self(mock_session_description: PropertyMock,
-                                              mock_get_resource_database: MagicMock,
-                                              mock_get_pickup_target: MagicMock,
+@patch("randovania.server.database.GameSession.pickup_lookup", new_callable=PropertyMock)
+def test_game_session_collect_pickup_for_self(mock_pickup_lookup: PropertyMock,
                                               mock_emit: MagicMock,
-                                              flask_app, two_player_session, echoes_resource_database):
+                                              flask_app, two_player_session):
     sio = MagicMock()
     sio.get_current_user.return_value = database.User.get_by_id(1234)
 
-    pickup = PickupEntry("A", 1, ItemCategory.TEMPLE_KEY, ItemCategory.KEY,
-                         progression=((echoes_resource_database.item[0], 1),))
-    mock_get_resource_database.return_value = echoes_resource_database
-    mock_get_pickup_target.return_value = PickupTarget(pickup, 0)
+    mock_pickup_lookup.return_value = {(0, 0): SessionPickup(0, "A", None)}
 
     # Run
     with flask_app.test_request_context():
@@ -233,23 +279,20 @@ def test_game_session_collect_pickup_for_self(mock_session_description: Property
     # Assert
     assert result is None
     mock_emit.assert_not_called()
-    mock_get_pickup_target.assert_called_once_with(mock_session_description.return_value, 0, 0)
     with pytest.raises(peewee.DoesNotExist):
         database.GameSessionTeamAction.get(session=two_player_session, provider_row=0,
                                            provider_location_index=0)
 
 
 @patch("flask_socketio.emit", autospec=True)
-@patch("randovania.server.game_session._get_pickup_target", autospec=True)
-@patch("randovania.server.database.GameSession.layout_description", new_callable=PropertyMock)
-def test_game_session_collect_pickup_etm(mock_session_description: PropertyMock,
-                                         mock_get_pickup_target: MagicMock,
+@patch("randovania.server.database.GameSession.pickup_lookup", new_callable=PropertyMock)
+def test_game_session_collect_pickup_etm(mock_pickup_lookup: PropertyMock,
                                          mock_emit: MagicMock,
-                                         flask_app, two_player_session, echoes_resource_database):
+                                         flask_app, two_player_session):
     sio = MagicMock()
     sio.get_current_user.return_value = database.User.get_by_id(1234)
 
-    mock_get_pickup_target.return_value = None
+    mock_pickup_lookup.return_value = {}
 
     # Run
     with flask_app.test_request_context():
@@ -258,12 +301,38 @@ def test_game_session_collect_pickup_etm(mock_session_description: PropertyMock,
     # Assert
     assert result is None
     mock_emit.assert_not_called()
-    mock_get_pickup_target.assert_called_once_with(mock_session_description.return_value, 0, 0)
     with pytest.raises(peewee.DoesNotExist):
         database.GameSessionTeamAction.get(session=two_player_session, provider_row=0,
                                            provider_location_index=0)
 
 
+def test_game_session_collect_locations_many(flask_app, two_player_session, mock_emit_session_delta, mocker):
+    mock_emit: MagicMock = mocker.patch("flask_socketio.emit", autospec=True)
+    mocker.patch("randovania.server.database.GameSession.pickup_lookup", new_callable=PropertyMock, return_value={
+        (0, 0): SessionPickup(0, "Self", None),
+        (0, 1): SessionPickup(1, "New", "encoded"),
+        (0, 3): SessionPickup(1, "Existing", "encoded"),
+        (0, 4): SessionPickup(1, "Other New", "encoded"),
+    })
+    sio = MagicMock()
+    sio.get_current_user.return_value = database.User.get_by_id(1234)
+    database.GameSessionTeamAction.create(session=two_player_session, provider_row=0,
+                                          provider_location_index=3, receiver_row=1)
+    mock_atomic = mocker.patch.object(database.db, "atomic", wraps=database.db.atomic)
+
+    # Run
+    with flask_app.test_request_context():
+        game_session.game_session_collect_locations(sio, 1, (0, 1, 2, 3, 4, 1))
+
+    # Assert
+    mock_atomic.assert_called_once_with("IMMEDIATE")
+    actions = database.GameSessionTeamAction.select().where(database.GameSessionTeamAction.provider_row == 0)
+    assert sorted(action.provider_location_index for action in actions) == [1, 3, 4]
+    mock_emit.assert_called_once_with("game_has_update", {"session": 1, "row": 1},
+                                      room="game-session-1-1235")
+    assert [c.args[2]["pickup"] for c in mock_emit_session_delta.call_args_list] == ["New", "Other New"]
+
+
 @pytest.mark.parametrize(("locations_to_collect", "exists"), [
     ((0,), ()),
     ((0,), (0,)),
@@ -271,16 +340,18 @@ def test_game_session_collect_pickup_etm(mock_session_description: PropertyMock,
     ((0, 1), (0,)),
     ((0, 1), (0, 1)),
 ])
-def test_game_session_collect_pickup_other(flask_app, two_player_session, echoes_resource_database,
-                                           locations_to_collect, exists, mock_emit_session_update, mocker):
+def test_game_session_collect_pickup_other(flask_app, two_player_session,
+                                           locations_to_collect, exists, mock_emit_session_delta, mocker):
     mock_emit: MagicMock = mocker.patch("flask_socketio.emit", autospec=True)
-    mock_get_pickup_target: MagicMock = mocker.patch("randovania.server.game_session._get_pickup_target", autospec=True)
-    mock_session_description: PropertyMock = mocker.patch("randovania.server.database.GameSession.layout_description",
-                                                          new_callable=PropertyMock)
+    mock_pickup_lookup: PropertyMock = mocker.patch("randovania.server.database.GameSession.pickup_lookup",
+                                                    new_callable=PropertyMock)
 
     sio = MagicMock()
     sio.get_current_user.return_value = database.User.get_by_id(1234)
-    mock_get_pickup_target.return_value = PickupTarget(MagicMock(), 1)
+    mock_pickup_lookup.return_value = {
+        (0, location): SessionPickup(1, "A", "encoded")
+        for location in (0, 1)
+    }
 
     for existing_id in exists:
         database.GameSessionTeamAction.create(session=two_player_session, provider_row=0,
@@ -292,20 +363,26 @@ def test_game_session_collect_pickup_other(flask_app, two_player_session, echoes
 
     # Assert
     assert result is None
-    mock_get_pickup_target.assert_has_calls([
-        call(mock_session_description.return_value, 0, location)
-        for location in locations_to_collect
-    ])
     for location in locations_to_collect:
         database.GameSessionTeamAction.get(session=two_player_session, provider_row=0,
                                            provider_location_index=location)
     if exists == locations_to_collect:
         mock_emit.assert_not_called()
-        mock_emit_session_update.assert_not_called()
+        mock_emit_session_delta.assert_not_called()
     else:
         mock_emit.assert_called_once_with("game_has_update", {"session": 1, "row": 1, },
                                           room=f"game-session-1-1235")
-        mock_emit_session_update.assert_called_once_with(database.GameSession.get(id=1))
+        mock_emit_session_delta.assert_has_calls([
+            call(1, GameSessionDeltaKind.ACTION, {
+                "provider": "The Name",
+                "receiver": "Other Name",
+                "pickup": "A",
+                "location": f"PickupIndex {location}",
+                "time": ANY,
+            })
+            for location in locations_to_collect
+            if location not in exists
+        ])
 
 
 @pytest.mark.parametrize("is_observer", [False, True])
@@ -381,7 +458,7 @@ def test_game_session_admin_kick_last(clean_database, flask_app, mocker):
         'game_session_update',
         {'id': 1, 'name': 'My Room', 'state': 'setup', 'players': [], 'presets': [], 'actions': [],
          'spoiler': None, 'word_hash': None, 'seed_hash': None, 'permalink': None, 'generation_in_progress': None,
-         'allowed_games': ['prime2'], },
+         'allowed_games': ['prime2'], 'sequence': 1},
         room='game-session-1')
 
 
@@ -478,7 +555,7 @@ def test_game_session_admin_session_create_row(mock_emit_session_update: MagicMo
     assert database.GameSession.get_by_id(1).num_rows == 1
 
 
-def test_game_session_admin_session_change_row(mock_emit_session_update: MagicMock,
+def test_game_session_admin_session_change_row(mock_emit_session_update: MagicMock, mock_emit_session_delta: MagicMock,
                                                clean_database, flask_app, preset_manager):
     user1 = database.User.create(id=1234, name="The Name")
     session = database.GameSession.create(id=1, name="Debug", state=GameSessionState.SETUP, creator=user1)
@@ -497,7 +574,9 @@ def test_game_session_admin_session_change_row(mock_emit_session_update: MagicMo
                                                 (1, preset_manager.default_preset.as_json))
 
     # Assert
-    mock_emit_session_update.assert_called_once_with(session)
+    mock_emit_session_update.assert_not_called()
+    mock_emit_session_delta.assert_called_once_with(1, GameSessionDeltaKind.PRESET,
+                                                    {"row": 1, "preset": preset_manager.default_preset.as_json})
     new_preset_row = database.GameSessionPreset.get(database.GameSessionPreset.session == session,
                                                     database.GameSessionPreset.row == 1)
     assert json.loads(new_preset_row.preset) == preset_manager.default_preset.as_json
@@ -821,8 +900,8 @@ def test_verify_no_layout_description(clean_database, flask_app):
 
 def test_game_session_request_update(clean_database, mocker, flask_app):
     mock_layout = mocker.patch("randovania.server.database.GameSession.layout_description", new_callable=PropertyMock)
-    target = mock_layout.return_value.all_patches.__getitem__.return_value.pickup_assignment.__getitem__.return_value
-    target.pickup.name = "The Pickup"
+    mocker.patch("randovania.server.database.GameSession.pickup_lookup", new_callable=PropertyMock,
+                 return_value={(1, 0): SessionPickup(0, "The Pickup", "encoded")})
     mock_layout.return_value.shareable_word_hash = "Words of O-Lir"
     mock_layout.return_value.shareable_hash = "ABCDEFG"
     mock_layout.return_value.permalink.spoiler = True
@@ -883,4 +962,5 @@ def test_game_session_request_update(clean_database, mocker, flask_app):
         "permalink": "<permalink>",
         "generation_in_progress": None,
         'allowed_games': ['prime2'],
+        "sequence": 0,
     }